@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020 Marco Favorito
+#
+# ------------------------------
+#
+# This file is part of pdfa-learning.
+#
+# pdfa-learning is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pdfa-learning is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with pdfa-learning.  If not, see <https://www.gnu.org/licenses/>.
+#
+"""
+Run the benchmarks, write the results in JSON format, and compare them with a baseline.
+
+Example, from the repository root:
+
+    python -m benchmarks --scale small --output results.json
+    python -m benchmarks --baseline results.json --filter learn
+
+The exit code is 1 if some benchmark regressed with respect to the baseline.
+"""
+import argparse
+import json
+import logging
+import re
+import sys
+from pathlib import Path
+
+from benchmarks.core import compare, load_results, run_benchmark, to_json
+from benchmarks.workloads import SCALES, get_benchmarks
+
+
+def parse_args():
+    """Parse arguments."""
+    parser = argparse.ArgumentParser("benchmarks")
+    parser.add_argument(
+        "--scale",
+        choices=list(SCALES),
+        default="small",
+        help="The size of the workloads.",
+    )
+    parser.add_argument(
+        "--filter",
+        type=str,
+        default="",
+        help="Only run the benchmarks matching a regex.",
+    )
+    parser.add_argument(
+        "--repeats", type=int, default=5, help="The number of measured runs."
+    )
+    parser.add_argument(
+        "--warmup", type=int, default=1, help="The number of runs before measuring."
+    )
+    parser.add_argument(
+        "--output", type=Path, default=None, help="The path of the JSON results."
+    )
+    parser.add_argument(
+        "--baseline", type=Path, default=None, help="The JSON results to compare with."
+    )
+    parser.add_argument(
+        "--tolerance",
+        type=float,
+        default=0.2,
+        help="The tolerated relative increase of latency and memory.",
+    )
+    return parser.parse_args()
+
+
+def main():
+    """Run the benchmarks."""
+    args = parse_args()
+    # the logging of the learning algorithms would be measured as well
+    logging.getLogger("pdfa_learning").setLevel(logging.WARNING)
+    benchmarks = [b for b in get_benchmarks(args.scale) if re.search(args.filter, b.id)]
+    results = []
+    for index, benchmark in enumerate(benchmarks):
+        result = run_benchmark(benchmark, repeats=args.repeats, warmup=args.warmup)
+        results.append(result)
+        print(
+            f"[{index + 1}/{len(benchmarks)}] {result.id}: "
+            f"p50={result.latency['p50']:.4f}s p99={result.latency['p99']:.4f}s "
+            f"throughput={result.throughput:.1f}/s "
+            f"peak_memory={result.peak_memory / 2 ** 20:.1f}MiB"
+        )
+
+    content = to_json(
+        results, scale=args.scale, repeats=args.repeats, warmup=args.warmup
+    )
+    if args.output is not None:
+        args.output.write_text(json.dumps(content, indent=2))
+
+    if args.baseline is not None:
+        regressions = compare(results, load_results(args.baseline), args.tolerance)
+        for regression in regressions:
+            print(
+                f"REGRESSION {regression.id} {regression.metric}: "
+                f"{regression.baseline:.4g} -> {regression.current:.4g} "
+                f"(x{regression.ratio:.2f})"
+            )
+        if len(regressions) > 0:
+            sys.exit(1)
+        print("No regressions.")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,228 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020 Marco Favorito
+#
+# ------------------------------
+#
+# This file is part of pdfa-learning.
+#
+# pdfa-learning is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pdfa-learning is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with pdfa-learning.  If not, see <https://www.gnu.org/licenses/>.
+#
+"""Run benchmarks, and compare their results with a baseline."""
+import gc
+import json
+import platform
+import sys
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+LATENCY_PERCENTILES = (50, 90, 99)
+
+
+@dataclass(frozen=True)
+class Benchmark:
+    """
+    A parameterized workload.
+
+    name: the name of the workload.
+    params: the parameters of the workload.
+    setup: build the input of the workload; not measured.
+    run: run the workload on the input, and return the number of processed items.
+    teardown: release the input of the workload, if needed; not measured.
+    """
+
+    name: str
+    params: Dict[str, Any]
+    setup: Callable[[], Any]
+    run: Callable[[Any], int]
+    teardown: Optional[Callable[[Any], None]] = None
+
+    @property
+    def id(self) -> str:
+        """Get the identifier of the benchmark, from its name and its parameters."""
+        params = ",".join(
+            f"{key}={value}" for key, value in sorted(self.params.items())
+        )
+        return f"{self.name}[{params}]"
+
+
+@dataclass
+class BenchmarkResult:
+    """
+    The result of a benchmark.
+
+    id: the identifier of the benchmark.
+    name: the name of the workload.
+    params: the parameters of the workload.
+    repeats: the number of measured runs.
+    items: the number of items processed by a run.
+    latency: statistics of the wall time (in seconds) of a run.
+    throughput: the number of items processed per second, in the median run.
+    peak_memory: the peak of memory (in bytes) allocated by Python during a run.
+    """
+
+    id: str
+    name: str
+    params: Dict[str, Any]
+    repeats: int
+    items: int
+    latency: Dict[str, float] = field(default_factory=dict)
+    throughput: float = 0.0
+    peak_memory: int = 0
+
+
+@dataclass(frozen=True)
+class Regression:
+    """A metric of a benchmark that got worse than in the baseline."""
+
+    id: str
+    metric: str
+    baseline: float
+    current: float
+
+    @property
+    def ratio(self) -> float:
+        """Get the ratio between the current value and the baseline value."""
+        return self.current / self.baseline
+
+
+def run_benchmark(
+    benchmark: Benchmark, repeats: int = 5, warmup: int = 1
+) -> BenchmarkResult:
+    """
+    Run a benchmark.
+
+    The runs are timed without tracing the memory allocations;
+    the peak memory is measured on a further run.
+
+    :param benchmark: the benchmark.
+    :param repeats: the number of measured runs.
+    :param warmup: the number of runs before the measured ones.
+    :return: the result.
+    """
+    assert repeats > 0, "The number of runs must be positive."
+    data = benchmark.setup()
+    try:
+        for _ in range(warmup):
+            benchmark.run(data)
+        latencies = []
+        items = 0
+        for _ in range(repeats):
+            gc.collect()
+            start = time.perf_counter()
+            items = benchmark.run(data)
+            latencies.append(time.perf_counter() - start)
+
+        gc.collect()
+        tracemalloc.start()
+        try:
+            benchmark.run(data)
+            _, peak_memory = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+    finally:
+        if benchmark.teardown is not None:
+            benchmark.teardown(data)
+
+    latency = {
+        "min": min(latencies),
+        "mean": float(np.mean(latencies)),
+        "max": max(latencies),
+    }
+    for percentile in LATENCY_PERCENTILES:
+        latency[f"p{percentile}"] = float(np.percentile(latencies, percentile))
+    return BenchmarkResult(
+        id=benchmark.id,
+        name=benchmark.name,
+        params=benchmark.params,
+        repeats=repeats,
+        items=items,
+        latency=latency,
+        throughput=items / latency["p50"] if latency["p50"] > 0 else float("inf"),
+        peak_memory=peak_memory,
+    )
+
+
+def get_metadata() -> Dict[str, Any]:
+    """Get the description of the environment where the benchmarks run."""
+    return {
+        "python": sys.version,
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "numpy": np.__version__,
+    }
+
+
+def to_json(results: Sequence[BenchmarkResult], **metadata: Any) -> Dict[str, Any]:
+    """
+    Get the results as a JSON-serializable dictionary.
+
+    :param results: the results.
+    :param metadata: other information on the run (e.g. the command line options).
+    :return: the dictionary.
+    """
+    return {
+        "metadata": {**get_metadata(), **metadata},
+        "results": [asdict(result) for result in results],
+    }
+
+
+def load_results(path: Union[str, Path]) -> Dict[str, Dict[str, Any]]:
+    """
+    Load the results written by a previous run.
+
+    :param path: the path of the JSON file.
+    :return: the results, indexed by the identifiers of the benchmarks.
+    """
+    content = json.loads(Path(path).read_text())
+    return {result["id"]: result for result in content["results"]}
+
+
+def compare(
+    results: Sequence[BenchmarkResult],
+    baseline: Dict[str, Dict[str, Any]],
+    tolerance: float = 0.2,
+) -> List[Regression]:
+    """
+    Compare the results with a baseline.
+
+    A benchmark regressed if its median latency or its peak memory
+    is greater than the baseline one by more than the tolerance.
+    The benchmarks that are not in the baseline are ignored.
+
+    :param results: the results.
+    :param baseline: the baseline results, indexed by identifier.
+    :param tolerance: the tolerated relative increase.
+    :return: the regressions.
+    """
+    regressions = []
+    for result in results:
+        baseline_result = baseline.get(result.id)
+        if baseline_result is None:
+            continue
+        metrics = [
+            ("latency.p50", baseline_result["latency"]["p50"], result.latency["p50"]),
+            ("peak_memory", baseline_result["peak_memory"], result.peak_memory),
+        ]
+        for metric, baseline_value, current_value in metrics:
+            if baseline_value > 0 and current_value > baseline_value * (1 + tolerance):
+                regressions.append(
+                    Regression(result.id, metric, baseline_value, current_value)
+                )
+    return regressions
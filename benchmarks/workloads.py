@@ -0,0 +1,240 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020 Marco Favorito
+#
+# ------------------------------
+#
+# This file is part of pdfa-learning.
+#
+# pdfa-learning is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pdfa-learning is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with pdfa-learning.  If not, see <https://www.gnu.org/licenses/>.
+#
+"""The parameterized workloads of the benchmarks."""
+import itertools
+from typing import Any, Dict, Iterator, List, Tuple
+
+import numpy as np
+
+from benchmarks.core import Benchmark
+from pdfa_learning.learn_pdfa.base import Algorithm, learn_pdfa
+from pdfa_learning.learn_pdfa.utils.base import l_infty_norm, prefix_distance_infty_norm
+from pdfa_learning.learn_pdfa.utils.generator import (
+    MultiprocessedGenerator,
+    SimpleGenerator,
+)
+from pdfa_learning.learn_pdfa.utils.multiset.tree import PrefixTreeMultiset
+from pdfa_learning.pdfa import PDFA
+from pdfa_learning.pdfa.random_pdfa import make_random_pdfa
+from pdfa_learning.types import Word
+
+# the default values of the parameters, and the values they are scaled to
+BASE_PARAMS = dict(nb_states=4, alphabet_size=3, nb_samples=2000, trace_length=10)
+SCALED_PARAMS = dict(
+    nb_states=(16, 64), alphabet_size=(8,), nb_samples=(8000,), trace_length=(40,)
+)
+SCALES = {"small": 1, "medium": 4, "large": 16}
+SEED = 42
+
+
+def _make_pdfa(params: Dict[str, Any]) -> PDFA:
+    """Make the PDFA of a workload, and reset the random generator used for sampling."""
+    np.random.seed(SEED)
+    return make_random_pdfa(
+        params["nb_states"],
+        params["alphabet_size"],
+        expected_length=params["trace_length"],
+        seed=SEED,
+    )
+
+
+def _make_sample(params: Dict[str, Any], seed: int = SEED) -> List[Word]:
+    """Sample the traces of a workload."""
+    automaton = _make_pdfa(params)
+    np.random.seed(seed)
+    return [tuple(automaton.sample()) for _ in range(params["nb_samples"])]
+
+
+def _make_tree(sample: List[Word]) -> PrefixTreeMultiset:
+    """Make the prefix tree of a sample."""
+    multiset = PrefixTreeMultiset()
+    multiset.update(sample)
+    return multiset
+
+
+def _sample_pdfa(params: Dict[str, Any]) -> Benchmark:
+    """Sample traces with PDFA.sample."""
+
+    def setup():
+        return _make_pdfa(params)
+
+    def run(automaton: PDFA) -> int:
+        for _ in range(params["nb_samples"]):
+            automaton.sample()
+        return params["nb_samples"]
+
+    return Benchmark("pdfa.sample", params, setup, run)
+
+
+def _simple_generator(params: Dict[str, Any]) -> Benchmark:
+    """Sample traces with the simple generator."""
+
+    def setup():
+        return SimpleGenerator(_make_pdfa(params))
+
+    def run(generator: SimpleGenerator) -> int:
+        return len(generator.sample(n=params["nb_samples"]))
+
+    return Benchmark("generator.simple", params, setup, run)
+
+
+def _multiprocessed_generator(params: Dict[str, Any]) -> Benchmark:
+    """Sample traces with the multiprocessed generator (the memory of the workers is not measured)."""
+
+    def setup():
+        automaton = _make_pdfa(params)
+        return MultiprocessedGenerator(SimpleGenerator(automaton), nb_processes=2)
+
+    def run(generator: MultiprocessedGenerator) -> int:
+        return len(generator.sample(n=params["nb_samples"]))
+
+    def teardown(generator: MultiprocessedGenerator) -> None:
+        generator._pool.terminate()  # pylint: disable=protected-access
+
+    return Benchmark("generator.multiprocessed", params, setup, run, teardown)
+
+
+def _multiset_update(params: Dict[str, Any]) -> Benchmark:
+    """Build the prefix tree of a sample."""
+
+    def run(sample: List[Word]) -> int:
+        _make_tree(sample)
+        return len(sample)
+
+    return Benchmark("multiset.update", params, lambda: _make_sample(params), run)
+
+
+def _distance(name: str, distance_function, params: Dict[str, Any]) -> Benchmark:
+    """Compute a distance between the prefix trees of two samples."""
+
+    def setup() -> Tuple[PrefixTreeMultiset, PrefixTreeMultiset]:
+        return (
+            _make_tree(_make_sample(params, SEED)),
+            _make_tree(_make_sample(params, SEED + 1)),
+        )
+
+    def run(multisets: Tuple[PrefixTreeMultiset, PrefixTreeMultiset]) -> int:
+        distance_function(*multisets)
+        return multisets[0].size + multisets[1].size
+
+    return Benchmark(name, params, setup, run)
+
+
+def _learn_balle(params: Dict[str, Any]) -> Benchmark:
+    """Learn a PDFA with the Balle algorithm."""
+
+    def run(sample: List[Word]) -> int:
+        learn_pdfa(
+            algorithm=Algorithm.BALLE,
+            dataset=sample,
+            alphabet_size=params["alphabet_size"],
+            n=params["nb_states"],
+        )
+        return len(sample)
+
+    return Benchmark("learn.balle", params, lambda: _make_sample(params), run)
+
+
+def _learn_palmer(params: Dict[str, Any]) -> Benchmark:
+    """Learn a PDFA with the Palmer algorithm."""
+
+    def setup() -> SimpleGenerator:
+        return SimpleGenerator(_make_pdfa(params))
+
+    def run(generator: SimpleGenerator) -> int:
+        learn_pdfa(
+            algorithm=Algorithm.PALMER,
+            sample_generator=generator,
+            alphabet_size=params["alphabet_size"],
+            n=params["nb_states"],
+            n1_max_debug=params["nb_samples"],
+            n2_max_debug=params["nb_samples"],
+            m0_max_debug=params["nb_samples"] // 10,
+        )
+        return 2 * params["nb_samples"]
+
+    return Benchmark("learn.palmer", params, setup, run)
+
+
+def _score(params: Dict[str, Any]) -> Benchmark:
+    """Compute the probabilities of the traces of a sample."""
+
+    def setup() -> Tuple[PDFA, List[Word]]:
+        return _make_pdfa(params), _make_sample(params)
+
+    def run(data: Tuple[PDFA, List[Word]]) -> int:
+        automaton, sample = data
+        for word in sample:
+            automaton.get_probability(word)
+        return len(sample)
+
+    return Benchmark("score.get_probability", params, setup, run)
+
+
+WORKLOADS = {
+    "pdfa.sample": _sample_pdfa,
+    "generator.simple": _simple_generator,
+    "generator.multiprocessed": _multiprocessed_generator,
+    "multiset.update": _multiset_update,
+    "distance.l_infty_norm": lambda params: _distance(
+        "distance.l_infty_norm", l_infty_norm, params
+    ),
+    "distance.prefix_infty_norm": lambda params: _distance(
+        "distance.prefix_infty_norm", prefix_distance_infty_norm, params
+    ),
+    "learn.balle": _learn_balle,
+    "learn.palmer": _learn_palmer,
+    "score.get_probability": _score,
+}
+
+
+def _iter_params(scale: str) -> Iterator[Dict[str, Any]]:
+    """
+    Iterate over the parameters of the workloads.
+
+    The parameters are scaled one at a time, from the base parameters;
+    the number of samples is multiplied by the scale factor.
+    """
+    factor = SCALES[scale]
+    base = dict(BASE_PARAMS, nb_samples=BASE_PARAMS["nb_samples"] * factor)
+    yield base
+    for key, values in SCALED_PARAMS.items():
+        for value in values:
+            if key == "nb_samples":
+                value *= factor
+            yield dict(base, **{key: value})
+
+
+def get_benchmarks(scale: str = "small") -> List[Benchmark]:
+    """
+    Get the benchmarks of all the workloads, at some scale.
+
+    :param scale: one of 'small', 'medium' and 'large'.
+    :return: the benchmarks.
+    """
+    assert scale in SCALES, f"Unknown scale: {scale}."
+    return [
+        workload(params)
+        for workload, params in itertools.product(
+            WORKLOADS.values(), _iter_params(scale)
+        )
+    ]
@@ -96,6 +96,7 @@ if __name__ == "__main__":
             Path("src/pdfa_learning").glob("**/*.py"),
             Path("tests").glob("**/*.py"),
             Path("scripts").glob("**/*.py"),
+            Path("benchmarks").glob("**/*.py"),
         ),
     )
 
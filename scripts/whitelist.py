@@ -1,24 +1,56 @@
 # flake8: noqa
 # type: ignore
 # pylint: skip-file
-prefixes  # unused function (src/pdfa_learning/learn_pdfa/utils/base.py:17)
-prefix_distance_infty_norm  # unused function (src/pdfa_learning/learn_pdfa/utils/base.py:41)
-_  # unused function (src/pdfa_learning/learn_pdfa/utils/base.py:71)
-_  # unused function (src/pdfa_learning/learn_pdfa/utils/base.py:76)
-_  # unused function (src/pdfa_learning/learn_pdfa/utils/base.py:81)
-_  # unused function (src/pdfa_learning/learn_pdfa/utils/base.py:86)
-_  # unused function (src/pdfa_learning/learn_pdfa/utils/base.py:96)
-_  # unused function (src/pdfa_learning/learn_pdfa/utils/base.py:101)
-_  # unused function (src/pdfa_learning/learn_pdfa/utils/base.py:106)
-_  # unused function (src/pdfa_learning/learn_pdfa/utils/base.py:111)
-_  # unused function (src/pdfa_learning/learn_pdfa/utils/base.py:130)
-_  # unused function (src/pdfa_learning/learn_pdfa/utils/base.py:136)
-SimpleGenerator  # unused class (src/pdfa_learning/learn_pdfa/utils/generator.py:25)
-MultiprocessedGenerator  # unused class (src/pdfa_learning/learn_pdfa/utils/generator.py:43)
-_.elements  # unused method (src/pdfa_learning/learn_pdfa/utils/multiset/base.py:43)
-_._parent  # unused attribute (src/pdfa_learning/learn_pdfa/utils/multiset/tree.py:39)
-node_to_graphviz  # unused function (src/pdfa_learning/learn_pdfa/utils/multiset/tree.py:271)
-_.get_successor  # unused method (src/pdfa_learning/pdfa/base.py:52)
-_.final_symbol  # unused property (src/pdfa_learning/pdfa/base.py:102)
-to_graphviz  # unused function (src/pdfa_learning/pdfa/render.py:15)
-to_graphviz_from_graph  # unused function (src/pdfa_learning/pdfa/render.py:57)
+get_profiler  # unused function (src/pdfa_learning/helpers/profiling.py:228)
+profile  # unused function (src/pdfa_learning/helpers/profiling.py:303)
+max_interval_width  # unused variable (src/pdfa_learning/learn_pdfa/adaptive.py:63)
+learn_pdfa_adaptive  # unused function (src/pdfa_learning/learn_pdfa/adaptive.py:101)
+_.relearnt  # unused attribute (src/pdfa_learning/learn_pdfa/balle/core.py:451)
+_.nb_vertices  # unused attribute (src/pdfa_learning/learn_pdfa/balle/core.py:597)
+_.nb_vertices  # unused attribute (src/pdfa_learning/learn_pdfa/balle/streaming.py:379)
+_.nb_vertices  # unused attribute (src/pdfa_learning/learn_pdfa/palmer/learn_subgraph.py:188)
+required_sample_sizes  # unused variable (src/pdfa_learning/learn_pdfa/planner.py:108)
+sample_sizes  # unused variable (src/pdfa_learning/learn_pdfa/planner.py:109)
+expected_tree_size  # unused variable (src/pdfa_learning/learn_pdfa/planner.py:111)
+_.is_feasible  # unused method (src/pdfa_learning/learn_pdfa/planner.py:116)
+plan_learning  # unused function (src/pdfa_learning/learn_pdfa/planner.py:139)
+prefixes  # unused function (src/pdfa_learning/learn_pdfa/utils/base.py:43)
+prefix_distance_infty_norm  # unused function (src/pdfa_learning/learn_pdfa/utils/base.py:94)
+_  # unused function (src/pdfa_learning/learn_pdfa/utils/base.py:133)
+_  # unused function (src/pdfa_learning/learn_pdfa/utils/base.py:138)
+_  # unused function (src/pdfa_learning/learn_pdfa/utils/base.py:143)
+_  # unused function (src/pdfa_learning/learn_pdfa/utils/base.py:148)
+_  # unused function (src/pdfa_learning/learn_pdfa/utils/base.py:158)
+_  # unused function (src/pdfa_learning/learn_pdfa/utils/base.py:163)
+_  # unused function (src/pdfa_learning/learn_pdfa/utils/base.py:168)
+_  # unused function (src/pdfa_learning/learn_pdfa/utils/base.py:173)
+_  # unused function (src/pdfa_learning/learn_pdfa/utils/base.py:195)
+_  # unused function (src/pdfa_learning/learn_pdfa/utils/base.py:206)
+_  # unused function (src/pdfa_learning/learn_pdfa/utils/base.py:212)
+SimpleGenerator  # unused class (src/pdfa_learning/learn_pdfa/utils/generator.py:45)
+MultiprocessedGenerator  # unused class (src/pdfa_learning/learn_pdfa/utils/generator.py:61)
+nb_vertices  # unused variable (src/pdfa_learning/learn_pdfa/utils/metrics.py:62)
+relearnt  # unused variable (src/pdfa_learning/learn_pdfa/utils/metrics.py:63)
+MetricsRecorder  # unused class (src/pdfa_learning/learn_pdfa/utils/metrics.py:101)
+JsonLinesWriter  # unused class (src/pdfa_learning/learn_pdfa/utils/metrics.py:121)
+_.elements  # unused method (src/pdfa_learning/learn_pdfa/utils/multiset/base.py:64)
+_._parent  # unused attribute (src/pdfa_learning/learn_pdfa/utils/multiset/tree.py:73)
+node_to_graphviz  # unused function (src/pdfa_learning/learn_pdfa/utils/multiset/tree.py:427)
+_.get_successor  # unused method (src/pdfa_learning/pdfa/base.py:79)
+_.get_successors  # unused method (src/pdfa_learning/pdfa/base.py:97)
+_.final_symbol  # unused property (src/pdfa_learning/pdfa/base.py:129)
+_.length_distribution  # unused method (src/pdfa_learning/pdfa/compiled.py:181)
+total_variation_bounds  # unused function (src/pdfa_learning/pdfa/distances.py:207)
+minimize  # unused function (src/pdfa_learning/pdfa/minimize.py:124)
+are_equivalent  # unused function (src/pdfa_learning/pdfa/minimize.py:178)
+make_random_pdfa  # unused function (src/pdfa_learning/pdfa/random_pdfa.py:37)
+to_graphviz  # unused function (src/pdfa_learning/pdfa/render.py:36)
+to_graphviz_from_graph  # unused function (src/pdfa_learning/pdfa/render.py:78)
+fell_off  # unused variable (src/pdfa_learning/pdfa/scorer.py:50)
+next_distributions  # unused variable (src/pdfa_learning/pdfa/scorer.py:51)
+StreamScorer  # unused class (src/pdfa_learning/pdfa/scorer.py:54)
+_.log_likelihoods  # unused property (src/pdfa_learning/pdfa/scorer.py:107)
+_.advance  # unused method (src/pdfa_learning/pdfa/scorer.py:122)
+save  # unused function (src/pdfa_learning/pdfa/serialization.py:86)
+load  # unused function (src/pdfa_learning/pdfa/serialization.py:105)
+from_json  # unused function (src/pdfa_learning/pdfa/serialization.py:187)
@@ -20,6 +20,8 @@
 # along with pdfa-learning.  If not, see <https://www.gnu.org/licenses/>.
 #
 """Base helper module."""
+from typing import Any, Callable
+
 from pdfa_learning.types import TransitionFunctionDict
 
 
@@ -40,3 +42,28 @@ def normalize(f: TransitionFunctionDict) -> TransitionFunctionDict:
             result[start][char] = (end, prob / total)
 
     return result
+
+
+class LazyFormat:
+    """
+    A log argument formatted only when the log record is emitted.
+
+    E.g. 'logger.info("Transitions: %s", LazyFormat(pprint.pformat, transitions))'
+    does not format the transitions if the INFO level is disabled.
+    """
+
+    __slots__ = ("_function", "_args")
+
+    def __init__(self, function: Callable[..., Any], *args: Any):
+        """
+        Initialize the lazy argument.
+
+        :param function: the function that computes the payload.
+        :param args: the arguments of the function.
+        """
+        self._function = function
+        self._args = args
+
+    def __str__(self) -> str:
+        """Compute and format the payload."""
+        return str(self._function(*self._args))
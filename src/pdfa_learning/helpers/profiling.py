@@ -0,0 +1,339 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020 Marco Favorito
+#
+# ------------------------------
+#
+# This file is part of pdfa-learning.
+#
+# pdfa-learning is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pdfa-learning is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with pdfa-learning.  If not, see <https://www.gnu.org/licenses/>.
+#
+"""
+Opt-in profiling of the hot paths of the package.
+
+The functions decorated with 'hot_path' are timed only while profiling is enabled:
+- with the context manager 'profile()' (or with 'enable()' and 'disable()'),
+  the decorated functions are replaced by timed wrappers, in their classes and
+  in the modules of the package that refer to them, and restored afterwards;
+- if the environment variable PDFA_LEARNING_PROFILE is set when the package
+  is imported, the wrappers are installed once and for all, and the profile
+  is dumped at exit: on the standard error if the value is '1', otherwise
+  on the file it names (see 'Profiler.dump' for the formats).
+
+The counters (see 'increment') are kept along with the timers: the prefix-tree
+nodes created by adding a sample (counted once per sample, not in the
+insertion loop), the traces sampled, and, for each learning algorithm, the
+candidate nodes, the prefix-tree nodes visited, and the tests made or pruned.
+
+When profiling is disabled, the decorated functions are the original ones,
+so there is no overhead, besides a check in 'increment'. The profiler is not thread-safe, and the calls in
+other processes are not recorded.
+"""
+
+import atexit
+import functools
+import json
+import marshal
+import os
+import sys
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, Tuple, TypeVar, Union
+
+PROFILE_ENV_VARIABLE = "PDFA_LEARNING_PROFILE"
+PACKAGE_NAME = "pdfa_learning"
+
+_Path = Tuple[str, ...]
+_F = TypeVar("_F", bound=Callable[..., Any])
+
+
+class Profiler:
+    """
+    Timers and counters of the hot paths.
+
+    The timers are kept by call path, i.e. the sequence of the hot paths
+    on the stack; a hot path that calls another one does not include it
+    in its self time.
+    """
+
+    def __init__(self):
+        """Initialize the profiler."""
+        self._stats: Dict[_Path, List[float]] = {}
+        self._stack: List[List[Any]] = []
+        self._locations: Dict[str, Tuple[str, int]] = {}
+        self.counters: Dict[str, int] = {}
+
+    def reset(self) -> None:
+        """Discard the recorded timers and counters."""
+        self._stats = {}
+        self._stack = []
+        self.counters = {}
+
+    def enter(self, name: str) -> None:
+        """Start timing a call."""
+        path = self._stack[-1][0] + (name,) if len(self._stack) > 0 else (name,)
+        self._stack.append([path, time.perf_counter(), 0.0])
+
+    def exit(self) -> None:
+        """Stop timing the last call."""
+        end = time.perf_counter()
+        path, start, children_time = self._stack.pop()
+        elapsed = end - start
+        stats = self._stats.get(path)
+        if stats is None:
+            stats = self._stats[path] = [0, 0.0, 0.0]
+        stats[0] += 1
+        stats[1] += elapsed
+        stats[2] += elapsed - children_time
+        if len(self._stack) > 0:
+            self._stack[-1][2] += elapsed
+
+    def increment(self, name: str, value: int = 1) -> None:
+        """Increment a counter."""
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def get_report(self) -> List[Dict[str, Any]]:
+        """
+        Get the flat report: for each hot path, the calls, the total and the self time.
+
+        The recursive calls are not counted twice in the total time.
+
+        :return: the rows of the report, by decreasing total time.
+        """
+        rows: Dict[str, Dict[str, Any]] = {}
+        for path, (calls, total_time, self_time) in self._stats.items():
+            name = path[-1]
+            row = rows.setdefault(
+                name, dict(name=name, calls=0, total_time=0.0, self_time=0.0)
+            )
+            row["calls"] += calls
+            row["self_time"] += self_time
+            if name not in path[:-1]:
+                row["total_time"] += total_time
+        return sorted(rows.values(), key=lambda row: -row["total_time"])
+
+    def format_report(self) -> str:
+        """Format the flat report, and the counters, as a table."""
+        lines = [f"{'name':<50} {'calls':>10} {'total (s)':>12} {'self (s)':>12}"]
+        for row in self.get_report():
+            lines.append(
+                f"{row['name']:<50} {row['calls']:>10} "
+                f"{row['total_time']:>12.6f} {row['self_time']:>12.6f}"
+            )
+        for name, value in sorted(self.counters.items()):
+            lines.append(f"{name:<50} {value:>10}")
+        return "\n".join(lines)
+
+    def to_speedscope(self) -> Dict[str, Any]:
+        """
+        Get the profile in the speedscope format.
+
+        Every call path is a sample, weighted by its self time.
+        See https://www.speedscope.app/file-format-schema.json.
+        """
+        names = sorted({name for path in self._stats for name in path})
+        frame_index = {name: index for index, name in enumerate(names)}
+        frames = []
+        for name in names:
+            filename, line = self._locations.get(name, ("", 0))
+            frames.append(dict(name=name, file=filename, line=line))
+        paths = sorted(self._stats)
+        weights = [self._stats[path][2] for path in paths]
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "shared": {"frames": frames},
+            "profiles": [
+                {
+                    "type": "sampled",
+                    "name": PACKAGE_NAME,
+                    "unit": "seconds",
+                    "startValue": 0.0,
+                    "endValue": sum(weights),
+                    "samples": [[frame_index[name] for name in path] for path in paths],
+                    "weights": weights,
+                }
+            ],
+            "name": PACKAGE_NAME,
+            "activeProfileIndex": 0,
+            "exporter": PACKAGE_NAME,
+        }
+
+    def to_pstats(self) -> Dict[Tuple[str, int, str], Tuple]:
+        """Get the profile in the format of the statistics of 'pstats'."""
+        stats: Dict[Tuple[str, int, str], List[Any]] = {}
+
+        def key(name: str) -> Tuple[str, int, str]:
+            filename, line = self._locations.get(name, ("~", 0))
+            return filename, line, name
+
+        for path, (calls, total_time, self_time) in self._stats.items():
+            name = path[-1]
+            is_primitive = name not in path[:-1]
+            primitive_calls = calls if is_primitive else 0
+            cumulative_time = total_time if is_primitive else 0.0
+            entry = stats.setdefault(key(name), [0, 0, 0.0, 0.0, {}])
+            entry[0] += primitive_calls
+            entry[1] += calls
+            entry[2] += self_time
+            entry[3] += cumulative_time
+            if len(path) > 1:
+                callers = entry[4]
+                caller = key(path[-2])
+                old = callers.get(caller, (0, 0, 0.0, 0.0))
+                callers[caller] = (
+                    old[0] + primitive_calls,
+                    old[1] + calls,
+                    old[2] + self_time,
+                    old[3] + cumulative_time,
+                )
+        return {k: tuple(v) for k, v in stats.items()}
+
+    def dump(self, path: Union[str, Path]) -> None:
+        """
+        Write the profile on a file; the format depends on the file name.
+
+        - '*.speedscope.json': the speedscope format;
+        - '*.prof' or '*.pstats': the 'pstats' format (e.g. 'pstats.Stats(path)');
+        - otherwise, the flat report.
+
+        :param path: the path of the file.
+        """
+        path = Path(path)
+        if path.name.endswith(".speedscope.json"):
+            path.write_text(json.dumps(self.to_speedscope()))
+        elif path.suffix in {".prof", ".pstats"}:
+            with path.open("wb") as f:
+                marshal.dump(self.to_pstats(), f)
+        else:
+            path.write_text(self.format_report() + "\n")
+
+
+_profiler = Profiler()
+_hot_paths: List[Tuple[str, Callable]] = []
+_patches: List[Tuple[Any, str, Any]] = []
+_from_environment = os.environ.get(PROFILE_ENV_VARIABLE, "") != ""
+
+
+def get_profiler() -> Profiler:
+    """Get the profiler of the package."""
+    return _profiler
+
+
+def is_enabled() -> bool:
+    """Check whether profiling is enabled."""
+    return _from_environment or len(_patches) > 0
+
+
+def _make_wrapper(name: str, function: Callable) -> Callable:
+    """Make a timed wrapper of a function."""
+
+    @functools.wraps(function)
+    def wrapper(*args, **kwargs):
+        _profiler.enter(name)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            _profiler.exit()
+
+    return wrapper
+
+
+def hot_path(function: _F) -> _F:
+    """
+    Register a function (or a method) as a hot path of the package.
+
+    :param function: the function.
+    :return: the same function, or its timed wrapper if profiling has been
+      enabled by the environment variable.
+    """
+    name = function.__qualname__
+    code = function.__code__
+    _profiler._locations[name] = (code.co_filename, code.co_firstlineno)
+    if _from_environment:
+        return _make_wrapper(name, function)  # type: ignore
+    _hot_paths.append((name, function))
+    return function
+
+
+def _get_references(function: Callable) -> Iterator[Tuple[Any, str]]:
+    """Get the classes and the modules of the package that refer to a function."""
+    owner: Any = sys.modules[function.__module__]
+    *owner_path, attribute = function.__qualname__.split(".")
+    for part in owner_path:
+        owner = getattr(owner, part)
+    if owner.__dict__.get(attribute) is function:
+        yield owner, attribute
+    for module_name, module in list(sys.modules.items()):
+        if module is None or not module_name.startswith(PACKAGE_NAME):
+            continue
+        for module_attribute, value in list(vars(module).items()):
+            if value is function and (module, module_attribute) != (owner, attribute):
+                yield module, module_attribute
+
+
+def enable() -> None:
+    """Replace the hot paths with their timed wrappers."""
+    if is_enabled():
+        return
+    for name, function in _hot_paths:
+        wrapper = _make_wrapper(name, function)
+        for owner, attribute in _get_references(function):
+            _patches.append((owner, attribute, function))
+            setattr(owner, attribute, wrapper)
+
+
+def disable() -> None:
+    """Restore the original hot paths."""
+    while len(_patches) > 0:
+        owner, attribute, function = _patches.pop()
+        setattr(owner, attribute, function)
+
+
+@contextmanager
+def profile(reset: bool = True) -> Iterator[Profiler]:
+    """
+    Enable profiling in a context.
+
+    :param reset: discard the timers and counters recorded before.
+    :return: the profiler.
+    """
+    was_enabled = is_enabled()
+    if reset:
+        _profiler.reset()
+    enable()
+    try:
+        yield _profiler
+    finally:
+        if not was_enabled:
+            disable()
+
+
+def increment(name: str, value: int = 1) -> None:
+    """Increment a counter, if profiling is enabled."""
+    if _from_environment or len(_patches) > 0:
+        _profiler.increment(name, value)
+
+
+def _dump_at_exit() -> None:
+    """Dump the profile, as requested by the environment variable."""
+    destination = os.environ.get(PROFILE_ENV_VARIABLE, "")
+    if destination == "1":
+        print(_profiler.format_report(), file=sys.stderr)
+    else:
+        _profiler.dump(destination)
+
+
+if _from_environment:
+    atexit.register(_dump_at_exit)
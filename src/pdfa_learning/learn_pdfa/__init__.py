@@ -32,6 +32,4 @@ Package that contains the implementation of [1].
 import logging
 
 logger = logging.getLogger(__name__)
-logging.basicConfig(
-    level=logging.DEBUG, format="[%(asctime)s][%(name)s][%(levelname)s] %(message)s"
-)
+logger.addHandler(logging.NullHandler())
@@ -0,0 +1,264 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020 Marco Favorito
+#
+# ------------------------------
+#
+# This file is part of pdfa-learning.
+#
+# pdfa-learning is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pdfa-learning is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with pdfa-learning.  If not, see <https://www.gnu.org/licenses/>.
+#
+"""Adaptive sampling: learn from growing samples, until the estimates converge."""
+from collections import deque
+from dataclasses import dataclass
+from math import ceil, log, sqrt
+from typing import Deque, Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from pdfa_learning.helpers.base import assert_
+from pdfa_learning.learn_pdfa import logger
+from pdfa_learning.learn_pdfa.base import Algorithm, SampleTooSmallError, learn_pdfa
+from pdfa_learning.learn_pdfa.palmer.learn_probabilities import (
+    _count_observations,
+    _make_transition_table,
+)
+from pdfa_learning.learn_pdfa.utils.generator import Generator
+from pdfa_learning.learn_pdfa.utils.packed import PackedSample
+from pdfa_learning.pdfa import PDFA
+from pdfa_learning.pdfa.base import FINAL_STATE
+from pdfa_learning.types import Word
+
+Structure = Tuple[int, Tuple[Tuple[int, int, int], ...]]
+
+
+@dataclass(frozen=True)
+class AdaptiveResult:
+    """
+    The result of an adaptive learning run.
+
+    pdfa: the learnt PDFA.
+    nb_samples: the number of traces drawn from the generator.
+    nb_rounds: the number of rounds.
+    converged: True if the stopping criterion was met before the sample budget.
+    max_interval_width: the largest half-width of the confidence
+      intervals of the probabilities, in the last round.
+    """
+
+    pdfa: PDFA
+    nb_samples: int
+    nb_rounds: int
+    converged: bool
+    max_interval_width: float
+
+
+class _CachingGenerator(Generator):
+    """
+    Generator that remembers the traces it has drawn.
+
+    The traces are read from the cache with a cursor, so consecutive requests
+    get different traces, and new traces are drawn only when the cache is
+    exhausted. Rewinding the cursor at each round makes the sample of a round
+    extend the previous one.
+    """
+
+    def __init__(self, generator: Generator):
+        """Initialize."""
+        self._generator = generator
+        self.cache: List[Word] = []
+        self.cursor = 0
+        # the positions in the cache of the requests since the last rewind
+        self.request_starts: List[int] = []
+
+    def rewind(self) -> None:
+        """Read again the cache from the beginning."""
+        self.cursor = 0
+        self.request_starts = []
+
+    def sample(self, n: int = 1) -> Sequence[Word]:
+        """Get the next n traces."""
+        end = self.cursor + n
+        if end > len(self.cache):
+            new_traces = self._generator.sample(n=end - len(self.cache))
+            self.cache.extend(tuple(trace) for trace in new_traces)
+        self.request_starts.append(self.cursor)
+        result = self.cache[self.cursor : end]
+        self.cursor = end
+        return result
+
+
+def learn_pdfa_adaptive(
+    algorithm: Algorithm = Algorithm.BALLE,
+    initial_size: int = 1000,
+    growth_factor: float = 2.0,
+    max_samples: int = 10 ** 7,
+    stable_rounds: int = 2,
+    confidence: float = 0.05,
+    **kwargs,
+) -> AdaptiveResult:
+    """
+    PAC-learn a PDFA from samples of growing size, until the estimates converge.
+
+    At each round, the sample of the previous round is extended by a factor,
+    and the PDFA is learnt again. The learning stops when:
+
+    - the structure of the PDFA has not changed for 'stable_rounds' rounds, and
+    - the half-width of the (Hoeffding) confidence intervals of the probabilities
+      of the visited states is at most 'epsilon' (taken from the parameters,
+      or 0.1 by default), simultaneously with probability 1 - confidence.
+
+    For Palmer's algorithm, the sample of a round is split in halves between
+    its two phases, so that the probabilities are estimated on traces that were
+    not used to learn the structure; 'm0_max_debug' should be provided, since the
+    theoretical m0 is huge.
+
+    :param algorithm: the learning algorithm.
+    :param initial_size: the sample size of the first round.
+    :param growth_factor: the factor the sample size is multiplied by at each round.
+    :param max_samples: the maximum number of traces to draw.
+    :param stable_rounds: the number of rounds the structure must not change for.
+    :param confidence: the failure probability of the confidence intervals.
+    :param kwargs: the keyword arguments of the algorithm,
+      including the sample generator.
+    :return: the result, with the learnt PDFA and the number of drawn traces.
+    """
+    assert_(
+        initial_size > (1 if algorithm == Algorithm.PALMER else 0),
+        "Initial size too small.",
+    )
+    assert_(growth_factor > 1.0, "Growth factor must be greater than one.")
+    assert_(stable_rounds > 0, "Stable rounds must be greater than zero.")
+    assert_(0.0 < confidence < 1.0, "Confidence must be a non-zero probability.")
+    assert_(
+        kwargs.get("sample_generator") is not None,
+        "Adaptive learning requires a sample generator.",
+    )
+    epsilon = kwargs.get("epsilon", 0.1)
+    generator = _CachingGenerator(kwargs.pop("sample_generator"))
+
+    size = min(initial_size, max_samples)
+    nb_rounds = 0
+    structures: Deque[Structure] = deque(maxlen=stable_rounds + 1)
+    while True:
+        nb_rounds += 1
+        round_kwargs = _round_kwargs(algorithm, size, kwargs)
+        generator.rewind()
+        try:
+            pdfa = learn_pdfa(algorithm, sample_generator=generator, **round_kwargs)
+        except SampleTooSmallError as e:
+            # e.g. with Palmer's algorithm, no candidate node reached m0 traces
+            if size >= max_samples:
+                raise
+            logger.info(f"Round {nb_rounds}: {size} samples, no valid PDFA: {e}")
+            structures.clear()
+            size = min(ceil(size * growth_factor), max_samples)
+            continue
+        structures.append(_get_structure(pdfa))
+        width = _max_interval_width(
+            pdfa, _estimation_sample(algorithm, generator), confidence
+        )
+        is_stable = len(structures) == structures.maxlen and len(set(structures)) == 1
+        logger.info(
+            f"Round {nb_rounds}: {size} samples, {pdfa.nb_states} states, "
+            f"stable={is_stable}, max interval width={width}."
+        )
+        converged = is_stable and width <= epsilon
+        if converged or size >= max_samples:
+            return AdaptiveResult(
+                pdfa=pdfa,
+                nb_samples=len(generator.cache),
+                nb_rounds=nb_rounds,
+                converged=converged,
+                max_interval_width=width,
+            )
+        size = min(ceil(size * growth_factor), max_samples)
+
+
+def _round_kwargs(algorithm: Algorithm, size: int, kwargs: Dict) -> Dict:
+    """Get the keyword arguments of the algorithm for a round."""
+    result = dict(kwargs)
+    if algorithm == Algorithm.PALMER:
+        result["n1_max_debug"] = size // 2
+        result["n2_max_debug"] = size - size // 2
+    else:
+        result["nb_samples"] = size
+    return result
+
+
+def _estimation_sample(
+    algorithm: Algorithm, generator: _CachingGenerator
+) -> Sequence[Word]:
+    """
+    Get the traces the probabilities of the last round were estimated from.
+
+    With Palmer's algorithm, the first request is the sample of the subgraph
+    phase, and the following ones are the chunks of the estimation phase.
+    """
+    start = 0
+    if algorithm == Algorithm.PALMER and len(generator.request_starts) > 1:
+        start = generator.request_starts[1]
+    return generator.cache[start : generator.cursor]
+
+
+def _get_structure(pdfa: PDFA) -> Structure:
+    """
+    Get the structure of a PDFA, regardless of the probabilities and state names.
+
+    States are renamed in the order of a breadth-first visit from the initial state,
+    where characters are read in increasing order. Transitions with zero
+    probability are ignored.
+    """
+    renaming = {pdfa.initial_state: 0, FINAL_STATE: FINAL_STATE}
+    queue: Deque[int] = deque([pdfa.initial_state])
+    edges = []
+    while len(queue) > 0:
+        state = queue.popleft()
+        for character, (next_state, probability) in sorted(
+            pdfa.transition_dict[state].items()
+        ):
+            if probability == 0.0:
+                continue
+            if next_state not in renaming:
+                renaming[next_state] = len(renaming) - 1
+                queue.append(next_state)
+            edges.append((renaming[state], character, renaming[next_state]))
+    return len(renaming) - 1, tuple(edges)
+
+
+def _max_interval_width(
+    pdfa: PDFA, samples: Sequence[Word], confidence: float
+) -> float:
+    """
+    Get the largest half-width of the confidence intervals of the probabilities.
+
+    The visits to each state are counted by reading the sample with the PDFA,
+    and the Hoeffding bound is applied to every probability to be estimated,
+    with a union bound over all of them. The states never visited are ignored.
+    """
+    table = _make_transition_table(
+        {
+            state: {c: next_state for c, (next_state, _) in out.items()}
+            for state, out in pdfa.transition_dict.items()
+        },
+        pdfa.nb_states,
+        pdfa.alphabet_size,
+    )
+    counts = np.zeros(table.size, dtype=np.int64)
+    _count_observations(PackedSample.from_words(samples), table, counts)
+    visits = counts.reshape(table.shape).sum(axis=1)
+    visits = visits[visits > 0]
+    if len(visits) == 0:
+        return float("inf")
+    nb_estimates = pdfa.nb_states * (pdfa.alphabet_size + 1)
+    return sqrt(log(2 * nb_estimates / confidence) / (2 * int(visits.min())))
@@ -21,27 +21,31 @@
 #
 """Entrypoint for the algorithm."""
 import pprint
+import time
 from abc import ABC
 from copy import deepcopy
 from math import log, sqrt
-from typing import Dict, Set, Tuple, Type, cast
+from typing import Collection, Dict, Mapping, Optional, Sequence, Set, Tuple, Type, cast
 
-from pdfa_learning.helpers.base import normalize
+from pdfa_learning.helpers.base import LazyFormat, normalize
+from pdfa_learning.helpers.profiling import hot_path
 from pdfa_learning.learn_pdfa import logger
 from pdfa_learning.learn_pdfa.balle.params import BalleParams
-from pdfa_learning.learn_pdfa.utils.base import (
-    MultisetLike,
-    get_prefix_probability,
-    size,
-)
+from pdfa_learning.learn_pdfa.base import make_learnt_pdfa
+from pdfa_learning.learn_pdfa.utils.base import MultisetLike, size
+from pdfa_learning.learn_pdfa.utils.metrics import IterationMetrics, notify
+from pdfa_learning.learn_pdfa.utils.multiset.base import SuccessorCounts
 from pdfa_learning.learn_pdfa.utils.multiset.tree import (
     Node,
     PrefixTreeMultiset,
     ReadOnlyPrefixTreeMultiset,
+    TreeMultisetLike,
+    infty_norm,
+    prefix_infty_norm,
 )
 from pdfa_learning.pdfa import PDFA
 from pdfa_learning.pdfa.base import FINAL_STATE, FINAL_SYMBOL
-from pdfa_learning.types import Character, State, TransitionFunctionDict
+from pdfa_learning.types import Character, State, TransitionFunctionDict, Word
 
 ConcreteMultiset = PrefixTreeMultiset
 
@@ -56,11 +60,16 @@ def learn_pdfa(**kwargs) -> PDFA:
     :return: the learnt PDFA.
     """
     params = BalleParams(**kwargs)
-    logger.info(f"Parameters: {pprint.pformat(str(params))}")
+    logger.info("Parameters: %s", LazyFormat(lambda: pprint.pformat(str(params))))
     automaton = Learner(params).learn()
     return automaton
 
 
+def _get_tree_multiset(multiset: MultisetLike) -> TreeMultisetLike:
+    """Get a multiset as a prefix-tree based multiset."""
+    return cast(TreeMultisetLike, multiset)
+
+
 def _compute_threshold(m_u, m_v, s_u, s_v, delta):
     """Compute distinctness threshold."""
     n1 = 2 / min(m_u, m_v)
@@ -74,6 +83,9 @@ class Learner(ABC):
     def __init__(self, params: BalleParams):
         """Initialize the learner."""
         self._params = params
+        self._manager: Optional[SampleMultisetManager] = None
+        self._graph: Optional[Graph] = None
+        self._candidate_nodes: Optional[CandidateNodesCalculator] = None
 
     @property
     def params(self) -> BalleParams:
@@ -92,7 +104,65 @@ class Learner(ABC):
         candidate_nodes = CandidateNodesCalculator(manager.multiset_cls, manager, graph)
         while not candidate_nodes.do_iteration():
             continue
-        return PDFAConstructor(graph, manager).get()
+        self._manager, self._graph, self._candidate_nodes = (
+            manager,
+            graph,
+            candidate_nodes,
+        )
+        return _construct_pdfa(graph, manager)
+
+    def update(self, samples: Collection[Word]) -> PDFA:
+        """
+        Update the learnt PDFA with a new batch of traces.
+
+        The traces are inserted in the existing prefix tree, and the decisions
+        whose multisets have changed are tested again (see
+        'CandidateNodesCalculator.recheck_decisions'). If they all still hold,
+        only the candidate nodes reached by the new traces are processed;
+        otherwise, the graph is learnt again from scratch on the whole prefix tree,
+        with a warning, and the metrics of the next iteration are marked as 'relearnt'.
+        Then, the probabilities are estimated again.
+
+        :param samples: the new batch of traces.
+        :return: the updated PDFA.
+        """
+        manager, graph, candidate_nodes = (
+            self._manager,
+            self._graph,
+            self._candidate_nodes,
+        )
+        if manager is None or graph is None or candidate_nodes is None:
+            raise ValueError("The learner must learn a PDFA before updating it.")
+        traces = [tuple(s) for s in samples]
+        logger.info(f"Updating the PDFA with {len(traces)} new traces.")
+        manager.add_samples(traces)
+        root = cast(PrefixTreeMultiset, manager.main_multiset)._node
+        updated_transitions = graph.update_multisets(root, traces)
+        if candidate_nodes.recheck_decisions(updated_transitions):
+            logger.warning(
+                "Some decisions do not hold anymore: "
+                "learning the graph again from scratch."
+            )
+            graph = Graph(self.params)
+            graph.add_vertex(graph.initial_state, manager.main_multiset)
+            candidate_nodes.restart(None, graph)
+            self._graph = graph
+        else:
+            candidate_nodes.restart(traces)
+        while not candidate_nodes.do_iteration():
+            continue
+        return _construct_pdfa(graph, manager)
+
+
+def _construct_pdfa(graph: "Graph", manager: "SampleMultisetManager") -> PDFA:
+    """Build the PDFA from the graph and the multisets of its vertices."""
+    vertex2counts: Dict[int, SuccessorCounts] = {
+        vertex: _get_tree_multiset(multiset)
+        for vertex, multiset in graph.vertex2multiset.items()
+    }
+    return PDFAConstructor(
+        graph, manager.params, manager.average_trace_length, vertex2counts
+    ).get()
 
 
 class SampleMultisetManager:
@@ -103,6 +173,9 @@ class SampleMultisetManager:
         self.params = params
         self.multiset_cls = multiset_cls
         self.main_multiset = self.multiset_cls()
+        self.average_trace_length = 0.0
+        self._nb_traces = 0
+        self._total_length = 0
         self._sample_and_update()
 
     def _sample_and_update(self):
@@ -114,9 +187,15 @@ class SampleMultisetManager:
             samples = list(map(lambda x: tuple(x), samples))
         else:
             samples = self.params.dataset
-        self.average_trace_length = sum(map(len, samples)) / len(samples)
-        logger.info(f"Average trace length: {self.average_trace_length}.")
         logger.info("Populate root multiset.")
+        self.add_samples(samples)
+
+    def add_samples(self, samples: Sequence[Word]):
+        """Add traces to the root multiset, and update the average trace length."""
+        self._nb_traces += len(samples)
+        self._total_length += sum(map(len, samples))
+        self.average_trace_length = self._total_length / self._nb_traces
+        logger.info(f"Average trace length: {self.average_trace_length}.")
         self.main_multiset.update(samples)
 
 
@@ -132,26 +211,98 @@ class Graph:
         self.alphabet = set(range(self.params.alphabet_size))
 
         self.vertex2multiset: Dict[int, MultisetLike] = {}
+        self.transition2multiset: Dict[Tuple[State, Character], MultisetLike] = {}
 
     def add_vertex(self, new_vertex, multiset):
         """Add a vertex to the multiset manager."""
         self.vertex2multiset[new_vertex] = multiset
 
+    def add_transition(
+        self,
+        start: State,
+        character: Character,
+        end: State,
+        multiset: Optional[MultisetLike] = None,
+    ):
+        """
+        Add a transition, together with the multiset of the candidate node it comes from.
+
+        :param start: the start vertex.
+        :param character: the character.
+        :param end: the end vertex.
+        :param multiset: the multiset of the candidate node, if it is kept.
+        """
+        self.transitions.setdefault(start, {})[character] = end
+        if multiset is not None:
+            self.transition2multiset[(start, character)] = multiset
+
+    def update_multisets(
+        self, root: Node, traces: Collection[Word]
+    ) -> Set[Tuple[State, Character]]:
+        """
+        Add the prefix-tree nodes reached by new traces to the transition multisets.
+
+        Like for the learning from scratch, a trace contributes to the multiset
+        of a transition only if it reads it through transitions that were
+        in the graph when it was a candidate node, i.e. transitions added
+        before it (the multisets are kept in order of insertion), and only
+        the first time. The multiset of a transition that created a vertex
+        is also the multiset of the vertex.
+
+        :param root: the root of the prefix tree.
+        :param traces: the new traces, already in the prefix tree.
+        :return: the transitions whose multiset has been updated.
+        """
+        transition2index = {
+            transition: index
+            for index, transition in enumerate(self.transition2multiset)
+        }
+        updated: Set[Tuple[State, Character]] = set()
+        for trace in traces:
+            node: Optional[Node] = root
+            state = self.initial_state
+            # the index of the last added transition read so far
+            last_index = -1
+            for character in trace:
+                next_state = self.transitions.get(state, {}).get(character)
+                if node is None or next_state is None:
+                    break
+                node = node.get_child(character)
+                transition = (state, character)
+                index = transition2index[transition]
+                if node is not None and index > last_index:
+                    last_index = index
+                    updated.add(transition)
+                    multiset = self.transition2multiset[transition]
+                    cast(ReadOnlyPrefixTreeMultiset, multiset)._nodes.add(node)
+                state = next_state
+        return updated
+
 
 class PDFAConstructor:
     """Construct the PDFA."""
 
-    def __init__(self, graph: Graph, sample: SampleMultisetManager):
+    def __init__(
+        self,
+        graph: Graph,
+        params: BalleParams,
+        average_trace_length: float,
+        vertex2counts: Mapping[int, SuccessorCounts],
+    ):
         """
         Initialize PDFA constructor.
 
         :param graph: the graph object.
-        :param sample: the sample manager.
+        :param params: the parameters.
+        :param average_trace_length: the average length of the traces, used
+          when the parameters do not give the expected one.
+        :param vertex2counts: the counts of the next characters of the traces
+          of each vertex.
         """
         self.graph = graph
-        self.sample = sample
-
-        self.params = self.sample.params
+        self.params = params
+        self.average_trace_length = average_trace_length
+        self.vertex2counts = vertex2counts
 
     def get(self) -> PDFA:
         """Build the PDFA."""
@@ -161,7 +312,9 @@ class PDFAConstructor:
         new_vertices: Set[int] = deepcopy(self.graph.vertices)
         self._complete_graph(new_vertices, new_transitions)
         pdfa_transitions = self._compute_probabilities(new_transitions)
-        return PDFA(len(new_vertices), len(self.graph.alphabet), pdfa_transitions)
+        return make_learnt_pdfa(
+            len(new_vertices), len(self.graph.alphabet), pdfa_transitions
+        )
 
     def _add_ground_node(
         self, vertices: Set[int], transitions: Dict[int, Dict[Character, int]]
@@ -199,31 +352,47 @@ class PDFAConstructor:
         for vertex in vertices:
             transitions.setdefault(vertex, {})[FINAL_SYMBOL] = final_node
 
-    def _compute_edge_probability(self, state: int, character: int):
-        """Given state and character, compute probability."""
-        multiset = self.graph.vertex2multiset.get(state, ConcreteMultiset())  # type: ignore
-        size = sum(multiset.values())
-        smoothing_probability = (
-            self.params.get_gamma_min(self.sample.average_trace_length)
-            if self.params.with_smoothing
-            else 0.0
-        )
-        if size == 0:
-            return self.params.get_gamma_min(self.sample.average_trace_length)
-        char_prob = get_prefix_probability(multiset, (character,))
-        factor = 1 - (self.params.alphabet_size + 1) * smoothing_probability
-        return char_prob * factor + smoothing_probability
+    def _get_successor_counts(self, state: int) -> Tuple[int, Dict[Character, int]]:
+        """
+        Get the size of the multiset of a state, and the counts of each next character.
+
+        The nodes of the multiset are visited once, for all the characters.
+
+        :param state: the state.
+        :return: the size of the multiset, and the counts of traces by next character.
+        """
+        counts = self.vertex2counts.get(state)
+        if counts is None:
+            return 0, {}
+        return counts.size, counts.get_successor_counts()
 
     def _compute_probabilities(self, transitions: Dict[int, Dict[Character, int]]):
         """Given vertices, transitions and its multisets, estimate edge probabilities."""
         pdfa_transitions: TransitionFunctionDict = {}
+        expected_length = self.params.expected_trace_length
+        if expected_length is None:
+            expected_length = self.average_trace_length
+        gamma_min = self.params.get_gamma_min(expected_length)
+        smoothing_probability = gamma_min if self.params.with_smoothing else 0.0
+        factor = 1 - (self.params.alphabet_size + 1) * smoothing_probability
 
         # compute gammas
         for start, out_transitions in transitions.items():
-            pdfa_transitions[start] = {}
-            for character, next_state in out_transitions.items():
-                probability = self._compute_edge_probability(start, character)
-                pdfa_transitions[start][character] = (next_state, probability)
+            total, successor_counts = self._get_successor_counts(start)
+            if total == 0:
+                pdfa_transitions[start] = {
+                    character: (next_state, gamma_min)
+                    for character, next_state in out_transitions.items()
+                }
+                continue
+            pdfa_transitions[start] = {
+                character: (
+                    next_state,
+                    successor_counts.get(character, 0) / total * factor
+                    + smoothing_probability,
+                )
+                for character, next_state in out_transitions.items()
+            }
 
         # normalize
         pdfa_transitions = normalize(pdfa_transitions)
@@ -256,6 +425,107 @@ class CandidateNodesCalculator:
         self.candidate_nodes_by_transitions: Dict[Tuple[State, Character], int] = {}
         self.candidate_nodes_to_transitions: Dict[int, Tuple[State, Character]] = {}
         self.multisets: Dict[int, MultisetLike] = {}
+        self._traces: Optional[Collection[Word]] = None
+        self._metrics = IterationMetrics("balle", self.iteration)
+        self._is_metrics_notified = False
+        # whether the last iterations stopped at the upper bound, with candidate nodes left
+        self._has_pending_candidates = False
+
+    def restart(
+        self, traces: Optional[Collection[Word]], graph: Optional[Graph] = None
+    ) -> None:
+        """
+        Prepare a new round of iterations, after new traces have been added.
+
+        Only the paths of the prefix tree followed by the given traces are
+        visited, since the candidates of the old traces have already been processed;
+        if the last iterations stopped at the upper bound, with candidate nodes left,
+        the whole prefix tree is visited instead.
+
+        :param traces: the traces to follow. If None, the whole prefix tree is visited.
+        :param graph: if given, the graph to learn again from scratch,
+          instead of the current one.
+        """
+        if graph is not None:
+            self.graph = graph
+            self._get_current_metrics().relearnt = True
+        elif traces is not None and self._has_pending_candidates:
+            logger.info("Some candidate nodes were left: visiting the whole tree.")
+            traces = None
+        self._has_pending_candidates = False
+        self._traces = traces
+        self.iteration_upper_bound = (
+            self.iteration + self.params.n * self.params.alphabet_size
+        )
+
+    def recheck_decisions(self, transitions: Set[Tuple[State, Character]]) -> bool:
+        """
+        Test again the decisions whose multisets have been updated.
+
+        The multiset of a vertex is the one of the transition that created it
+        (the main multiset for the initial vertex). Vertices are numbered in
+        order of creation, and the learning from scratch, with the same
+        multisets, would take the same decisions if:
+
+        - every vertex is distinct from the vertices created before it, and
+        - every other transition is distinct from the vertices created before
+          its end vertex, and not distinct from its end vertex.
+
+        Only the tests with at least one updated multiset are done again.
+        The order in which the candidate nodes are processed, by decreasing size,
+        is not checked. The tests are recorded in the metrics of the next iteration.
+
+        :param transitions: the transitions whose multisets have been updated.
+        :return: True if some decision does not hold anymore, False otherwise.
+        """
+        metrics = self._get_current_metrics()
+        start = time.perf_counter()
+        result = self._has_changed_decision(transitions)
+        metrics.tests_time += time.perf_counter() - start
+        return result
+
+    def _has_changed_decision(self, transitions: Set[Tuple[State, Character]]) -> bool:
+        """Check whether some decision does not hold anymore."""
+        vertex2multiset = self.graph.vertex2multiset
+        updated_multisets = {
+            id(self.graph.transition2multiset[transition]) for transition in transitions
+        }
+        updated_multisets.add(id(vertex2multiset[self.graph.initial_state]))
+        updated_vertices = {
+            vertex
+            for vertex, multiset in vertex2multiset.items()
+            if id(multiset) in updated_multisets
+        }
+        for vertex in sorted(self.graph.vertices):
+            for other in range(vertex):
+                if vertex not in updated_vertices and other not in updated_vertices:
+                    continue
+                if not self._test_distinct_multisets(
+                    vertex2multiset[vertex], vertex2multiset[other]
+                ):
+                    logger.info(
+                        f"Vertex {vertex} is not distinct from {other} anymore."
+                    )
+                    return True
+        for (start, character), multiset in sorted(
+            self.graph.transition2multiset.items()
+        ):
+            end = self.graph.transitions[start][character]
+            if multiset is vertex2multiset[end]:
+                continue
+            is_updated = (start, character) in transitions
+            for other in range(end + 1):
+                if not is_updated and other not in updated_vertices:
+                    continue
+                is_distinct = self._test_distinct_multisets(
+                    multiset, vertex2multiset[other]
+                )
+                if is_distinct == (other == end):
+                    logger.info(
+                        f"Transition ({start}, {character}) does not go to {end} anymore."
+                    )
+                    return True
+        return False
 
     def do_iteration(self) -> bool:
         """
@@ -263,28 +533,71 @@ class CandidateNodesCalculator:
 
         :return: False if the current iteration failed, else True.
         """
+        if self.iteration >= self.iteration_upper_bound:
+            self._has_pending_candidates = not self._is_graph_complete()
+            return True
         logger.info(f"Iteration {self.iteration}")
+        self._get_current_metrics()
+        start = time.perf_counter()
         done = self._reset_and_check_if_done()
         if done:
+            if self._metrics.nb_tests > 0:
+                # the tests done again after an update are reported anyway
+                self._notify_metrics()
             return True
 
         (
             chosen_candidate_node,
             biggest_multiset,
         ) = self.compute_multisets_and_get_biggest()
-        if sum(biggest_multiset.values()) == 0:
+        self._metrics.candidates_time = time.perf_counter() - start
+        self._metrics.candidate_sizes = [
+            (start, character, size(self.multisets[c]) if c in self.multisets else 0)
+            for c, (start, character) in self.candidate_nodes_to_transitions.items()
+        ]
+        if size(biggest_multiset) == 0:
             logger.info("Biggest multiset has cardinality 0, done")
+            self._notify_metrics()
+            self.iteration += 1
             return True
 
+        start = time.perf_counter()
         non_distinct_vertices = self._compute_non_distinct_vertices(
             chosen_candidate_node
         )
+        self._metrics.tests_time += time.perf_counter() - start
+        start = time.perf_counter()
         self._add_new_state_or_edge(chosen_candidate_node, non_distinct_vertices)
+        self._metrics.update_time = time.perf_counter() - start
+        self._notify_metrics()
         # end of iteration
         self.iteration += 1
         done = self.iteration >= self.iteration_upper_bound
+        if done:
+            self._has_pending_candidates = not self._is_graph_complete()
         return done
 
+    def _is_graph_complete(self) -> bool:
+        """Check whether every vertex has a transition for every character."""
+        return all(
+            character in self.graph.transitions.get(vertex, {})
+            for vertex in self.graph.vertices
+            for character in self.graph.alphabet
+        )
+
+    def _get_current_metrics(self) -> IterationMetrics:
+        """Get the metrics of the current iteration, starting them if needed."""
+        if self._is_metrics_notified or self._metrics.iteration != self.iteration:
+            self._metrics = IterationMetrics("balle", self.iteration)
+            self._is_metrics_notified = False
+        return self._metrics
+
+    def _notify_metrics(self):
+        """Notify the metrics of the current iteration to the callbacks."""
+        self._metrics.nb_vertices = len(self.graph.vertices)
+        notify(self.params.callbacks, self._metrics)
+        self._is_metrics_notified = True
+
     def _add_new_state_or_edge(self, candidate_node, non_distinct_vertices):
         (
             start_state,
@@ -300,7 +613,9 @@ class CandidateNodesCalculator:
             new_vertex = len(self.graph.vertices)
             self.graph.vertices.add(new_vertex)
             self.graph.add_vertex(new_vertex, biggest_multiset)
-            self.graph.transitions.setdefault(start_state, {})[character] = new_vertex
+            self.graph.add_transition(
+                start_state, character, new_vertex, biggest_multiset
+            )
         else:
             # pick a safe node that has not distinguished from best candidate.
             # For deterministic behaviour, pick the smallest
@@ -310,10 +625,13 @@ class CandidateNodesCalculator:
                     f"More than one non-distinct vertex: {sorted_non_distinct_vertices}"
                 )
                 logger.warning(
-                    f"Distances and thresholds: {pprint.pformat(non_distinct_vertices)}"
+                    "Distances and thresholds: %s",
+                    LazyFormat(pprint.pformat, non_distinct_vertices),
                 )
             old_vertex = sorted_non_distinct_vertices[0]
-            self.graph.transitions.setdefault(start_state, {})[character] = old_vertex
+            self.graph.add_transition(
+                start_state, character, old_vertex, biggest_multiset
+            )
 
     def _reset_and_check_if_done(self) -> bool:
         """Reset the state, and check if there are candidate nodes."""
@@ -344,33 +662,62 @@ class CandidateNodesCalculator:
     def compute_multisets_and_get_biggest(self) -> Tuple[int, MultisetLike]:
         """Compute multisets for the current iteration, and get biggest multiset."""
         main_multiset = cast(PrefixTreeMultiset, self.multiset_mgr.main_multiset)
-        transitions = self.graph.transitions
         root = main_multiset._node
+        if self._traces is None:
+            self._visit_tree(root)
+        else:
+            self._visit_traces(root, self._traces)
+        return self._get_biggest_multiset()
+
+    def _add_to_candidate(self, transition: Tuple[State, Character], node: Node):
+        """Add a prefix-tree node to the multiset of a candidate node."""
+        candidate_node = self.candidate_nodes_by_transitions[transition]
+        multiset = self.multisets.get(candidate_node)
+        if multiset is None:
+            self.multisets[candidate_node] = ReadOnlyPrefixTreeMultiset({node})
+        else:
+            cast(ReadOnlyPrefixTreeMultiset, multiset)._nodes.add(node)
+
+    def _visit_tree(self, root: Node):
+        """Visit the whole prefix tree to compute the candidate multisets."""
+        transitions = self.graph.transitions
         pdfa_initial_state = 0
 
         def _visit(node: Node, state: State):
+            self._metrics.nodes_visited += 1
             outgoing_from_last: Dict[Character, int] = transitions.get(state, {})
             next_transitions = node.next_transitions()
             for c, n in next_transitions:
                 transition = (state, c)
                 if transition in self.candidate_nodes_by_transitions:
-                    candidate_node = self.candidate_nodes_by_transitions[transition]
-                    multiset = self.multisets.get(candidate_node)
-                    if multiset is None:
-                        self.multisets[candidate_node] = ReadOnlyPrefixTreeMultiset({n})
-                    else:
-                        cast(ReadOnlyPrefixTreeMultiset, multiset)._nodes.add(n)
+                    self._add_to_candidate(transition, n)
                 elif c != FINAL_SYMBOL:
                     _visit(n, outgoing_from_last[c])
 
         _visit(root, pdfa_initial_state)
-        return self._get_biggest_multiset()
+
+    def _visit_traces(self, root: Node, traces: Collection[Word]):
+        """Visit only the paths of some traces to compute the candidate multisets."""
+        transitions = self.graph.transitions
+        pdfa_initial_state = 0
+        for trace in traces:
+            node, state = root, pdfa_initial_state
+            for c in trace:
+                self._metrics.nodes_visited += 1
+                next_node = cast(Node, node.get_child(c))
+                transition = (state, c)
+                if transition in self.candidate_nodes_by_transitions:
+                    self._add_to_candidate(transition, next_node)
+                    break
+                if c == FINAL_SYMBOL:
+                    break
+                node, state = next_node, transitions[state][c]
 
     def _get_biggest_multiset(self) -> Tuple[int, MultisetLike]:
         """Compute the biggest multiset."""
         return max(
             self.multisets.items(),
-            key=lambda x: sum(x[1].values()),
+            key=lambda x: size(x[1]),
             default=(-1, self.multiset_cls()),
         )
 
@@ -394,52 +741,27 @@ class CandidateNodesCalculator:
         """Test distinctness of two vertices."""
         multiset_candidate = self.multisets[chosen_candidate_node]
         multiset_safe = self.graph.vertex2multiset[v]
-        prefixes_candidate = sum(
-            [(len(trace) + 1) * count for trace, count in multiset_candidate.items()]
-        )
-        prefixes_safe = sum(
-            [(len(trace) + 1) * count for trace, count in multiset_safe.items()]
-        )
+        return self._test_distinct_multisets(multiset_candidate, multiset_safe)
+
+    @hot_path
+    def _test_distinct_multisets(
+        self, multiset_candidate: MultisetLike, multiset_safe: MultisetLike
+    ) -> bool:
+        """Test distinctness of two multisets."""
+        self._metrics.nb_tests += 1
         threshold = _compute_threshold(
             size(multiset_candidate),
             size(multiset_safe),
-            prefixes_candidate,
-            prefixes_safe,
+            _get_tree_multiset(multiset_candidate).nb_prefixes,
+            _get_tree_multiset(multiset_safe).nb_prefixes,
             self.params.delta_0,
         )
-
-        return self.test_similar(multiset_candidate, 1.0, multiset_safe, 1.0, threshold)  # type: ignore
-
-    def test_similar(
-        self, m1: PrefixTreeMultiset, p1, m2: PrefixTreeMultiset, p2, t
-    ) -> bool:
-        """
-        Test that two multisets are similar.
-
-        :param m1: the first multiset.
-        :param p1: the probability score so far.
-        :param m2: the second multiset.
-        :param p2: the probability score so far.
-        :param t: the threshold.
-        :return: True if distinct, False otherwise.
-        """
-        if abs(p1 - p2) > t:
-            return True
-
-        if m1 is None or m2 is None:
-            return False
-
-        m1_succ = m1.get_successors()
-        m2_succ = m2.get_successors()
-
-        next_chars = set(m1_succ.keys()).union(set(m2_succ.keys()))
-
-        for next_char in next_chars:
-            next_p1 = p1 * m1.get_prefix_probability([next_char])
-            next_p2 = p2 * m2.get_prefix_probability([next_char])
-            next_m1 = m1_succ.get(next_char, None)
-            next_m2 = m2_succ.get(next_char, None)
-            result = self.test_similar(next_m1, next_p1, next_m2, next_p2, t)  # type: ignore
-            if result is True:
-                return True
-        return False
+        distance_function = (
+            infty_norm if self.params.with_infty_norm else prefix_infty_norm
+        )
+        distance = distance_function(
+            _get_tree_multiset(multiset_candidate),
+            _get_tree_multiset(multiset_safe),
+            threshold=threshold,
+        )
+        return distance > threshold
@@ -22,10 +22,11 @@
 """Params class for Balle's algorithm."""
 import pprint
 from dataclasses import dataclass
-from typing import Collection, Optional
+from typing import Any, Collection, Dict, Optional, Sequence, Sized
 
 from pdfa_learning.helpers.base import assert_
 from pdfa_learning.learn_pdfa.utils.generator import Generator
+from pdfa_learning.learn_pdfa.utils.metrics import IterationCallback
 from pdfa_learning.types import Word
 
 
@@ -41,6 +42,12 @@ class BalleParams:
     delta: the failure probability for the probability estimation.
     mu: the prefix-distinguishability factor.
     n: the upper bound of the number of states.
+    with_infty_norm: if True, the distinctness test uses the L-infty distance
+      between the distributions; otherwise, the prefix L-infty distance.
+    callbacks: functions called with the metrics of every iteration.
+    expected_trace_length: the expected length of the traces, final symbol included,
+      used to compute the smoothing probability; e.g. 'pdfa.compiled.expected_length + 1'
+      when a reference PDFA is available. If None, the average length of the sample.
     """
 
     sample_generator: Optional[Generator] = None
@@ -52,7 +59,9 @@ class BalleParams:
     epsilon: float = 0.1
     with_smoothing: bool = False
     with_ground: bool = False
-    with_infty_norm: bool = True
+    with_infty_norm: bool = False
+    callbacks: Sequence[IterationCallback] = ()
+    expected_trace_length: Optional[float] = None
 
     def __post_init__(self):
         """Validate inputs."""
@@ -64,6 +73,10 @@ class BalleParams:
             ((self.dataset is None) != (self.sample_generator is None)),
             "Only one between dataset and sample generator must be specified.",
         )
+        assert_(
+            self.expected_trace_length is None or self.expected_trace_length > 0,
+            "Expected trace length must be greater than zero.",
+        )
 
     @property
     def delta_0(self) -> float:
@@ -82,19 +95,73 @@ class BalleParams:
         """
         return self.epsilon / 4 / expected_length / (self.alphabet_size + 1)
 
+    def _to_dict(self) -> Dict[str, Any]:
+        """Get the parameters to be shown in the representation."""
+        return {
+            "sample_generator": self.sample_generator,
+            "dataset_size": (
+                len(self.dataset) if isinstance(self.dataset, Sized) else None
+            ),
+            "nb_samples": self.nb_samples,
+            "n": self.n,
+            "alphabet_size": self.alphabet_size,
+            "delta": self.delta,
+            "epsilon": self.epsilon,
+            "with_smoothing": self.with_smoothing,
+            "with_ground": self.with_ground,
+            "with_infty_norm": self.with_infty_norm,
+            "callbacks": self.callbacks,
+            "expected_trace_length": self.expected_trace_length,
+        }
+
     def __repr__(self):
         """Get the representation."""
-        return pprint.pformat(
+        return pprint.pformat(self._to_dict())
+
+
+@dataclass(frozen=True, repr=False)
+class StreamingBalleParams(BalleParams):
+    """
+    Parameters for the streaming variant of the (Balle et al., 2013) algorithm.
+
+    The multisets are replaced by fixed-size sketches, hence the memory
+    does not depend on the number of traces. Besides the parameters of
+    BalleParams (where 'dataset' can be any iterable of traces,
+    and 'nb_samples' is the number of traces drawn from 'sample_generator'):
+
+    batch_size: the number of traces processed before trying to take decisions.
+    mu: the distinguishability of the target; a candidate node is merged
+      to a vertex only when the test threshold is below mu / 2.
+    min_candidate_size: the minimum size of a candidate node to take a decision.
+    sketch_capacity: the number of prefixes monitored by each Space-Saving sketch.
+    sketch_width: the width of each Count-Min sketch.
+    sketch_depth: the depth of each Count-Min sketch.
+    """
+
+    batch_size: int = 1000
+    mu: float = 0.2
+    min_candidate_size: int = 100
+    sketch_capacity: int = 1000
+    sketch_width: int = 4096
+    sketch_depth: int = 4
+
+    def __post_init__(self):
+        """Validate inputs."""
+        super().__post_init__()
+        assert_(self.batch_size > 0, "Batch size must be greater than zero.")
+        assert_(0.0 < self.mu <= 1.0, "Mu must be in (0, 1].")
+
+    def _to_dict(self) -> Dict[str, Any]:
+        """Get the parameters to be shown in the representation."""
+        result = super()._to_dict()
+        result.update(
             {
-                "sample_generator": self.sample_generator,
-                "dataset_size": len(self.dataset) if self.dataset else None,
-                "nb_samples": self.nb_samples,
-                "n": self.n,
-                "alphabet_size": self.alphabet_size,
-                "delta": self.delta,
-                "epsilon": self.epsilon,
-                "with_smoothing": self.with_smoothing,
-                "with_ground": self.with_ground,
-                "with_infty_norm": self.with_infty_norm,
+                "batch_size": self.batch_size,
+                "mu": self.mu,
+                "min_candidate_size": self.min_candidate_size,
+                "sketch_capacity": self.sketch_capacity,
+                "sketch_width": self.sketch_width,
+                "sketch_depth": self.sketch_depth,
             }
         )
+        return result
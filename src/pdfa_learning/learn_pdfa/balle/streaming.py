@@ -0,0 +1,439 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020 Marco Favorito
+#
+# ------------------------------
+#
+# This file is part of pdfa-learning.
+#
+# pdfa-learning is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pdfa-learning is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with pdfa-learning.  If not, see <https://www.gnu.org/licenses/>.
+#
+"""Streaming variant of the algorithm, with bounded memory."""
+import itertools
+import pprint
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple, cast
+
+from pdfa_learning.helpers.base import LazyFormat
+from pdfa_learning.learn_pdfa import logger
+from pdfa_learning.learn_pdfa.balle.core import (
+    Graph,
+    PDFAConstructor,
+    _compute_threshold,
+)
+from pdfa_learning.learn_pdfa.balle.params import StreamingBalleParams
+from pdfa_learning.learn_pdfa.utils.metrics import IterationMetrics, notify
+from pdfa_learning.learn_pdfa.utils.multiset.base import SuccessorCounts
+from pdfa_learning.learn_pdfa.utils.sketch import CountMinSketch, SpaceSaving
+from pdfa_learning.pdfa import PDFA
+from pdfa_learning.pdfa.base import FINAL_SYMBOL
+from pdfa_learning.types import Character, State, Word
+
+_EMPTY_PREFIX_KEY = hash(())
+
+
+def learn_pdfa(**kwargs) -> PDFA:
+    """
+    PAC-learn a PDFA from a stream of traces, with bounded memory.
+
+    This is a wrapper function to the 'StreamingLearner' class, defined below.
+
+    :param kwargs: the keyword arguments of the algorithm (see the StreamingBalleParams class).
+    :return: the learnt PDFA.
+    """
+    params = StreamingBalleParams(**kwargs)
+    logger.info("Parameters: %s", LazyFormat(lambda: pprint.pformat(str(params))))
+    automaton = StreamingLearner(params).learn()
+    return automaton
+
+
+class SketchedMultiset:
+    """
+    Fixed-size summary of a multiset of traces.
+
+    The number of traces and of prefixes, and the counts of the first
+    characters, are exact. The counts of the prefixes are estimated with
+    a Count-Min sketch, and the most frequent prefixes are tracked
+    with a Space-Saving sketch. Prefixes are identified by a chained hash.
+    """
+
+    def __init__(self, capacity: int, width: int, depth: int):
+        """
+        Initialize the multiset.
+
+        :param capacity: the number of prefixes monitored by the Space-Saving sketch.
+        :param width: the width of the Count-Min sketch.
+        :param depth: the depth of the Count-Min sketch.
+        """
+        self.size = 0
+        self.nb_prefixes = 0
+        self._successor_counts: Dict[Character, int] = {}
+        self._heavy_prefixes = SpaceSaving(capacity)
+        self._prefix_counts = CountMinSketch(width, depth)
+
+    def add(self, trace: Word, start: int = 0) -> None:
+        """
+        Add a trace to the multiset.
+
+        :param trace: the trace.
+        :param start: the index where the trace starts (to avoid slicing suffixes).
+        """
+        self.size += 1
+        self.nb_prefixes += len(trace) - start + 1
+        if start < len(trace):
+            first = trace[start]
+            self._successor_counts[first] = self._successor_counts.get(first, 0) + 1
+        key = _EMPTY_PREFIX_KEY
+        for index in range(start, len(trace)):
+            key = hash((key, trace[index]))
+            self._heavy_prefixes.add(key)
+            self._prefix_counts.add(key)
+
+    def get_successor_counts(self) -> Dict[Character, int]:
+        """Get the number of traces that continue with each character."""
+        return dict(self._successor_counts)
+
+    def get_prefix_count(self, key: int) -> int:
+        """Get an upper bound of the number of traces with a certain (hashed) prefix."""
+        estimate = self._prefix_counts.estimate(key)
+        if key in self._heavy_prefixes:
+            return min(estimate, self._heavy_prefixes.get(key))
+        return estimate
+
+    def heavy_prefixes(self) -> Iterator[int]:
+        """Get the (hashed) prefixes monitored by the Space-Saving sketch."""
+        return (cast(int, key) for key, _ in self._heavy_prefixes.items())
+
+
+def sketched_prefix_infty_norm(
+    multiset1: SketchedMultiset, multiset2: SketchedMultiset
+) -> float:
+    """
+    Estimate the prefix L-infty distance between two sketched multisets.
+
+    The maximum is taken over the frequent prefixes monitored by both sketches:
+    the prefixes that are not monitored have low probability in both multisets.
+
+    :param multiset1: the first multiset.
+    :param multiset2: the second multiset.
+    :return: the estimated distance.
+    """
+    card1, card2 = multiset1.size, multiset2.size
+    assert card1 > 0, "Cardinality of multiset shouldn't be zero."
+    assert card2 > 0, "Cardinality of multiset shouldn't be zero."
+    keys = set(multiset1.heavy_prefixes()).union(multiset2.heavy_prefixes())
+    return max(
+        (
+            abs(
+                multiset1.get_prefix_count(key) / card1
+                - multiset2.get_prefix_count(key) / card2
+            )
+            for key in keys
+        ),
+        default=0.0,
+    )
+
+
+class _VisitCounter(SuccessorCounts):
+    """Exact counts of the characters read from a vertex, over all its visits."""
+
+    def __init__(self):
+        """Initialize."""
+        self._size = 0
+        self._successor_counts: Dict[Character, int] = {}
+
+    @property
+    def size(self) -> int:
+        """Get the number of visits."""
+        return self._size
+
+    def add(self, character: Character) -> None:
+        """Count a visit, followed by a character."""
+        self._size += 1
+        self._successor_counts[character] = self._successor_counts.get(character, 0) + 1
+
+    def update(self, size: int, successor_counts: Dict[Character, int]) -> None:
+        """Count several visits, given the counts of the next characters."""
+        self._size += size
+        for character, count in successor_counts.items():
+            self._successor_counts[character] = (
+                self._successor_counts.get(character, 0) + count
+            )
+
+    def get_successor_counts(self) -> Dict[Character, int]:
+        """Get the number of visits that continue with each character."""
+        return dict(self._successor_counts)
+
+
+class StreamingLearner:
+    """
+    Learner of PDFAs from a stream of traces, with bounded memory.
+
+    Traces are processed in batches. Every trace is read along the current
+    graph; its suffix is added to the sketch of the candidate node where it
+    leaves the graph, and to the sketch of the vertices it reaches through
+    the transitions that created them (a new vertex keeps the sketch of
+    its candidate node, as in the non-streaming algorithm).
+    Since transitions are never removed, the characters read from
+    each vertex are counted exactly, and they are used to estimate
+    the probabilities of the PDFA. After each batch, candidate nodes are
+    promoted to vertices when distinct from all the vertices, or merged to a
+    vertex when they are similar with enough confidence.
+    At the end of the stream, the remaining candidate nodes are processed as in
+    the non-streaming algorithm.
+
+    When a candidate node is promoted or merged, the vertex it leads to
+    counts the first characters of all the traces of the candidate node, and
+    the traces of the current batch that stopped at the candidate node
+    are read further, as in the non-streaming algorithm. Hence, a vertex
+    added after the last batch still gets its transitions and probabilities.
+    """
+
+    def __init__(self, params: StreamingBalleParams):
+        """Initialize the learner."""
+        self._params = params
+        self.graph = Graph(params)
+        self._nb_traces = 0
+        self._total_length = 0
+        self.vertex2sketch: Dict[int, SketchedMultiset] = {}
+        self.candidate2sketch: Dict[Tuple[State, Character], SketchedMultiset] = {}
+        self.vertex2visits: Dict[int, _VisitCounter] = {}
+        self._transition2vertex: Dict[Tuple[State, Character], int] = {}
+        # a candidate node is tested again only when its size has doubled
+        self._next_test_size: Dict[Tuple[State, Character], int] = {}
+        # the traces of the current batch that stopped at each candidate node,
+        # with the index of the character read from the candidate node
+        self._stopped_traces: Dict[Tuple[State, Character], List[Tuple[Word, int]]] = {}
+        self.iteration = 0
+        self._add_vertex(self.graph.initial_state, None, self._new_sketch())
+
+    @property
+    def params(self) -> StreamingBalleParams:
+        """Get the parameters."""
+        return self._params
+
+    def learn(self) -> PDFA:
+        """Consume the stream, and build the PDFA."""
+        for batch in self._batches():
+            self.process_batch(batch)
+        self._take_decisions(final=True)
+        average_trace_length = self._total_length / max(self._nb_traces, 1)
+        return PDFAConstructor(
+            self.graph, self.params, average_trace_length, self.vertex2visits
+        ).get()
+
+    def _batches(self) -> Iterator[Sequence[Word]]:
+        """Get the batches of traces from the stream."""
+        batch_size = self.params.batch_size
+        generator = self.params.sample_generator
+        if generator is not None:
+            nb_samples = self.params.nb_samples
+            for start in range(0, nb_samples, batch_size):
+                n = min(batch_size, nb_samples - start)
+                yield [tuple(t) for t in generator.sample(n=n)]
+            return
+        stream = iter(cast(Iterable[Word], self.params.dataset))
+        while True:
+            batch = [tuple(t) for t in itertools.islice(stream, batch_size)]
+            if len(batch) == 0:
+                return
+            yield batch
+
+    def process_batch(self, batch: Sequence[Word]) -> None:
+        """
+        Process a batch of traces, and then take the decisions that are safe.
+
+        :param batch: the batch of traces.
+        """
+        self._stopped_traces = {}
+        self._nb_traces += len(batch)
+        self._total_length += sum(map(len, batch))
+        for trace in batch:
+            self._add_trace(trace)
+        self._take_decisions(final=False)
+
+    def _new_sketch(self) -> SketchedMultiset:
+        """Make a new sketched multiset."""
+        return SketchedMultiset(
+            self.params.sketch_capacity,
+            self.params.sketch_width,
+            self.params.sketch_depth,
+        )
+
+    def _add_vertex(
+        self,
+        vertex: int,
+        transition: Optional[Tuple[State, Character]],
+        sketch: SketchedMultiset,
+    ) -> None:
+        """Add a vertex, together with the sketch of the candidate node it comes from."""
+        self.graph.vertices.add(vertex)
+        self.vertex2sketch[vertex] = sketch
+        self.vertex2visits[vertex] = _VisitCounter()
+        if transition is not None:
+            self._transition2vertex[transition] = vertex
+
+    def _add_trace(self, trace: Word) -> None:
+        """Read a trace along the graph, and update the sketches."""
+        self.vertex2sketch[self.graph.initial_state].add(trace)
+        self._read_trace(trace, 0, self.graph.initial_state, set())
+
+    def _read_trace(
+        self,
+        trace: Word,
+        start: int,
+        state: State,
+        visited: Set[int],
+        count_first: bool = True,
+    ) -> None:
+        """
+        Read a trace along the graph from a state, and update the sketches.
+
+        :param trace: the trace.
+        :param start: the index of the next character to read.
+        :param state: the current state.
+        :param visited: the vertices whose sketches already have the trace.
+        :param count_first: whether to count the first character read from the state.
+        """
+        transitions = self.graph.transitions
+        for index in range(start, len(trace)):
+            character = trace[index]
+            if count_first or index > start:
+                self.vertex2visits[state].add(character)
+            transition = (state, character)
+            next_state = transitions.get(state, {}).get(character)
+            if next_state is None:
+                if character != FINAL_SYMBOL:
+                    sketch = self.candidate2sketch.get(transition)
+                    if sketch is None:
+                        sketch = self._new_sketch()
+                        self.candidate2sketch[transition] = sketch
+                    sketch.add(trace, index + 1)
+                    self._stopped_traces.setdefault(transition, []).append(
+                        (trace, index)
+                    )
+                return
+            vertex = self._transition2vertex.get(transition)
+            if vertex is not None and vertex not in visited:
+                visited.add(vertex)
+                self.vertex2sketch[vertex].add(trace, index + 1)
+            state = next_state
+
+    def _resume_traces(
+        self, transition: Tuple[State, Character], sketch: SketchedMultiset
+    ) -> None:
+        """
+        Read further the traces that stopped at a candidate node, now decided.
+
+        The characters read from the next vertex are counted for all the
+        traces of the candidate node, while only the traces of the current
+        batch are read further, to update the sketches of the next candidate nodes.
+
+        :param transition: the transition of the candidate node, now in the graph.
+        :param sketch: the sketch of the candidate node.
+        """
+        start, character = transition
+        end = self.graph.transitions[start][character]
+        self.vertex2visits[end].update(sketch.size, sketch.get_successor_counts())
+        new_vertex = self._transition2vertex.get(transition)
+        for trace, index in self._stopped_traces.pop(transition, []):
+            visited = {new_vertex} if new_vertex is not None else set()
+            self._read_trace(trace, index + 1, end, visited, count_first=False)
+
+    def _take_decisions(self, final: bool) -> None:
+        """
+        Promote or merge candidate nodes, starting from the biggest one.
+
+        :param final: if True, the stream is over: every non-empty candidate
+          is processed as in the non-streaming algorithm.
+        """
+        min_size = 1 if final else self.params.min_candidate_size
+        while True:
+            candidates = [
+                (sketch.size, transition)
+                for transition, sketch in self.candidate2sketch.items()
+                if sketch.size >= min_size
+                and (final or sketch.size >= self._next_test_size.get(transition, 0))
+            ]
+            if len(candidates) == 0:
+                return
+            _, transition = max(candidates)
+            metrics = IterationMetrics("balle_streaming", self.iteration)
+            start = time.perf_counter()
+            decided = self._decide(transition, final, metrics)
+            metrics.tests_time = time.perf_counter() - start
+            metrics.candidate_sizes = [
+                (u, c, sketch.size) for (u, c), sketch in self.candidate2sketch.items()
+            ]
+            metrics.nb_vertices = len(self.graph.vertices)
+            notify(self.params.callbacks, metrics)
+            self.iteration += 1
+            if not decided:
+                size = self.candidate2sketch[transition].size
+                self._next_test_size[transition] = 2 * size
+
+    def _decide(
+        self,
+        transition: Tuple[State, Character],
+        final: bool,
+        metrics: IterationMetrics,
+    ) -> bool:
+        """
+        Try to promote or merge a candidate node.
+
+        :return: True if a decision has been taken, False otherwise.
+        """
+        sketch = self.candidate2sketch[transition]
+        distances: Dict[int, Tuple[float, float]] = {}
+        for vertex in sorted(self.graph.vertices):
+            vertex_sketch = self.vertex2sketch[vertex]
+            if vertex_sketch.size == 0:
+                continue
+            metrics.nb_tests += 1
+            threshold = _compute_threshold(
+                sketch.size,
+                vertex_sketch.size,
+                sketch.nb_prefixes,
+                vertex_sketch.nb_prefixes,
+                self.params.delta_0,
+            )
+            distance = sketched_prefix_infty_norm(sketch, vertex_sketch)
+            distances[vertex] = (distance, threshold)
+
+        non_distinct = [v for v, (d, t) in distances.items() if d <= t]
+        confidently_similar = [
+            v for v in non_distinct if distances[v][1] <= self.params.mu / 2
+        ]
+        maximum_nb_states_reached = len(self.graph.vertices) >= self.params.n
+        start, character = transition
+        if len(non_distinct) == 0 and not maximum_nb_states_reached:
+            new_vertex = len(self.graph.vertices)
+            logger.info(f"New vertex {new_vertex} from transition {transition}.")
+            self._add_vertex(new_vertex, transition, sketch)
+            end = new_vertex
+        elif len(confidently_similar) > 0 or final:
+            # for deterministic behaviour, pick the smallest non-distinct vertex;
+            # if there is none, pick the least distinct one.
+            candidates = confidently_similar or non_distinct
+            end = (
+                candidates[0]
+                if len(candidates) > 0
+                else min(distances, key=lambda v: distances[v][0] / distances[v][1])
+            )
+        else:
+            return False
+        self.graph.add_transition(start, character, end)
+        del self.candidate2sketch[transition]
+        self._resume_traces(transition, sketch)
+        return True
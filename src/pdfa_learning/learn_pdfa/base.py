@@ -20,12 +20,12 @@
 # along with pdfa-learning.  If not, see <https://www.gnu.org/licenses/>.
 #
 """Base module for the learn pdfa implementation."""
+import importlib
 from enum import Enum
-from typing import Callable, Dict
+from typing import Dict
 
-from pdfa_learning.learn_pdfa.balle.core import learn_pdfa as balle_learn_pdfa
-from pdfa_learning.learn_pdfa.palmer.core import learn_pdfa as palmer_learn_pdfa
 from pdfa_learning.pdfa import PDFA
+from pdfa_learning.types import TransitionFunctionDict
 
 
 class Algorithm(Enum):
@@ -33,11 +33,18 @@ class Algorithm(Enum):
 
     PALMER = "palmer"
     BALLE = "balle"
+    BALLE_STREAMING = "balle_streaming"
 
 
-_algorithm_to_function: Dict[Algorithm, Callable] = {
-    Algorithm.PALMER: palmer_learn_pdfa,
-    Algorithm.BALLE: balle_learn_pdfa,
+class SampleTooSmallError(Exception):
+    """The learnt PDFA is not valid, e.g. because the sample is too small."""
+
+
+# the learners are imported on first use, to keep the import of the package fast
+_algorithm_to_module: Dict[Algorithm, str] = {
+    Algorithm.PALMER: "pdfa_learning.learn_pdfa.palmer.core",
+    Algorithm.BALLE: "pdfa_learning.learn_pdfa.balle.core",
+    Algorithm.BALLE_STREAMING: "pdfa_learning.learn_pdfa.balle.streaming",
 }
 
 
@@ -48,4 +55,25 @@ def learn_pdfa(algorithm: Algorithm = Algorithm.BALLE, **kwargs) -> PDFA:
     :param kwargs: the keyword arguments of the algorithm.
     :return: the learnt PDFA.
     """
-    return _algorithm_to_function[algorithm](**kwargs)
+    module = importlib.import_module(_algorithm_to_module[algorithm])
+    return module.learn_pdfa(**kwargs)
+
+
+def make_learnt_pdfa(
+    nb_states: int, alphabet_size: int, transition_dict: TransitionFunctionDict
+) -> PDFA:
+    """
+    Make the PDFA learnt by an algorithm.
+
+    :param nb_states: the number of states.
+    :param alphabet_size: the alphabet size.
+    :param transition_dict: the learnt transition function.
+    :return: the PDFA.
+    :raises SampleTooSmallError: if the PDFA is not valid, e.g. if some
+      probabilities do not sum to 1 since the learnt graph is incomplete,
+      or if some states cannot reach the final state.
+    """
+    try:
+        return PDFA(nb_states, alphabet_size, transition_dict)
+    except AssertionError as e:
+        raise SampleTooSmallError(f"The learnt PDFA is not valid: {e}") from e
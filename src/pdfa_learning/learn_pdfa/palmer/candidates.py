@@ -0,0 +1,108 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020 Marco Favorito
+#
+# ------------------------------
+#
+# This file is part of pdfa-learning.
+#
+# pdfa-learning is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pdfa-learning is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with pdfa-learning.  If not, see <https://www.gnu.org/licenses/>.
+#
+"""The candidate nodes of Palmer's algorithm, as nodes of a prefix tree."""
+from typing import Dict, List, Set, Tuple
+
+from pdfa_learning.helpers.profiling import hot_path
+from pdfa_learning.learn_pdfa.utils.multiset.tree import (
+    Node,
+    ReadOnlyPrefixTreeMultiset,
+)
+from pdfa_learning.pdfa.helpers import FINAL_SYMBOL
+from pdfa_learning.types import Character, State
+
+
+class CandidateNodes:
+    """
+    The tree nodes of the multisets of the candidate nodes.
+
+    All the traces with the same prefix follow the same path in the graph,
+    hence the multiset of a candidate node is a set of nodes of the prefix
+    tree of the sample: the children reached by reading a character whose
+    transition is undefined. The sets are kept across iterations: when a
+    transition is added, only the nodes of its candidate node are walked further.
+    """
+
+    def __init__(self, root: Node, transitions: Dict[State, Dict[Character, State]]):
+        """
+        Initialize the candidate nodes, by walking the tree through the graph.
+
+        :param root: the root of the prefix tree of the sample.
+        :param transitions: the transitions of the graph (updated by 'add_transition').
+        """
+        self._transitions = transitions
+        self._transition2nodes: Dict[Tuple[State, Character], Set[Node]] = {}
+        self._transition2size: Dict[Tuple[State, Character], int] = {}
+        self.nb_visited_nodes = 0
+        self._walk([(root, 0)])
+
+    @property
+    def transition2nodes(self) -> Dict[Tuple[State, Character], Set[Node]]:
+        """Get the tree nodes of each candidate node."""
+        return self._transition2nodes
+
+    def get_size(self, transition: Tuple[State, Character]) -> int:
+        """Get the size of the multiset of a candidate node."""
+        return self._transition2size.get(transition, 0)
+
+    def get_sizes(self) -> Dict[Tuple[State, Character], int]:
+        """Get the sizes of the multisets of all the candidate nodes."""
+        return dict(self._transition2size)
+
+    def get_multiset(
+        self, transition: Tuple[State, Character]
+    ) -> ReadOnlyPrefixTreeMultiset:
+        """Get the multiset of a candidate node."""
+        return ReadOnlyPrefixTreeMultiset(self._transition2nodes.get(transition, set()))
+
+    @hot_path
+    def add_transition(self, start: State, character: Character, end: State) -> None:
+        """
+        Add a transition to the graph, and walk the nodes of its candidate node further.
+
+        :param start: the start vertex.
+        :param character: the character.
+        :param end: the end vertex.
+        """
+        self._transitions.setdefault(start, {})[character] = end
+        nodes = self._transition2nodes.pop((start, character), set())
+        self._transition2size.pop((start, character), None)
+        self._walk([(node, end) for node in nodes])
+
+    def _walk(self, stack: List[Tuple[Node, State]]) -> None:
+        """Walk the subtrees of some nodes, from some states, until undefined transitions."""
+        while len(stack) > 0:
+            node, state = stack.pop()
+            self.nb_visited_nodes += 1
+            out_transitions = self._transitions.get(state, {})
+            for character, child in node.next_transitions():
+                if character == FINAL_SYMBOL:
+                    continue
+                next_state = out_transitions.get(character)
+                if next_state is None:
+                    transition = (state, character)
+                    self._transition2nodes.setdefault(transition, set()).add(child)
+                    self._transition2size[transition] = (
+                        self._transition2size.get(transition, 0) + child.children_counts
+                    )
+                else:
+                    stack.append((child, next_state))
@@ -20,9 +20,9 @@
 # along with pdfa-learning.  If not, see <https://www.gnu.org/licenses/>.
 #
 """Entrypoint for the algorithm."""
-
 import pprint
 
+from pdfa_learning.helpers.base import LazyFormat
 from pdfa_learning.learn_pdfa import logger
 from pdfa_learning.learn_pdfa.palmer.learn_probabilities import learn_probabilities
 from pdfa_learning.learn_pdfa.palmer.learn_subgraph import learn_subgraph
@@ -37,9 +37,9 @@ def learn_pdfa(**kwargs):
     :return: the learnt PDFA.
     """
     params = PalmerParams(**kwargs)
-    logger.info(f"Parameters: {pprint.pformat(str(params))}")
+    logger.info("Parameters: %s", LazyFormat(lambda: pprint.pformat(str(params))))
     vertices, transitions = learn_subgraph(params)
     logger.info(f"Number of vertices: {len(vertices)}.")
-    logger.info(f"Transitions: {pprint.pformat(transitions)}.")
+    logger.info("Transitions: %s.", LazyFormat(pprint.pformat, transitions))
     pdfa = learn_probabilities((vertices, transitions), params)
     return pdfa
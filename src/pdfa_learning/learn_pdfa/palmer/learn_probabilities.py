@@ -20,15 +20,19 @@
 # along with pdfa-learning.  If not, see <https://www.gnu.org/licenses/>.
 #
 """Implement the Algorithm 2 of (Palmer and Goldberg 2007) to estimate probabilities."""
-import math
 import pprint
-from collections import Counter
 from math import ceil, log
-from typing import Dict, Optional, Set, Tuple
+from typing import Dict, Set, Tuple
 
+import numpy as np
+
+from pdfa_learning.helpers.base import LazyFormat
 from pdfa_learning.learn_pdfa import logger
+from pdfa_learning.learn_pdfa.base import make_learnt_pdfa
 from pdfa_learning.learn_pdfa.palmer.params import PalmerParams
+from pdfa_learning.learn_pdfa.utils.packed import PackedSample
 from pdfa_learning.pdfa import PDFA
+from pdfa_learning.pdfa.helpers import FINAL_SYMBOL
 from pdfa_learning.types import TransitionFunctionDict
 
 
@@ -45,67 +49,101 @@ def _sample_size(params: PalmerParams) -> int:
     return N
 
 
+def _make_transition_table(
+    transitions: Dict[int, Dict[int, int]], nb_states: int, alphabet_size: int
+) -> np.ndarray:
+    """
+    Make a dense transition table, with -1 for undefined transitions.
+
+    The last column is for the final symbol.
+    """
+    table = np.full((nb_states, alphabet_size + 1), -1, dtype=np.int64)
+    for start, out_transitions in transitions.items():
+        for character, end in out_transitions.items():
+            column = alphabet_size if character == FINAL_SYMBOL else character
+            table[start, column] = end
+    return table
+
+
+def _count_observations(
+    sample: PackedSample, table: np.ndarray, counts: np.ndarray
+) -> None:
+    """
+    Add to the counts the number of times each character is read from each state.
+
+    All the traces are propagated together, one position at a time,
+    until they read the final symbol or an undefined transition.
+
+    :param sample: the sample.
+    :param table: the dense transition table.
+    :param counts: the flat count array, indexed by 'state * (|alphabet| + 1) + symbol'.
+    """
+    final_column = table.shape[1] - 1
+    ends = sample.ends
+    traces = np.flatnonzero(sample.starts < ends)
+    positions = sample.starts[traces]
+    states = np.zeros(len(traces), dtype=np.int64)
+    while len(traces) > 0:
+        characters = sample.symbols[positions]
+        columns = np.where(characters == FINAL_SYMBOL, final_column, characters)
+        counts += np.bincount(states * table.shape[1] + columns, minlength=len(counts))
+        next_states = table[states, columns]
+        positions += 1
+        alive = (next_states >= 0) & (positions < ends[traces])
+        traces, states, positions = traces[alive], next_states[alive], positions[alive]
+
+
 def learn_probabilities(
     graph: Tuple[Set[int], Dict[int, Dict[int, int]]], params: PalmerParams
 ) -> PDFA:
     """
     Learn the probabilities of the PDFA.
 
+    The sample is drawn and processed in chunks, so the memory does not
+    depend on the sample size.
+
     :param graph: the learned subgraph of the true PDFA.
     :param params: the parameters of the algorithms.
     :return: the PDFA.
     """
     logger.info("Start learning probabilities.")
     vertices, transitions = graph
-    initial_state = 0
     N = _sample_size(params)
     logger.info(f"Sample size: {N}.")
     N = min(N, params.n2_max_debug if params.n2_max_debug else N)
     logger.info(f"Using N = {N}.")
     generator = params.sample_generator
-    sample = generator.sample(N)
-    n_observations: Counter = Counter()
-    for word in sample:
-        current_state = initial_state
-        for character in word:
-            # update statistics
-
-            n_observations.update([(current_state, character)])
-
-            # compute next state
-            next_state: Optional[int] = transitions.get(current_state, {}).get(
-                character
-            )
-
-            if next_state is None:
-                break  # pragma: no cover
-            current_state = next_state
-
-    gammas: Dict[int, Dict[int, float]] = {}
-
-    # compute number of times q is visited
-    q_visits: Counter = Counter()
-    for (q, _), counts in n_observations.items():
-        q_visits[q] += counts
-    # compute mean
-    for (q, sigma), counts in n_observations.items():
-        gammas.setdefault(q, {})[sigma] = counts / q_visits[q]
-    # rescale probabilities
-    for _, out_probabilities in gammas.items():
-        characters, probabilities = zip(*list(out_probabilities.items()))
-        probability_sum = math.fsum(probabilities)
-        new_probabilities = [p / probability_sum for p in probabilities]
-        out_probabilities.update(dict(zip(characters, new_probabilities)))
+    alphabet_size = params.alphabet_size
+    table = _make_transition_table(transitions, len(vertices), alphabet_size)
+    counts = np.zeros(len(vertices) * (alphabet_size + 1), dtype=np.int64)
+    for chunk_start in range(0, N, params.chunk_size):
+        chunk_size = min(params.chunk_size, N - chunk_start)
+        sample = PackedSample.from_words(generator.sample(chunk_size))
+        _count_observations(sample, table, counts)
+
+    # n_observations[q, sigma] is the number of times sigma is read from q
+    n_observations = counts.reshape(len(vertices), alphabet_size + 1)
+    # compute number of times q is visited, and the means
+    q_visits = n_observations.sum(axis=1, keepdims=True)
+    gammas = np.divide(
+        n_observations,
+        q_visits,
+        out=np.zeros(n_observations.shape),
+        where=q_visits > 0,
+    )
 
     # compute transition function for the PDFA
     transition_dict: TransitionFunctionDict = {}
     for q, out_transitions in transitions.items():
         transition_dict.setdefault(q, {})
         for sigma, q_prime in out_transitions.items():
-            prob = gammas.get(q, {}).get(sigma, 0.0)
-            transition_dict[q][sigma] = (q_prime, prob)
+            column = alphabet_size if sigma == FINAL_SYMBOL else sigma
+            transition_dict[q][sigma] = (q_prime, float(gammas[q, column]))
 
-    logger.info(f"Computed vertices: {pprint.pformat(vertices)}")
-    logger.info(f"Computed transition dictionary: {pprint.pformat(transition_dict)}")
+    logger.info("Computed vertices: %s", LazyFormat(pprint.pformat, vertices))
+    logger.info(
+        "Computed transition dictionary: %s",
+        LazyFormat(pprint.pformat, transition_dict),
+    )
 
-    return PDFA(len(vertices), params.alphabet_size, transition_dict)
+    return make_learnt_pdfa(len(vertices), params.alphabet_size, transition_dict)
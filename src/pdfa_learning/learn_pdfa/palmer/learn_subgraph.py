@@ -21,15 +21,25 @@
 #
 """Implement the Algorithm 1 of (Palmer and Goldberg 2007) to learn subgraph."""
 import pprint
-from collections import Counter
+import time
 from math import ceil, log, log2
-from typing import Dict, Optional, Sequence, Set, Tuple
+from typing import Dict, Optional, Set, Tuple, Union
 
+from pdfa_learning.helpers.base import LazyFormat
+from pdfa_learning.helpers.profiling import hot_path
 from pdfa_learning.learn_pdfa import logger
+from pdfa_learning.learn_pdfa.palmer.candidates import CandidateNodes
+from pdfa_learning.learn_pdfa.palmer.parallel import ShardedCandidateNodes
 from pdfa_learning.learn_pdfa.palmer.params import PalmerParams
+from pdfa_learning.learn_pdfa.palmer.similarity import VertexIndex
 from pdfa_learning.learn_pdfa.utils.base import l_infty_norm
+from pdfa_learning.learn_pdfa.utils.metrics import IterationMetrics, notify
+from pdfa_learning.learn_pdfa.utils.multiset.tree import (
+    PrefixTreeMultiset,
+    TreeMultisetLike,
+)
 from pdfa_learning.pdfa.helpers import FINAL_STATE, FINAL_SYMBOL
-from pdfa_learning.types import Character, State, Word
+from pdfa_learning.types import Character, State
 
 
 def _compute_m0(params: PalmerParams):
@@ -48,144 +58,201 @@ def _compute_N(params: PalmerParams, m0: int):
     n = params.n
     s = params.alphabet_size
 
-    N1 = 8 * (n ** 2) * (s ** 2) / (eps ** 2) * (log((2 ** (n * s)) * n * s / delta))
+    # log(2 ** (n * s) * n * s / delta), without computing 2 ** (n * s)
+    N1 = 8 * (n**2) * (s**2) / (eps**2) * (n * s * log(2) + log(n * s / delta))
     N2 = 4 * m0 * n * s / eps
     N = ceil(max(N1, N2))
     logger.info(f"N1 = {N1}, N2 = {N2}. Chosen: {N}")
     return N
 
 
-def extended_transition_fun(
-    transitions: Dict[State, Dict[Character, State]], word: Word
+@hot_path
+def _find_similar_vertex(
+    multiset: TreeMultisetLike,
+    vertex2multiset: Dict[int, TreeMultisetLike],
+    vertex_index: VertexIndex,
+    mu: float,
+    metrics: IterationMetrics,
 ) -> Optional[int]:
     """
-    Compute the successor state from a word.
-
-    :param transitions: the transitions indexed by state and character.
-    :param word: the word.
-    :return:
-    """
-    current_state: Optional[int] = 0
-    for c in word:
-        if current_state is None:
-            return None
-        current_state = transitions.get(current_state, {}).get(c)
-    return current_state
+    Find a vertex whose multiset is within mu/2 from a multiset, if any.
 
+    The vertices surely farther than mu/2 are not compared,
+    the others are compared starting from the closest signature.
 
-def _compute_first_multiset(samples: Sequence[Word]) -> Counter:
-    result: Counter = Counter()
-    for s in samples:
-        # s is always non-empty
-        result.update([tuple(s)])
-    return result
+    :param multiset: the multiset.
+    :param vertex2multiset: the multisets of the vertices.
+    :param vertex_index: the signatures of the vertices.
+    :param mu: the distinguishability factor.
+    :param metrics: the metrics of the iteration (updated).
+    :return: the similar vertex, or None.
+    """
+    vertex_candidates = vertex_index.get_candidates(multiset, mu / 2.0)
+    metrics.nb_pruned = len(vertex2multiset) - len(vertex_candidates)
+    for vertex, _ in vertex_candidates:
+        metrics.nb_tests += 1
+        norm = l_infty_norm(multiset, vertex2multiset[vertex], mu / 2.0)
+        if norm <= mu / 2.0:
+            return vertex
+    return None
 
 
-def learn_subgraph(  # noqa: ignore
+def _learn_graph(
     params: PalmerParams,
-) -> Tuple[Set[int], Dict[int, Dict[Character, int]]]:
+    m0: int,
+    vertex2multiset: Dict[int, TreeMultisetLike],
+    transitions: Dict[int, Dict[Character, int]],
+    candidate_nodes: Union[CandidateNodes, ShardedCandidateNodes],
+) -> None:
     """
-    Learn a subgraph of the true PDFA.
+    Add vertices and transitions until all the candidate nodes are small.
 
     :param params: the parameters of the algorithms.
-    :return: the graph
+    :param m0: the minimum size of the multiset of a candidate node.
+    :param vertex2multiset: the multisets of the vertices (updated in place).
+    :param transitions: the transitions of the graph (updated in place).
+    :param candidate_nodes: the candidate nodes of the graph.
     """
-    # unpack parameters
-    generator = params.sample_generator
     mu = params.mu
-
-    # initialize variables
-    initial_state = 0
-    vertices = {initial_state}
-    transitions: Dict[int, Dict[Character, int]] = {}
+    vertices = set(vertex2multiset.keys())
     alphabet = set(range(params.alphabet_size))
-    vertex2multiset: Dict[int, Counter] = {}
-
-    m0 = _compute_m0(params)
-    N = _compute_N(params, m0)
-    logger.info(f"m0 = {m0}")
-    logger.info(f"N = {N}")
-    m0 = min(m0, params.m0_max_debug if params.m0_max_debug else m0)
-    N = min(N, params.n1_max_debug if params.n1_max_debug else N)
-    logger.info(f"using m0 = {m0}, N = {N}")
-
-    samples = generator.sample(n=N)
-    logger.info("Sampling done.")
-    logger.info(f"Number of samples: {len(samples)}.")
-    logger.info(f"Avg. length of samples: {sum(map(len, samples))/len(samples)}.")
-
-    # multiset for initial state is the entire sample
-    vertex2multiset[initial_state] = _compute_first_multiset(samples)
+    nb_visited_nodes = 0
+    vertex_index = VertexIndex(params.signature_size)
+    for vertex, multiset in vertex2multiset.items():
+        vertex_index.add(vertex, multiset)
 
     done = False
     iteration = 0
     while not done:
         logger.info(f"Iteration {iteration}")
+        metrics = IterationMetrics("palmer", iteration)
+        start = time.perf_counter()
 
         candidate_nodes_by_transitions: Dict[Tuple[State, Character], int] = {}
         candidate_nodes_to_transitions: Dict[int, Tuple[State, Character]] = {}
-        multisets: Dict[int, Counter] = {}
 
-        for v in vertices:
-            for c in alphabet:
+        for v in sorted(vertices):
+            for c in sorted(alphabet):
                 if transitions.get(v, {}).get(c) is None:  # if transition undefined
                     transition = (v, c)
                     new_candidate = len(vertices) + len(candidate_nodes_to_transitions)
                     candidate_nodes_to_transitions[new_candidate] = transition
                     candidate_nodes_by_transitions[transition] = new_candidate
-                    multisets[new_candidate] = Counter()
-
-        for s in samples:
-            # s is always non-empty
-            for i in range(len(s)):
-                r, sigma, t = s[:i], s[i], s[i + 1 :]
-                q = extended_transition_fun(transitions, r)
-                if q is None:
-                    continue
-                transition = (q, sigma)
-                if transition in candidate_nodes_by_transitions:
-                    candidate_node = candidate_nodes_by_transitions[transition]
-                    multisets[candidate_node].update([tuple(t)])
-
-        chosen_candidate_node, biggest_multiset = max(
-            multisets.items(), key=lambda x: sum(x[1].values())
-        )
-        cardinality = sum(biggest_multiset.values())
+
+        candidate_sizes = {
+            c: candidate_nodes.get_size(transition)
+            for c, transition in candidate_nodes_to_transitions.items()
+        }
+        cardinality = max(candidate_sizes.values(), default=0)
+        metrics.candidates_time = time.perf_counter() - start
+        metrics.candidate_sizes = [
+            (*candidate_nodes_to_transitions[c], size)
+            for c, size in candidate_sizes.items()
+        ]
         if cardinality >= m0:
+            # ties are broken in favour of the first candidate node
+            chosen_candidate_node = next(
+                c for c, size in candidate_sizes.items() if size == cardinality
+            )
+            biggest_multiset = candidate_nodes.get_multiset(
+                candidate_nodes_to_transitions[chosen_candidate_node]
+            )
+
             # check if there is a similar vertex
-            similar_vertex: Optional[int] = None
-            for v in vertices:
-                vertex_multiset = vertex2multiset[v]
-                norm = l_infty_norm(biggest_multiset, vertex_multiset)
-                if norm <= mu / 2.0:
-                    similar_vertex = v
-                    break
+            start = time.perf_counter()
+            similar_vertex = _find_similar_vertex(
+                biggest_multiset, vertex2multiset, vertex_index, mu, metrics
+            )
+            metrics.tests_time = time.perf_counter() - start
 
+            start = time.perf_counter()
             if similar_vertex is not None:
                 transition = candidate_nodes_to_transitions[chosen_candidate_node]
                 u, sigma = transition
-                transitions.setdefault(u, {})[sigma] = similar_vertex
+                candidate_nodes.add_transition(u, sigma, similar_vertex)
             else:
                 new_node = len(vertices)
                 vertices.add(new_node)
                 vertex2multiset[new_node] = biggest_multiset
+                vertex_index.add(new_node, biggest_multiset)
                 transition = candidate_nodes_to_transitions.pop(chosen_candidate_node)
                 _tmp = candidate_nodes_by_transitions.pop(transition)
                 assert chosen_candidate_node == _tmp
                 u, sigma = transition
-                transitions.setdefault(u, {})[sigma] = new_node
+                candidate_nodes.add_transition(u, sigma, new_node)
+            metrics.update_time = time.perf_counter() - start
 
+        # only the nodes whose candidate node changed are visited
+        metrics.nodes_visited = candidate_nodes.nb_visited_nodes - nb_visited_nodes
+        nb_visited_nodes = candidate_nodes.nb_visited_nodes
+        metrics.nb_vertices = len(vertices)
+        notify(params.callbacks, metrics)
         if cardinality < m0:
             done = True
         iteration += 1
 
+
+def learn_subgraph(  # noqa: ignore
+    params: PalmerParams,
+) -> Tuple[Set[int], Dict[int, Dict[Character, int]]]:
+    """
+    Learn a subgraph of the true PDFA.
+
+    :param params: the parameters of the algorithms.
+    :return: the graph
+    """
+    # unpack parameters
+    generator = params.sample_generator
+
+    # initialize variables
+    initial_state = 0
+    transitions: Dict[int, Dict[Character, int]] = {}
+    # the multisets are views on the prefix tree of the sample,
+    # or merged from the shards of the sample when using multiple processes
+    vertex2multiset: Dict[int, TreeMultisetLike] = {}
+
+    m0 = _compute_m0(params)
+    N = _compute_N(params, m0)
+    logger.info(f"m0 = {m0}")
+    logger.info(f"N = {N}")
+    m0 = min(m0, params.m0_max_debug if params.m0_max_debug else m0)
+    N = min(N, params.n1_max_debug if params.n1_max_debug else N)
+    logger.info(f"using m0 = {m0}, N = {N}")
+
+    samples = generator.sample(n=N)
+    logger.info("Sampling done.")
+    logger.info(f"Number of samples: {len(samples)}.")
+    logger.info(
+        "Avg. length of samples: %s.",
+        LazyFormat(lambda: sum(map(len, samples)) / len(samples)),
+    )
+
+    # multiset for initial state is the entire sample
+    sample_multiset = PrefixTreeMultiset()
+    sample_multiset.update([tuple(s) for s in samples])
+    vertex2multiset[initial_state] = sample_multiset
+    candidate_nodes: Union[CandidateNodes, ShardedCandidateNodes]
+    if params.nb_processes > 1:
+        logger.info(f"Computing candidate nodes with {params.nb_processes} processes.")
+        candidate_nodes = ShardedCandidateNodes(
+            samples, transitions, params.nb_processes
+        )
+    else:
+        candidate_nodes = CandidateNodes(next(iter(sample_multiset.nodes)), transitions)
+    try:
+        _learn_graph(params, m0, vertex2multiset, transitions, candidate_nodes)
+    finally:
+        if isinstance(candidate_nodes, ShardedCandidateNodes):
+            candidate_nodes.close()
+    vertices = set(vertex2multiset.keys())
+
     # complete subgraph
     final_node = FINAL_STATE
     for vertex in vertices:
         transitions.setdefault(vertex, {})[FINAL_SYMBOL] = final_node
 
-    logger.info(f"Vertices: {pprint.pformat(vertices)}")
-    logger.info(f"Transitions: {pprint.pformat(transitions)}")
+    logger.info("Vertices: %s", LazyFormat(pprint.pformat, vertices))
+    logger.info("Transitions: %s", LazyFormat(pprint.pformat, transitions))
     logger.info(f"Computed final node: {final_node} (no outgoing transitions)")
 
     return vertices, transitions
@@ -0,0 +1,226 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020 Marco Favorito
+#
+# ------------------------------
+#
+# This file is part of pdfa-learning.
+#
+# pdfa-learning is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pdfa-learning is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with pdfa-learning.  If not, see <https://www.gnu.org/licenses/>.
+#
+"""Compute the candidate nodes of Palmer's algorithm on shards of the sample."""
+from multiprocessing import Pipe, Process
+from multiprocessing.connection import Connection
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+from pdfa_learning.learn_pdfa.palmer.candidates import CandidateNodes
+from pdfa_learning.learn_pdfa.utils.multiset.tree import Node, PrefixTreeMultiset
+from pdfa_learning.learn_pdfa.utils.packed import PackedSample
+from pdfa_learning.types import Character, State, Word
+
+_Transition = Tuple[State, Character]
+
+
+def _encode_subtrees(nodes: Sequence[Node]) -> np.ndarray:
+    """
+    Encode the subtrees of some tree nodes, one row per node.
+
+    The rows are (parent row, symbol, counts, children counts), in depth-first
+    order; the roots of the subtrees have parent row -1.
+
+    :param nodes: the roots of the subtrees.
+    :return: the encoded subtrees.
+    """
+    rows: List[Tuple[int, int, int, int]] = []
+    stack: List[Tuple[int, int, Node]] = [(-1, 0, node) for node in nodes]
+    while len(stack) > 0:
+        parent, symbol, node = stack.pop()
+        index = len(rows)
+        rows.append((parent, symbol, node.counts, node.children_counts))
+        stack.extend((index, c, child) for c, child in node.next_transitions())
+    return np.array(rows, dtype=np.int64).reshape(-1, 4)
+
+
+def _decode_subtrees(root: Node, rows: np.ndarray) -> None:
+    """
+    Add encoded subtrees (see '_encode_subtrees') to a prefix tree.
+
+    The roots of the subtrees are merged with the root of the tree.
+
+    :param root: the root of the tree.
+    :param rows: the encoded subtrees.
+    """
+    row2node: List[Node] = []
+    for parent, symbol, counts, children_counts in rows.tolist():
+        if parent < 0:
+            node = root
+        else:
+            parent_node = row2node[parent]
+            child = parent_node.get_child(symbol)
+            node = child if child is not None else Node(parent_node, symbol)
+        node.counts += counts
+        node.children_counts += children_counts
+        row2node.append(node)
+
+
+def _get_sizes(candidate_nodes: CandidateNodes) -> Tuple[Dict[_Transition, int], int]:
+    """Get the sizes of the candidate nodes, and the number of visited tree nodes."""
+    return candidate_nodes.get_sizes(), candidate_nodes.nb_visited_nodes
+
+
+def _worker(connection: Connection, shard: PackedSample) -> None:
+    """
+    Serve the requests on the candidate nodes of a shard of the sample.
+
+    The requests are tuples, whose first element is the command:
+    - ("add", start, character, end): add a transition, reply with the sizes;
+    - ("multiset", start, character): reply with the encoded subtrees of a candidate node;
+    - ("close",): stop the worker.
+    Every reply is a pair (is_error, payload).
+
+    :param connection: the connection with the main process.
+    :param shard: the shard of the sample.
+    """
+    try:
+        multiset = PrefixTreeMultiset()
+        for word in shard:
+            multiset.add(word)
+        candidate_nodes = CandidateNodes(next(iter(multiset.nodes)), {})
+        connection.send((False, _get_sizes(candidate_nodes)))
+        while True:
+            command, *args = connection.recv()
+            if command == "add":
+                candidate_nodes.add_transition(*args)
+                connection.send((False, _get_sizes(candidate_nodes)))
+            elif command == "multiset":
+                nodes = candidate_nodes.transition2nodes.get(tuple(args), set())
+                connection.send((False, _encode_subtrees(list(nodes))))
+            elif command == "close":
+                break
+            else:
+                raise ValueError(f"Unknown command: {command}")
+    except Exception as e:  # pylint: disable=broad-except
+        connection.send((True, e))
+    finally:
+        connection.close()
+
+
+class ShardedCandidateNodes:
+    """
+    The candidate nodes, computed by worker processes on shards of the sample.
+
+    Each worker keeps the prefix tree of its shard, and the tree nodes of the
+    candidate nodes (see 'CandidateNodes'). The graph updates are broadcast
+    to the workers, which reply with the partial sizes of the candidate nodes;
+    the multiset of a candidate node is the sum of the partial multisets,
+    sent as node-level counts.
+
+    The main process still keeps the prefix tree of the whole sample, since
+    it is the multiset of the initial vertex, used by the similarity tests:
+    the trees of the shards are an additional copy of it, which is the price
+    of computing the candidate nodes in parallel.
+    """
+
+    def __init__(
+        self,
+        sample: Sequence[Word],
+        transitions: Dict[State, Dict[Character, State]],
+        nb_processes: int,
+    ):
+        """
+        Start the workers.
+
+        :param sample: the sample.
+        :param transitions: the transitions of the graph (updated by 'add_transition').
+            They must be empty, as the workers start from the initial vertex.
+        :param nb_processes: the number of worker processes.
+        """
+        assert len(transitions) == 0, "Transitions must be empty."
+        self._transitions = transitions
+        self._connections: List[Connection] = []
+        self._processes: List[Process] = []
+        self._transition2size: Dict[_Transition, int] = {}
+        self.nb_visited_nodes = 0
+        for index in range(nb_processes):
+            shard = PackedSample.from_words(sample[index::nb_processes])
+            parent_connection, child_connection = Pipe()
+            process = Process(
+                target=_worker, args=(child_connection, shard), daemon=True
+            )
+            process.start()
+            child_connection.close()
+            self._connections.append(parent_connection)
+            self._processes.append(process)
+        self._update_sizes()
+
+    def get_size(self, transition: _Transition) -> int:
+        """Get the size of the multiset of a candidate node."""
+        return self._transition2size.get(transition, 0)
+
+    def get_multiset(self, transition: _Transition) -> PrefixTreeMultiset:
+        """Get the multiset of a candidate node, by merging the partial subtrees."""
+        for connection in self._connections:
+            connection.send(("multiset", *transition))
+        result = PrefixTreeMultiset()
+        root = next(iter(result.nodes))
+        for rows in self._receive_all():
+            _decode_subtrees(root, rows)
+        return result
+
+    def add_transition(self, start: State, character: Character, end: State) -> None:
+        """
+        Add a transition to the graph, on every worker.
+
+        :param start: the start vertex.
+        :param character: the character.
+        :param end: the end vertex.
+        """
+        self._transitions.setdefault(start, {})[character] = end
+        for connection in self._connections:
+            connection.send(("add", start, character, end))
+        self._update_sizes()
+
+    def close(self) -> None:
+        """Stop the workers."""
+        for connection in self._connections:
+            try:
+                connection.send(("close",))
+            except (BrokenPipeError, OSError):
+                pass
+            connection.close()
+        for process in self._processes:
+            process.join()
+
+    def _update_sizes(self) -> None:
+        """Merge the partial sizes of the candidate nodes."""
+        self._transition2size = {}
+        self.nb_visited_nodes = 0
+        for sizes, nb_visited_nodes in self._receive_all():
+            self.nb_visited_nodes += nb_visited_nodes
+            for transition, size in sizes.items():
+                self._transition2size[transition] = (
+                    self._transition2size.get(transition, 0) + size
+                )
+
+    def _receive_all(self) -> List:
+        """Receive the replies of all the workers."""
+        replies = []
+        for connection in self._connections:
+            is_error, payload = connection.recv()
+            if is_error:
+                raise payload
+            replies.append(payload)
+        return replies
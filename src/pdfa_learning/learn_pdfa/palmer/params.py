@@ -22,10 +22,11 @@
 """Params class for Palmer algorithm."""
 
 from dataclasses import dataclass
-from typing import Optional
+from typing import Optional, Sequence
 
 from pdfa_learning.helpers.base import assert_
 from pdfa_learning.learn_pdfa.utils.generator import Generator
+from pdfa_learning.learn_pdfa.utils.metrics import IterationCallback
 
 
 @dataclass(frozen=True)
@@ -40,6 +41,11 @@ class PalmerParams:
     delta: the failure probability for the probability estimation.
     mu: the distinguishability factor.
     n: the upper bound of the number of states.
+    chunk_size: the number of samples drawn at once to estimate the probabilities.
+    nb_processes: the number of processes that compute the candidate nodes.
+    signature_size: the number of most frequent traces kept for each vertex,
+      to rule out dissimilar vertices without a full comparison.
+    callbacks: functions called with the metrics of every iteration.
     """
 
     sample_generator: Generator
@@ -53,6 +59,10 @@ class PalmerParams:
     m0_max_debug: Optional[int] = None
     n1_max_debug: Optional[int] = None
     n2_max_debug: Optional[int] = None
+    chunk_size: int = 100000
+    nb_processes: int = 1
+    signature_size: int = 8
+    callbacks: Sequence[IterationCallback] = ()
 
     def __post_init__(self):
         """Validate inputs."""
@@ -60,3 +70,6 @@ class PalmerParams:
             self.delta_1 + self.delta_2 <= 1.0,
             "Sum of two probabilities cannot be greater than 1.",
         )
+        assert_(self.chunk_size > 0, "Chunk size must be greater than zero.")
+        assert_(self.nb_processes > 0, "Number of processes must be greater than zero.")
+        assert_(self.signature_size >= 0, "Signature size must be non-negative.")
@@ -0,0 +1,126 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020 Marco Favorito
+#
+# ------------------------------
+#
+# This file is part of pdfa-learning.
+#
+# pdfa-learning is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pdfa-learning is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with pdfa-learning.  If not, see <https://www.gnu.org/licenses/>.
+#
+"""An index of the vertices, to rule out dissimilar vertices without a full comparison."""
+import heapq
+from typing import Collection, Dict, List, Tuple
+
+from pdfa_learning.learn_pdfa.utils.multiset.tree import Node, TreeMultisetLike
+from pdfa_learning.types import Character, Word
+
+
+def _top_traces(nodes: Collection[Node], k: int) -> List[Tuple[Word, int]]:
+    """
+    Get the k most frequent traces in the subtrees of some tree nodes.
+
+    Like in 'get_counts', the traces do not include the symbols of the nodes.
+
+    :param nodes: the tree nodes.
+    :param k: the number of traces.
+    :return: the traces and their counts, ordered by decreasing counts.
+    """
+    counts: Dict[Tuple[Character, ...], int] = {}
+    stack: List[Tuple[Node, Tuple[Character, ...]]] = [(node, ()) for node in nodes]
+    while len(stack) > 0:
+        node, trace = stack.pop()
+        if node.counts > 0:
+            counts[trace] = counts.get(trace, 0) + node.counts
+        for character, child in node.next_transitions():
+            stack.append((child, trace + (character,)))
+    # ties are broken in favour of the shortest traces
+    return heapq.nlargest(k, counts.items(), key=lambda x: (x[1], -len(x[0])))
+
+
+class VertexIndex:
+    """
+    Signatures of the multisets of the vertices.
+
+    The signature of a multiset is the probability of its most frequent
+    traces. Since the L-infty distance is the maximum difference between
+    the probabilities of a trace, the differences on the traces of a
+    signature are lower bounds of the distance: if one of them is greater
+    than the threshold, the full comparison is not needed.
+    """
+
+    def __init__(self, signature_size: int):
+        """
+        Initialize the index.
+
+        :param signature_size: the number of traces in a signature.
+        """
+        self._signature_size = signature_size
+        self._signatures: Dict[int, Dict[Word, float]] = {}
+
+    def add(self, vertex: int, multiset: TreeMultisetLike) -> None:
+        """
+        Add the signature of a vertex.
+
+        :param vertex: the vertex.
+        :param multiset: the multiset of the vertex.
+        """
+        size = multiset.size
+        self._signatures[vertex] = {
+            trace: count / size
+            for trace, count in _top_traces(multiset.nodes, self._signature_size)
+        }
+
+    def lower_bound(self, vertex: int, probabilities: Dict[Word, float]) -> float:
+        """
+        Get a lower bound of the L-infty distance between a multiset and a vertex.
+
+        :param vertex: the vertex.
+        :param probabilities: the probabilities in the multiset of (at least)
+          the traces of the signature of the vertex.
+        :return: the lower bound.
+        """
+        return max(
+            (
+                abs(probability - probabilities[trace])
+                for trace, probability in self._signatures[vertex].items()
+            ),
+            default=0.0,
+        )
+
+    def get_candidates(
+        self, multiset: TreeMultisetLike, threshold: float
+    ) -> List[Tuple[int, float]]:
+        """
+        Get the vertices that might be within a distance from a multiset.
+
+        :param multiset: the multiset.
+        :param threshold: the distance.
+        :return: the pairs (vertex, lower bound) of the vertices whose lower bound
+          is not greater than the threshold, in increasing order of lower bound.
+        """
+        size = multiset.size
+        traces = {t for signature in self._signatures.values() for t in signature}
+        probabilities = {
+            trace: multiset.get_counts(trace) / size if size > 0 else 0.0
+            for trace in traces
+        }
+        bounds = [
+            (vertex, self.lower_bound(vertex, probabilities))
+            for vertex in sorted(self._signatures)
+        ]
+        return sorted(
+            ((vertex, bound) for vertex, bound in bounds if bound <= threshold),
+            key=lambda x: x[1],
+        )
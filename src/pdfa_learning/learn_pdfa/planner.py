@@ -0,0 +1,415 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020 Marco Favorito
+#
+# ------------------------------
+#
+# This file is part of pdfa-learning.
+#
+# pdfa-learning is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pdfa-learning is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with pdfa-learning.  If not, see <https://www.gnu.org/licenses/>.
+#
+"""Estimate the sample sizes and the cost of a learning run, before running it."""
+import itertools
+import json
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from math import ceil, log
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Type, Union
+
+from pdfa_learning.helpers.base import assert_
+from pdfa_learning.learn_pdfa import logger
+from pdfa_learning.learn_pdfa.balle.params import BalleParams, StreamingBalleParams
+from pdfa_learning.learn_pdfa.base import Algorithm
+from pdfa_learning.learn_pdfa.palmer.learn_probabilities import _sample_size
+from pdfa_learning.learn_pdfa.palmer.learn_subgraph import _compute_m0, _compute_N
+from pdfa_learning.learn_pdfa.palmer.params import PalmerParams
+from pdfa_learning.learn_pdfa.utils.multiset.tree import Node, PrefixTreeMultiset
+from pdfa_learning.types import Word
+
+_Params = Union[BalleParams, PalmerParams]
+
+# approximate size in bytes of a sketched multiset, per monitored prefix
+_BYTES_PER_MONITORED_PREFIX = 200
+
+
+@dataclass(frozen=True)
+class Calibration:
+    """
+    Measures taken on a small sample, used to extrapolate the cost of a run.
+
+    nb_traces: the number of traces of the calibration sample.
+    average_trace_length: the average length of the traces.
+    sampling_time: the time to draw a trace, in seconds.
+    insertion_time: the time to insert a symbol in a prefix tree, in seconds.
+    visit_time: the time to visit a node of a prefix tree, in seconds.
+    bytes_per_trace: the memory used to store a trace.
+    bytes_per_node: the memory used by a node of a prefix tree.
+    tree_sizes: the number of nodes of the prefix tree of the first
+      nb_traces / 4, nb_traces / 2 and nb_traces traces.
+    """
+
+    nb_traces: int
+    average_trace_length: float
+    sampling_time: float
+    insertion_time: float
+    visit_time: float
+    bytes_per_trace: float
+    bytes_per_node: float
+    tree_sizes: Tuple[int, int, int]
+
+    def estimate_tree_size(self, nb_traces: int) -> int:
+        """
+        Estimate the number of nodes of the prefix tree of a sample.
+
+        The number of nodes is assumed to grow as a power of the number of traces,
+        with the exponent observed between the last two calibration sizes.
+        The estimate never exceeds the total number of symbols.
+
+        :param nb_traces: the number of traces.
+        :return: the estimated number of nodes.
+        """
+        _, half_size, full_size = self.tree_sizes
+        exponent = log(full_size / half_size) / log(2) if half_size > 0 else 1.0
+        exponent = min(max(exponent, 0.0), 1.0)
+        estimate = full_size * (nb_traces / self.nb_traces) ** exponent
+        upper_bound = nb_traces * (self.average_trace_length + 1) + 1
+        return int(min(estimate, upper_bound))
+
+
+@dataclass(frozen=True)
+class LearningPlan:
+    """
+    The estimated requirements of a learning run.
+
+    algorithm: the name of the learning algorithm.
+    required_sample_sizes: the sample sizes required by the theory.
+    sample_sizes: the sample sizes that would be actually used
+      (i.e. after the debug upper bounds).
+    max_iterations: the upper bound of the number of iterations.
+    expected_tree_size: the expected number of nodes of the prefix tree of the sample.
+    estimated_time: the estimated running time, in seconds.
+    estimated_memory: the estimated peak memory, in bytes.
+    calibration: the measures the estimates are based on.
+    """
+
+    algorithm: str
+    required_sample_sizes: Dict[str, int]
+    sample_sizes: Dict[str, int]
+    max_iterations: int
+    expected_tree_size: int
+    estimated_time: float
+    estimated_memory: float
+    calibration: Calibration
+
+    def is_feasible(
+        self, max_time: Optional[float] = None, max_memory: Optional[float] = None
+    ) -> bool:
+        """
+        Check whether the run fits a time and a memory budget.
+
+        :param max_time: the time budget, in seconds.
+        :param max_memory: the memory budget, in bytes.
+        :return: True if the estimates are within the budget, False otherwise.
+        """
+        return (max_time is None or self.estimated_time <= max_time) and (
+            max_memory is None or self.estimated_memory <= max_memory
+        )
+
+    def to_dict(self) -> Dict:
+        """Get the plan as a dictionary."""
+        return asdict(self)
+
+    def to_json(self) -> str:
+        """Get the plan as a JSON string."""
+        return json.dumps(self.to_dict())
+
+
+def plan_learning(
+    algorithm: Algorithm = Algorithm.BALLE, calibration_size: int = 1000, **kwargs
+) -> LearningPlan:
+    """
+    Estimate the sample sizes, the time and the memory of a learning run.
+
+    Nothing is learnt: the estimates are extrapolated from a calibration
+    sample of 'calibration_size' traces, drawn from the sample generator
+    (or taken from the dataset) in the parameters.
+
+    :param algorithm: the learning algorithm.
+    :param calibration_size: the number of traces of the calibration sample.
+    :param kwargs: the keyword arguments of the algorithm (as for 'learn_pdfa').
+    :return: the learning plan.
+    """
+    assert_(calibration_size >= 4, "Calibration size must be at least 4.")
+    if algorithm not in _planners:
+        raise ValueError(f"Algorithm not supported: {algorithm}")
+    params_cls, planner = _planners[algorithm]
+    params = params_cls(**kwargs)
+    calibration = calibrate(*_get_calibration_sample(params, calibration_size))
+    return planner(params, calibration)
+
+
+def _get_calibration_sample(
+    params: _Params, calibration_size: int
+) -> Tuple[List[Word], float]:
+    """Get the calibration sample, and the time to get it."""
+    start = time.perf_counter()
+    if params.sample_generator is not None:
+        samples = params.sample_generator.sample(n=calibration_size)
+    else:
+        dataset = getattr(params, "dataset")
+        samples = list(itertools.islice(dataset, calibration_size))
+    samples = [tuple(s) for s in samples]
+    elapsed = time.perf_counter() - start
+    assert_(len(samples) >= 4, "The calibration sample is too small.")
+    return samples, elapsed
+
+
+def calibrate(samples: Sequence[Word], sampling_time: float) -> Calibration:
+    """
+    Take the measures on a calibration sample.
+
+    :param samples: the calibration sample.
+    :param sampling_time: the time it took to draw the sample, in seconds.
+    :return: the calibration.
+    """
+    nb_traces = len(samples)
+    nb_symbols = sum(map(len, samples))
+
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    copied_samples = [tuple(list(s)) for s in samples]
+    after_samples = tracemalloc.get_traced_memory()[0]
+    multiset = PrefixTreeMultiset()
+    tree_sizes: List[int] = []
+    start = time.perf_counter()
+    for index, trace in enumerate(copied_samples, start=1):
+        multiset.add(trace)
+        if index in (nb_traces // 4, nb_traces // 2, nb_traces):
+            tree_sizes.append(_count_nodes(next(iter(multiset.nodes))))
+    insertion_time = time.perf_counter() - start
+    after_tree = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    start = time.perf_counter()
+    nb_nodes = _count_nodes(next(iter(multiset.nodes)))
+    visit_time = time.perf_counter() - start
+    calibration = Calibration(
+        nb_traces=nb_traces,
+        average_trace_length=nb_symbols / nb_traces,
+        sampling_time=sampling_time / nb_traces,
+        insertion_time=insertion_time / max(nb_symbols, 1),
+        visit_time=visit_time / nb_nodes,
+        bytes_per_trace=(after_samples - before) / nb_traces,
+        bytes_per_node=(after_tree - after_samples) / nb_nodes,
+        tree_sizes=(tree_sizes[0], tree_sizes[1], tree_sizes[2]),
+    )
+    logger.info(f"Calibration: {calibration}")
+    return calibration
+
+
+def _count_nodes(root: Node) -> int:
+    """Count the nodes of a prefix tree."""
+    result = 0
+    stack = [root]
+    while len(stack) > 0:
+        node = stack.pop()
+        result += 1
+        stack.extend(node.next_nodes())
+    return result
+
+
+def _cap(value: int, upper_bound: Optional[int]) -> int:
+    """Apply a debug upper bound."""
+    return min(value, upper_bound) if upper_bound else value
+
+
+def _plan_palmer(params: PalmerParams, calibration: Calibration) -> LearningPlan:
+    """Plan a run of Palmer's algorithm."""
+    m0 = _compute_m0(params)
+    n1 = _compute_N(params, m0)
+    n2 = _sample_size(params)
+    required = dict(m0=m0, n1=n1, n2=n2)
+    actual = dict(
+        m0=_cap(m0, params.m0_max_debug),
+        n1=_cap(n1, params.n1_max_debug),
+        n2=_cap(n2, params.n2_max_debug),
+    )
+    max_iterations = params.n * params.alphabet_size + 1
+    tree_size = calibration.estimate_tree_size(actual["n1"])
+    length = calibration.average_trace_length
+    sampling_time = (actual["n1"] + actual["n2"]) * calibration.sampling_time
+    building_time = actual["n1"] * length * calibration.insertion_time
+    # the candidate nodes are computed with one walk of the tree, and kept across
+    # iterations; each iteration compares a candidate node with at most n vertices.
+    # The candidate nodes chosen in different iterations are disjoint subtrees,
+    # as are the multisets of the vertices, hence the tests of an iteration visit
+    # at most n times the chosen candidate node and once the whole tree.
+    iterations_time = (
+        (1 + params.n + max_iterations) * tree_size * calibration.visit_time
+    )
+    # the probabilities are estimated in chunks, one symbol at a time
+    estimation_time = actual["n2"] * length * calibration.insertion_time
+    total_time = sampling_time + building_time + iterations_time + estimation_time
+    memory = max(
+        actual["n1"] * calibration.bytes_per_trace
+        + tree_size * calibration.bytes_per_node,
+        min(actual["n2"], params.chunk_size) * calibration.bytes_per_trace,
+    )
+    return LearningPlan(
+        algorithm=Algorithm.PALMER.value,
+        required_sample_sizes=required,
+        sample_sizes=actual,
+        max_iterations=max_iterations,
+        expected_tree_size=tree_size,
+        estimated_time=total_time,
+        estimated_memory=memory,
+        calibration=calibration,
+    )
+
+
+def _plan_balle(params: BalleParams, calibration: Calibration) -> LearningPlan:
+    """Plan a run of Balle's algorithm."""
+    nb_samples = _get_balle_nb_samples(params)
+    required = _get_balle_required_sample_sizes(params, calibration)
+    max_iterations = params.n * params.alphabet_size + 1
+    tree_size = calibration.estimate_tree_size(nb_samples)
+    length = calibration.average_trace_length
+    sampling_time = (
+        nb_samples * calibration.sampling_time
+        if params.sample_generator is not None
+        else 0.0
+    )
+    building_time = nb_samples * length * calibration.insertion_time
+    # each iteration walks the part of the tree covered by the graph (at most
+    # the whole tree), and compares a candidate node with at most n vertices;
+    # as for Palmer's algorithm, the tests visit at most n times the chosen
+    # candidate node and once the whole tree.
+    iterations_time = (
+        (params.n + 2 * max_iterations) * tree_size * calibration.visit_time
+    )
+    memory = (
+        nb_samples * calibration.bytes_per_trace
+        + tree_size * calibration.bytes_per_node
+    )
+    return LearningPlan(
+        algorithm=Algorithm.BALLE.value,
+        required_sample_sizes=required,
+        sample_sizes=dict(nb_samples=nb_samples),
+        max_iterations=max_iterations,
+        expected_tree_size=tree_size,
+        estimated_time=sampling_time + building_time + iterations_time,
+        estimated_memory=memory,
+        calibration=calibration,
+    )
+
+
+def _plan_balle_streaming(
+    params: StreamingBalleParams, calibration: Calibration
+) -> LearningPlan:
+    """Plan a run of the streaming variant of Balle's algorithm."""
+    nb_samples = _get_balle_nb_samples(params)
+    length = calibration.average_trace_length
+    sampling_time = (
+        nb_samples * calibration.sampling_time
+        if params.sample_generator is not None
+        else 0.0
+    )
+    # every symbol updates two sketches, each costing about one tree insertion
+    processing_time = 2 * nb_samples * length * calibration.insertion_time
+    # at most one sketch per vertex and per transition
+    nb_sketches = params.n * (params.alphabet_size + 1)
+    sketch_memory = (
+        params.sketch_capacity * _BYTES_PER_MONITORED_PREFIX
+        + params.sketch_width * params.sketch_depth * 8
+    )
+    memory = (
+        params.batch_size * calibration.bytes_per_trace + nb_sketches * sketch_memory
+    )
+    return LearningPlan(
+        algorithm=Algorithm.BALLE_STREAMING.value,
+        required_sample_sizes=_get_balle_required_sample_sizes(params, calibration),
+        sample_sizes=dict(nb_samples=nb_samples),
+        max_iterations=params.n * params.alphabet_size + 1,
+        expected_tree_size=0,
+        estimated_time=sampling_time + processing_time,
+        estimated_memory=memory,
+        calibration=calibration,
+    )
+
+
+def _get_balle_required_sample_sizes(
+    params: BalleParams, calibration: Calibration
+) -> Dict[str, int]:
+    """
+    Get the sample sizes required by the theory for Balle's algorithm.
+
+    The distinctness test tells apart two multisets whose distributions are at
+    distance at least mu when its threshold is below mu / 2, i.e. when both
+    multisets have at least m0 traces, where
+
+        m0 >= 8 / mu^2 * log(16 * s / delta_0)
+
+    and s <= m0 * (L + 1) is the number of prefixes of a multiset, for traces
+    of expected length L (solved by fixed-point iteration).
+    The candidate nodes reached with probability below
+    w = epsilon / (n * (|alphabet| + 1)) can be ignored, since together they
+    account for at most epsilon of the probability mass. By the Chernoff bound,
+    all the others get m0 traces with probability at least 1 - delta_0 each, with
+
+        N >= 2 / w * (m0 + log(n * (|alphabet| + 1) / delta_0))
+
+    traces. The batch variant has no distinguishability parameter,
+    so mu is taken to be epsilon.
+
+    :param params: the parameters.
+    :param calibration: the calibration, for the expected trace length.
+    :return: the required sample sizes m0 and nb_samples.
+    """
+    mu = getattr(params, "mu", params.epsilon)
+    length = (
+        params.expected_trace_length
+        if params.expected_trace_length is not None
+        else calibration.average_trace_length
+    )
+    delta_0 = params.delta_0
+    m0 = 1.0
+    # the right-hand side is concave in m0, hence the iteration converges
+    for _ in range(100):
+        next_m0 = 8 / mu ** 2 * log(16 * max(m0, 1.0) * (length + 1) / delta_0)
+        if ceil(next_m0) == ceil(m0):
+            break
+        m0 = next_m0
+    nb_candidates = params.n * (params.alphabet_size + 1)
+    weight = params.epsilon / nb_candidates
+    nb_samples = 2 / weight * (ceil(m0) + log(nb_candidates / delta_0))
+    return dict(m0=ceil(m0), nb_samples=ceil(nb_samples))
+
+
+def _get_balle_nb_samples(params: BalleParams) -> int:
+    """Get the number of traces used by Balle's algorithm."""
+    if params.sample_generator is not None:
+        return params.nb_samples
+    dataset = params.dataset
+    assert_(
+        hasattr(dataset, "__len__"), "The size of the dataset must be known to plan."
+    )
+    return len(dataset)  # type: ignore
+
+
+_planners: Dict[Algorithm, Tuple[Type[_Params], Callable]] = {
+    Algorithm.PALMER: (PalmerParams, _plan_palmer),
+    Algorithm.BALLE: (BalleParams, _plan_balle),
+    Algorithm.BALLE_STREAMING: (StreamingBalleParams, _plan_balle_streaming),
+}
@@ -20,19 +20,24 @@
 # along with pdfa-learning.  If not, see <https://www.gnu.org/licenses/>.
 #
 """Base module for miscellaneous utilities."""
+import itertools
 from collections import Counter
 from functools import singledispatch
-from typing import Iterable, Union
+from typing import Dict, Iterable, Optional, Union
 
 from pdfa_learning.learn_pdfa.utils.multiset.base import Multiset
 from pdfa_learning.learn_pdfa.utils.multiset.naive import NaiveMultiset
 from pdfa_learning.learn_pdfa.utils.multiset.tree import (
     PrefixTreeMultiset,
     ReadOnlyPrefixTreeMultiset,
+    TreeMultisetLike,
+    infty_norm,
+    prefix_infty_norm,
 )
 from pdfa_learning.types import Word
 
 MultisetLike = Union[Multiset, Counter]
+_TREE_MULTISET_TYPES = (PrefixTreeMultiset, ReadOnlyPrefixTreeMultiset)
 
 
 def prefixes(t: Word) -> Iterable:
@@ -43,45 +48,81 @@ def prefixes(t: Word) -> Iterable:
         yield t[:i]
 
 
-def l_infty_norm(multiset1: MultisetLike, multiset2: MultisetLike) -> float:
-    """Compute the supremum distance between two probability distributions."""
-    current_max = 0.0
-    card1 = sum(multiset1.values())
-    card2 = sum(multiset2.values())
+def l_infty_norm(
+    multiset1: MultisetLike,
+    multiset2: MultisetLike,
+    threshold: Optional[float] = None,
+) -> float:
+    """
+    Compute the supremum distance between two probability distributions.
+
+    If both multisets are prefix-tree based, the two trees are visited together
+    (see 'infty_norm'); otherwise, the cardinalities are computed once,
+    and the counts of each trace are compared in a single pass.
+
+    :param multiset1: the first multiset.
+    :param multiset2: the second multiset.
+    :param threshold: if provided, stop as soon as the distance is greater than it.
+    :return: the distance, or a value greater than the threshold.
+    """
+    if isinstance(multiset1, _TREE_MULTISET_TYPES) and isinstance(
+        multiset2, _TREE_MULTISET_TYPES
+    ):
+        return infty_norm(multiset1, multiset2, threshold)
+    card1 = size(multiset1)
+    card2 = size(multiset2)
     assert card1 > 0, "Cardinality of multiset shouldn't be zero."
     assert card2 > 0, "Cardinality of multiset shouldn't be zero."
-    all_strings = set(multiset1).union(multiset2)
-    for string in all_strings:
-        norm = abs(
-            get_probability(multiset1, string) - get_probability(multiset2, string)
-        )
-        current_max = max([norm, current_max])
+    counts1 = get_counts(multiset1)
+    counts2 = get_counts(multiset2)
+    current_max = 0.0
+    differences = itertools.chain(
+        (
+            abs(count / card1 - counts2.get(string, 0) / card2)
+            for string, count in counts1.items()
+        ),
+        (count / card2 for string, count in counts2.items() if string not in counts1),
+    )
+    for norm in differences:
+        if norm > current_max:
+            current_max = norm
+            if threshold is not None and current_max > threshold:
+                break
     return current_max
 
 
 def prefix_distance_infty_norm(
-    multiset1: MultisetLike, multiset2: MultisetLike
+    multiset1: MultisetLike,
+    multiset2: MultisetLike,
+    threshold: Optional[float] = None,
 ) -> float:
-    """Compute the supremum distance of prefixes of two probability distributions."""
-    current_max = 0.0
-    card1 = sum(multiset1.values())
-    card2 = sum(multiset2.values())
-    assert card1 > 0, "Cardinality of multiset shouldn't be zero."
-    assert card2 > 0, "Cardinality of multiset shouldn't be zero."
-    all_strings = set(multiset1).union(multiset2)
-    for string in all_strings:
-        string = tuple(string)
-        for i in range(len(string)):
-            prefix, suffix = string[:i], string[i:]
-            d1, d2 = 0.0, 0.0
-            for j in range(len(suffix)):
-                current_suffix = suffix[:j]
-                d1 += multiset1[prefix + current_suffix]
-                d2 += multiset2[prefix + current_suffix]
-
-            norm = abs(d1 / card1 - d2 / card2)
-            current_max = max([norm, current_max])
-    return current_max
+    """
+    Compute the supremum distance of prefixes of two probability distributions.
+
+    That is, the maximum difference between the probabilities of the traces
+    having a certain prefix. The prefix probabilities are the counts of the
+    nodes of a prefix tree, hence the multisets that are not prefix-tree based
+    are first put in a prefix tree; then, the two trees are visited together.
+    The time is linear in the total size of the trees.
+
+    :param multiset1: the first multiset.
+    :param multiset2: the second multiset.
+    :param threshold: if provided, stop as soon as the distance is greater than it.
+    :return: the distance, or a value greater than the threshold.
+    """
+    return prefix_infty_norm(
+        _to_tree_multiset(multiset1), _to_tree_multiset(multiset2), threshold
+    )
+
+
+def _to_tree_multiset(multiset: MultisetLike) -> TreeMultisetLike:
+    """Get a prefix-tree based multiset with the same traces of a multiset."""
+    if isinstance(multiset, _TREE_MULTISET_TYPES):
+        return multiset
+    result = PrefixTreeMultiset()
+    for trace, count in get_counts(multiset).items():
+        result.add(tuple(trace), times=count)
+    return result
 
 
 @singledispatch
@@ -142,6 +183,20 @@ def _(multiset, trace) -> float:
     return d1 / card1
 
 
+@singledispatch
+def get_counts(multiset: MultisetLike) -> Dict[Word, int]:
+    """Get the counts of the traces of a multiset."""
+    result: Counter = Counter()
+    for trace, count in multiset.items():
+        result[trace] += count
+    return result
+
+
+@get_counts.register(Counter)  # type: ignore
+def _(multiset: Counter) -> Dict[Word, int]:
+    return multiset
+
+
 @singledispatch
 def size(_multiset: MultisetLike) -> int:
     """Get the multiset size.."""
@@ -158,15 +213,3 @@ def _(multiset: Multiset) -> int:
 def _(multiset: Counter) -> int:
     """Get the multiset size.."""
     return sum(multiset.values())
-
-
-"""
-for string in all_strings:
-    string = tuple(string)
-    for i in range(len(string)):
-        prefix, suffix = string[:i], string[i:]
-        d1 = get_prefix_probability(multiset1, prefix)
-        d2 = get_prefix_probability(multiset1, prefix)
-        norm = abs(d1 / card1 - d2 / card2)
-        current_max = max([norm, current_max])
-"""
@@ -0,0 +1,146 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020 Marco Favorito
+#
+# ------------------------------
+#
+# This file is part of pdfa-learning.
+#
+# pdfa-learning is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pdfa-learning is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with pdfa-learning.  If not, see <https://www.gnu.org/licenses/>.
+#
+"""Structured metrics of the iterations of the learning algorithms."""
+import json
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import IO, Any, Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from pdfa_learning.helpers.profiling import increment
+from pdfa_learning.types import Character, State
+
+
+@dataclass
+class IterationMetrics:
+    """
+    Metrics of one iteration of a learning algorithm.
+
+    algorithm: the name of the learning algorithm.
+    iteration: the index of the iteration.
+    candidates_time: wall time (in seconds) spent to compute the candidate nodes.
+    tests_time: wall time (in seconds) spent in the distinctness/similarity tests.
+    update_time: wall time (in seconds) spent to update the graph.
+    nodes_visited: number of prefix-tree nodes (or sample symbols) visited
+      to compute the candidate nodes.
+    nb_tests: number of distinctness/similarity tests.
+    nb_pruned: number of tests avoided thanks to cheap lower bounds of the distances.
+    candidate_sizes: the size of the multiset of each candidate node,
+      as triples (state, character, size).
+    nb_vertices: the number of vertices at the end of the iteration.
+    relearnt: True if the graph is learnt again from scratch from this iteration,
+      since an update changed some earlier decision.
+    """
+
+    algorithm: str
+    iteration: int
+    candidates_time: float = 0.0
+    tests_time: float = 0.0
+    update_time: float = 0.0
+    nodes_visited: int = 0
+    nb_tests: int = 0
+    nb_pruned: int = 0
+    candidate_sizes: List[Tuple[State, Character, int]] = field(default_factory=list)
+    nb_vertices: int = 0
+    relearnt: bool = False
+
+    @property
+    def total_time(self) -> float:
+        """Get the total wall time of the iteration."""
+        return self.candidates_time + self.tests_time + self.update_time
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the metrics as a dictionary."""
+        result = asdict(self)
+        result["total_time"] = self.total_time
+        return result
+
+    def to_json(self) -> str:
+        """Get the metrics as a JSON string, on a single line."""
+        return json.dumps(self.to_dict())
+
+
+IterationCallback = Callable[[IterationMetrics], None]
+
+
+def notify(callbacks: Sequence[IterationCallback], metrics: IterationMetrics) -> None:
+    """
+    Call the callbacks with the metrics of an iteration.
+
+    The counts of the iteration are also added to the counters of the profiler.
+
+    :param callbacks: the callbacks.
+    :param metrics: the metrics of the iteration.
+    """
+    increment(f"{metrics.algorithm}.candidates", len(metrics.candidate_sizes))
+    increment(f"{metrics.algorithm}.nodes_visited", metrics.nodes_visited)
+    increment(f"{metrics.algorithm}.tests", metrics.nb_tests)
+    increment(f"{metrics.algorithm}.pruned_tests", metrics.nb_pruned)
+    for callback in callbacks:
+        callback(metrics)
+
+
+class MetricsRecorder:
+    """Callback that keeps the metrics of every iteration in memory."""
+
+    def __init__(self):
+        """Initialize the recorder."""
+        self.metrics: List[IterationMetrics] = []
+
+    def __call__(self, metrics: IterationMetrics) -> None:
+        """Record the metrics of an iteration."""
+        self.metrics.append(metrics)
+
+    def to_json_lines(self) -> str:
+        """Get the recorded metrics in JSON lines format."""
+        return "".join(m.to_json() + "\n" for m in self.metrics)
+
+    def dump(self, path: Union[str, Path]) -> None:
+        """Write the recorded metrics on a file, in JSON lines format."""
+        Path(path).write_text(self.to_json_lines())
+
+
+class JsonLinesWriter:
+    """Callback that writes the metrics of every iteration as JSON lines."""
+
+    def __init__(self, output: Union[str, Path, IO[str]]):
+        """
+        Initialize the writer.
+
+        :param output: a path (the file is truncated) or a text stream.
+        """
+        self._owns_stream = isinstance(output, (str, Path))
+        self._stream: Optional[IO[str]] = (
+            open(output, "w") if isinstance(output, (str, Path)) else output
+        )
+
+    def __call__(self, metrics: IterationMetrics) -> None:
+        """Write the metrics of an iteration."""
+        if self._stream is None:
+            raise ValueError("The writer has been closed.")
+        self._stream.write(metrics.to_json() + "\n")
+        self._stream.flush()
+
+    def close(self) -> None:
+        """Close the writer; the stream is closed only if it has been opened by the writer."""
+        if self._stream is not None and self._owns_stream:
+            self._stream.close()
+        self._stream = None
@@ -21,9 +21,9 @@
 #
 """Base module."""
 from abc import ABC, abstractmethod
-from typing import Iterator, Sequence, Set, Tuple
+from typing import Dict, Iterator, Sequence, Set, Tuple
 
-from pdfa_learning.types import Word
+from pdfa_learning.types import Character, Word
 
 
 class Multiset(ABC):
@@ -91,3 +91,16 @@ class Multiset(ABC):
     def values(self) -> Sequence[int]:
         """Get the values."""
         return [v for _, v in self.items()]
+
+
+class SuccessorCounts(ABC):
+    """The number of traces of a multiset, by first character."""
+
+    @property
+    @abstractmethod
+    def size(self) -> int:
+        """Get the number of traces."""
+
+    @abstractmethod
+    def get_successor_counts(self) -> Dict[Character, int]:
+        """Get the number of traces that continue with each character."""
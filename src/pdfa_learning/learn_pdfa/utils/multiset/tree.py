@@ -23,13 +23,27 @@
 import itertools
 from collections import deque
 from dataclasses import dataclass
-from typing import Collection, Deque, Dict, Iterator, List, Optional, Set, Tuple
-
-import graphviz
-
-from pdfa_learning.learn_pdfa.utils.multiset.base import Multiset
+from typing import (
+    TYPE_CHECKING,
+    Collection,
+    Deque,
+    Dict,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+    Union,
+)
+
+from pdfa_learning.helpers.profiling import hot_path, increment
+from pdfa_learning.learn_pdfa.utils.multiset.base import Multiset, SuccessorCounts
 from pdfa_learning.types import Character, Word
 
+if TYPE_CHECKING:
+    import graphviz
+
 
 @dataclass
 class _TreeMetadata:
@@ -82,6 +96,7 @@ class Node:
         """Get the index of the node."""
         return self._index
 
+    @hot_path
     def add(self, trace: Word, times: int = 1) -> None:
         """Add a trace to the prefix tree."""
         current_node: Node = self
@@ -95,6 +110,11 @@ class Node:
             current_node.children_counts += times
         current_node.counts += times
 
+    def get_child(self, symbol: int) -> Optional["Node"]:
+        """Get the child reached by reading a symbol, if any."""
+        return self._symbol2child.get(symbol, None)
+
+    @hot_path
     def get_end_node(self, trace: Word) -> Optional["Node"]:
         """Get the finale node (after processing the entire trace)."""
         result: Optional[Node] = self
@@ -143,15 +163,9 @@ class Node:
 
     def get_counts(self, t: Word) -> int:
         """Get the counts of a trace."""
-        if len(t) == 0:
-            return self.counts
-        for index, character in enumerate(t):
-            next_node = self._symbol2child.get(character, None)
-            if next_node is not None:
-                # found next node.
-                return next_node.get_counts(t[index + 1 :])
-        # no next node found => trace is not in the multiset.
-        return 0
+        end_node = self.get_end_node(t)
+        # no end node found => trace is not in the multiset.
+        return end_node.counts if end_node is not None else 0
 
     def __eq__(self, other: object) -> bool:
         """Check equality."""
@@ -164,7 +178,7 @@ class Node:
         return hash((Node, self.index, self._tree_metadata))
 
 
-class PrefixTreeMultiset(Multiset):
+class PrefixTreeMultiset(Multiset, SuccessorCounts):
     """A multi-set based on a prefix tree."""
 
     def __init__(self, node: Optional[Node] = None):
@@ -183,6 +197,12 @@ class PrefixTreeMultiset(Multiset):
         """Add an element."""
         self._node.add(t, times=times)
 
+    def update(self, sample: Sequence[Word]):
+        """Add traces, and count the prefix-tree nodes created (see 'increment')."""
+        tree_size = self._node._tree_metadata.size
+        super().update(sample)
+        increment("prefix_tree.nodes", self._node._tree_metadata.size - tree_size)
+
     @property
     def size(self) -> int:
         """Get the size."""
@@ -213,19 +233,30 @@ class PrefixTreeMultiset(Multiset):
         """Get the traces and their counts."""
         return self._node.items()
 
-    def get_successors(self) -> Dict[Character, "ReadOnlyPrefixTreeMultiset"]:
-        """Get successors."""
-        successors: Dict[Character, Set[Node]] = {}
-        for next_char, next_node in self._node.next_transitions():
-            successors.setdefault(next_char, set()).add(next_node)
+    @property
+    def nodes(self) -> Collection[Node]:
+        """Get the prefix-tree nodes the multiset starts from."""
+        return [self._node]
+
+    @property
+    def nb_prefixes(self) -> int:
+        """Get the number of prefixes of the traces, counted with multiplicity."""
+        return _count_prefixes(self.nodes)
+
+    def get_successor_counts(self) -> Dict[Character, int]:
+        """
+        Get the number of traces that continue with each character.
 
-        result: Dict[Character, ReadOnlyPrefixTreeMultiset] = {
-            k: ReadOnlyPrefixTreeMultiset(v) for k, v in successors.items()
+        It is equivalent to (but much faster than) computing
+        'size * get_prefix_probability((character,))' for each character.
+        """
+        return {
+            next_char: next_node.children_counts
+            for next_char, next_node in self._node.next_transitions()
         }
-        return result
 
 
-class ReadOnlyPrefixTreeMultiset(Multiset):
+class ReadOnlyPrefixTreeMultiset(Multiset, SuccessorCounts):
     """Readonly multiset."""
 
     def __init__(self, nodes: Optional[Set[Node]] = None):
@@ -236,16 +267,26 @@ class ReadOnlyPrefixTreeMultiset(Multiset):
         """
         self._nodes = nodes if nodes is not None else {Node(parent=None)}
 
-    def get_successors(self) -> Dict[Character, "ReadOnlyPrefixTreeMultiset"]:
-        """Get successors."""
-        successors: Dict[Character, Set[Node]] = {}
+    @property
+    def nodes(self) -> Collection[Node]:
+        """Get the prefix-tree nodes the multiset starts from."""
+        return self._nodes
+
+    @property
+    def nb_prefixes(self) -> int:
+        """Get the number of prefixes of the traces, counted with multiplicity."""
+        return _count_prefixes(self.nodes)
+
+    def get_successor_counts(self) -> Dict[Character, int]:
+        """
+        Get the number of traces that continue with each character.
+
+        The nodes of the multiset are visited only once.
+        """
+        result: Dict[Character, int] = {}
         for node in self._nodes:
             for next_char, next_node in node.next_transitions():
-                successors.setdefault(next_char, set()).add(next_node)
-
-        result: Dict[Character, ReadOnlyPrefixTreeMultiset] = {
-            k: ReadOnlyPrefixTreeMultiset(v) for k, v in successors.items()
-        }
+                result[next_char] = result.get(next_char, 0) + next_node.children_counts
         return result
 
     def get_counts(self, trace: Word) -> int:
@@ -289,8 +330,109 @@ class ReadOnlyPrefixTreeMultiset(Multiset):
         return itertools.chain.from_iterable([n.items() for n in self._nodes])
 
 
-def node_to_graphviz(node: Node, max_depth: int = 10) -> graphviz.Digraph:
+TreeMultisetLike = Union[PrefixTreeMultiset, ReadOnlyPrefixTreeMultiset]
+
+
+def _count_prefixes(nodes: Collection[Node]) -> int:
+    """Count the prefixes of the traces in the subtrees of some nodes."""
+    result = 0
+    stack: List[Node] = list(nodes)
+    while len(stack) > 0:
+        node = stack.pop()
+        # every trace in the subtree of the node has one prefix ending in the node
+        result += node.children_counts
+        stack.extend(node.next_nodes())
+    return result
+
+
+@hot_path
+def infty_norm(
+    multiset1: TreeMultisetLike,
+    multiset2: TreeMultisetLike,
+    threshold: Optional[float] = None,
+) -> float:
+    """
+    Compute the L-infty distance between two prefix-tree based multisets.
+
+    That is, the maximum difference between the probabilities of a trace.
+    The two prefix trees are visited together, at most once.
+
+    :param multiset1: the first multiset.
+    :param multiset2: the second multiset.
+    :param threshold: if provided, stop as soon as the distance is greater than it.
+    :return: the distance, or a value greater than the threshold.
+    """
+    return _joint_tree_distance(multiset1, multiset2, False, threshold)
+
+
+@hot_path
+def prefix_infty_norm(
+    multiset1: TreeMultisetLike,
+    multiset2: TreeMultisetLike,
+    threshold: Optional[float] = None,
+) -> float:
+    """
+    Compute the prefix L-infty distance between two prefix-tree based multisets.
+
+    That is, the maximum difference between the probabilities of
+    the traces having a certain prefix.
+    The two prefix trees are visited together, at most once.
+
+    :param multiset1: the first multiset.
+    :param multiset2: the second multiset.
+    :param threshold: if provided, stop as soon as the distance is greater than it.
+    :return: the distance, or a value greater than the threshold.
+    """
+    return _joint_tree_distance(multiset1, multiset2, True, threshold)
+
+
+def _joint_tree_distance(
+    multiset1: TreeMultisetLike,
+    multiset2: TreeMultisetLike,
+    with_prefixes: bool,
+    threshold: Optional[float],
+) -> float:
+    """Visit two prefix trees together, and compute the (prefix) L-infty distance."""
+    card1, card2 = multiset1.size, multiset2.size
+    assert card1 > 0, "Cardinality of multiset shouldn't be zero."
+    assert card2 > 0, "Cardinality of multiset shouldn't be zero."
+    current_max = 0.0
+    stack: List[Tuple[List[Node], List[Node]]] = [
+        (list(multiset1.nodes), list(multiset2.nodes))
+    ]
+    while len(stack) > 0:
+        nodes1, nodes2 = stack.pop()
+        prefix_probability1 = sum(n.children_counts for n in nodes1) / card1
+        prefix_probability2 = sum(n.children_counts for n in nodes2) / card2
+        if with_prefixes:
+            probability1, probability2 = prefix_probability1, prefix_probability2
+        else:
+            probability1 = sum(n.counts for n in nodes1) / card1
+            probability2 = sum(n.counts for n in nodes2) / card2
+        current_max = max(current_max, abs(probability1 - probability2))
+        if threshold is not None and current_max > threshold:
+            return current_max
+
+        # probabilities in the subtrees are bounded by the prefix probabilities,
+        # so the subtrees cannot increase the current maximum.
+        if max(prefix_probability1, prefix_probability2) <= current_max:
+            continue
+
+        children: Dict[Character, Tuple[List[Node], List[Node]]] = {}
+        for node in nodes1:
+            for symbol, child in node.next_transitions():
+                children.setdefault(symbol, ([], []))[0].append(child)
+        for node in nodes2:
+            for symbol, child in node.next_transitions():
+                children.setdefault(symbol, ([], []))[1].append(child)
+        stack.extend(children.values())
+    return current_max
+
+
+def node_to_graphviz(node: Node, max_depth: int = 10) -> "graphviz.Digraph":
     """From prefix-tree node to Graphviz."""
+    import graphviz  # imported here, as it is only needed for rendering
+
     graph = graphviz.Digraph(format="svg")
     graph.graph_attr["rankdir"] = "LR"
     graph.edge("fake", str(node.index), style="bold")
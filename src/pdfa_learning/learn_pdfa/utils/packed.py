@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020 Marco Favorito
+#
+# ------------------------------
+#
+# This file is part of pdfa-learning.
+#
+# pdfa-learning is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pdfa-learning is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with pdfa-learning.  If not, see <https://www.gnu.org/licenses/>.
+#
+"""Compact storage of samples of traces."""
+import itertools
+from typing import Iterator, Sequence
+
+import numpy as np
+
+from pdfa_learning.types import Word
+
+
+class PackedSample:
+    """
+    A sample of traces, stored in a single array of symbols.
+
+    The i-th trace is 'symbols[offsets[i]:offsets[i + 1]]'. Suffixes of the
+    traces can be referred to by their position in 'symbols', without copies.
+    """
+
+    def __init__(self, symbols: np.ndarray, offsets: np.ndarray):
+        """
+        Initialize the sample.
+
+        :param symbols: the concatenation of the traces.
+        :param offsets: the start positions of the traces, followed by the total length.
+        """
+        self.symbols = symbols
+        self.offsets = offsets
+
+    @classmethod
+    def from_words(cls, words: Sequence[Word]) -> "PackedSample":
+        """Pack a sequence of traces."""
+        lengths = np.fromiter(map(len, words), dtype=np.int64, count=len(words))
+        offsets = np.zeros(len(words) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        symbols = np.fromiter(
+            itertools.chain.from_iterable(words),
+            dtype=np.int64,
+            count=int(offsets[-1]),
+        )
+        return cls(symbols, offsets)
+
+    @property
+    def starts(self) -> np.ndarray:
+        """Get the start positions of the traces."""
+        return self.offsets[:-1]
+
+    @property
+    def ends(self) -> np.ndarray:
+        """Get the end positions of the traces."""
+        return self.offsets[1:]
+
+    def __len__(self) -> int:
+        """Get the number of traces."""
+        return len(self.offsets) - 1
+
+    def __getitem__(self, index: int) -> Word:
+        """Get a trace."""
+        return tuple(
+            self.symbols[self.offsets[index] : self.offsets[index + 1]].tolist()
+        )
+
+    def __iter__(self) -> Iterator[Word]:
+        """Iterate over the traces."""
+        return (self[index] for index in range(len(self)))
@@ -0,0 +1,173 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020 Marco Favorito
+#
+# ------------------------------
+#
+# This file is part of pdfa-learning.
+#
+# pdfa-learning is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pdfa-learning is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with pdfa-learning.  If not, see <https://www.gnu.org/licenses/>.
+#
+"""Fixed-size sketches to summarize streams of items."""
+import heapq
+from array import array
+from typing import Dict, Hashable, Iterator, List, Tuple
+
+import numpy as np
+
+from pdfa_learning.helpers.base import assert_
+
+_MERSENNE_PRIME = (1 << 61) - 1
+
+
+class SpaceSaving:
+    """
+    Space-Saving sketch to track the most frequent items of a stream [1].
+
+    At most 'capacity' items are monitored. When a new item arrives and
+    the sketch is full, the item with the minimum count is replaced,
+    and the new item inherits its count. Counts are never underestimated,
+    and every item with frequency greater than total/capacity is monitored.
+
+    - [1] Metwally, A., Agrawal, D., & El Abbadi, A. (2005).
+          Efficient computation of frequent and top-k elements in data streams.
+          In International Conference on Database Theory (pp. 398-412).
+    """
+
+    def __init__(self, capacity: int):
+        """
+        Initialize the sketch.
+
+        :param capacity: the maximum number of monitored items.
+        """
+        assert_(capacity > 0, "Capacity must be greater than zero.")
+        self.capacity = capacity
+        self.total = 0
+        self._counts: Dict[Hashable, int] = {}
+        # min-heap of (count, tie-breaker, item); it may contain stale entries
+        self._heap: List[Tuple[int, int, Hashable]] = []
+        self._counter = 0
+
+    def add(self, item: Hashable, times: int = 1) -> None:
+        """Add an item to the sketch."""
+        self.total += times
+        count = self._counts.get(item)
+        if count is None:
+            if len(self._counts) >= self.capacity:
+                evicted, count = self._pop_min()
+                del self._counts[evicted]
+            else:
+                count = 0
+        self._counts[item] = count + times
+        self._push(item, count + times)
+
+    def get(self, item: Hashable) -> int:
+        """
+        Get an upper bound of the count of an item.
+
+        For items that are not monitored, the minimum count is returned.
+        """
+        count = self._counts.get(item)
+        if count is not None:
+            return count
+        return self.min_count
+
+    @property
+    def min_count(self) -> int:
+        """Get the minimum count among the monitored items (0 if the sketch is not full)."""
+        if len(self._counts) < self.capacity:
+            return 0
+        item, count = self._pop_min()
+        self._push(item, count)
+        return count
+
+    def items(self) -> Iterator[Tuple[Hashable, int]]:
+        """Get the monitored items and their counts."""
+        return iter(self._counts.items())
+
+    def __contains__(self, item: Hashable) -> bool:
+        """Check whether an item is monitored."""
+        return item in self._counts
+
+    def __len__(self) -> int:
+        """Get the number of monitored items."""
+        return len(self._counts)
+
+    def _push(self, item: Hashable, count: int) -> None:
+        """Push an entry in the heap, and drop stale entries when it grows too much."""
+        self._counter += 1
+        heapq.heappush(self._heap, (count, self._counter, item))
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [
+                (c, index, i) for index, (i, c) in enumerate(self._counts.items())
+            ]
+            heapq.heapify(self._heap)
+
+    def _pop_min(self) -> Tuple[Hashable, int]:
+        """Pop the monitored item with the minimum count."""
+        while True:
+            count, _, item = heapq.heappop(self._heap)
+            if self._counts.get(item) == count:
+                return item, count
+
+
+class CountMinSketch:
+    """
+    Count-Min sketch to estimate the frequencies of the items of a stream [1].
+
+    Estimates are never underestimated, and they overestimate the true
+    count by at most e * total / width with probability 1 - exp(-depth).
+
+    - [1] Cormode, G., & Muthukrishnan, S. (2005).
+          An improved data stream summary: the count-min sketch and its applications.
+          Journal of Algorithms, 55(1), 58-75.
+    """
+
+    def __init__(self, width: int, depth: int, seed: int = 0):
+        """
+        Initialize the sketch.
+
+        :param width: the number of counters per row.
+        :param depth: the number of rows (i.e. of hash functions).
+        :param seed: the seed for the hash functions.
+        """
+        assert_(width > 0, "Width must be greater than zero.")
+        assert_(depth > 0, "Depth must be greater than zero.")
+        self.width = width
+        self.depth = depth
+        self.total = 0
+        self._table = [array("q", [0]) * width for _ in range(depth)]
+        random_state = np.random.RandomState(seed)
+        self._a = [int(a) for a in random_state.randint(1, 1 << 30, size=depth)]
+        self._b = [int(b) for b in random_state.randint(0, 1 << 30, size=depth)]
+
+    def _indexes(self, item: Hashable) -> List[int]:
+        """Get the column of the item, for each row."""
+        h = hash(item)
+        return [
+            ((a * h + b) % _MERSENNE_PRIME) % self.width
+            for a, b in zip(self._a, self._b)
+        ]
+
+    def add(self, item: Hashable, times: int = 1) -> None:
+        """Add an item to the sketch."""
+        self.total += times
+        for row, column in enumerate(self._indexes(item)):
+            self._table[row][column] += times
+
+    def estimate(self, item: Hashable) -> int:
+        """Get an upper bound of the count of an item."""
+        return min(
+            self._table[row][column] for row, column in enumerate(self._indexes(item))
+        )
@@ -21,12 +21,11 @@
 #
 """Base module of the PDFA package."""
 
-from dataclasses import dataclass
-from typing import AbstractSet, Collection, Set, Tuple
-
-import numpy as np
+from dataclasses import InitVar, dataclass
+from typing import TYPE_CHECKING, AbstractSet, Collection, List, Set, Tuple
 
 from pdfa_learning.helpers.base import assert_
+from pdfa_learning.helpers.profiling import hot_path, increment
 from pdfa_learning.pdfa.helpers import (
     FINAL_STATE,
     FINAL_SYMBOL,
@@ -38,6 +37,9 @@ from pdfa_learning.pdfa.helpers import (
 )
 from pdfa_learning.types import Character, State, TransitionFunctionDict, Word
 
+if TYPE_CHECKING:
+    from pdfa_learning.pdfa.compiled import CompiledPDFA
+
 
 @dataclass(frozen=True)
 class PDFA:
@@ -54,17 +56,21 @@ class PDFA:
         - a dict of outgoing transition_dict has characters as keys and a tuple of next state and probability
           as value.
 
-    At initialization times, checks on the consistency of the transition dictionary are done.
+    At initialization times, checks on the consistency of the transition dictionary are done,
+    unless 'validate' is False (e.g. when the PDFA is loaded from a file whose checksum matches).
     """
 
     nb_states: int
     alphabet_size: int
     transition_dict: TransitionFunctionDict
+    validate: InitVar[bool] = True
 
-    def __post_init__(self):
+    def __post_init__(self, validate: bool):
         """Post-initialization checks."""
         assert_(self.nb_states > 0, "Number of states must be greater than zero.")
         assert_(self.alphabet_size > 0, "Alphabet size must be greater than zero.")
+        if not validate:
+            return
         _check_transitions_are_legal(
             self.transition_dict, self.nb_states, self.alphabet_size
         )
@@ -139,6 +145,22 @@ class PDFA:
             for char, (end, prob) in out_transitions.items()
         }
 
+    @property
+    def compiled(self) -> "CompiledPDFA":
+        """
+        Get the transition tables of the PDFA, and the statistics of its traces.
+
+        They are computed at the first access, and cached.
+        """
+        compiled = self.__dict__.get("_compiled")
+        if compiled is None:
+            from pdfa_learning.pdfa.compiled import compile_pdfa
+
+            compiled = compile_pdfa(self)
+            object.__setattr__(self, "_compiled", compiled)
+        return compiled
+
+    @hot_path
     def get_probability(self, word: Word):
         """Get the probability of a word."""
         if len(word) == 0:
@@ -159,8 +181,26 @@ class PDFA:
 
         return 0.0 if current_state != self.final_state else result
 
+    def most_probable_strings(
+        self, k: int, max_length: int
+    ) -> List[Tuple[Word, float]]:
+        """
+        Get the most probable words.
+
+        :param k: the number of words.
+        :param max_length: the maximum number of characters of a word, final symbol excluded.
+        :return: at most k words, with the final symbol, and their probabilities,
+          in decreasing order of probability.
+        """
+        from pdfa_learning.pdfa.search import most_probable_strings
+
+        return most_probable_strings(self, k, max_length)
+
+    @hot_path
     def sample(self) -> Word:
         """Sample a word."""
+        import numpy as np  # imported here, as scoring does not need it
+
         current_state = self.initial_state
         word = []
         while current_state != self.final_state:
@@ -171,4 +211,5 @@ class PDFA:
             next_character = characters[index]
             current_state = next_states[index]
             word.append(next_character)
+        increment("pdfa.sampled_traces")
         return word
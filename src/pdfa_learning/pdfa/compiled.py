@@ -0,0 +1,245 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020 Marco Favorito
+#
+# ------------------------------
+#
+# This file is part of pdfa-learning.
+#
+# pdfa-learning is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pdfa-learning is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with pdfa-learning.  If not, see <https://www.gnu.org/licenses/>.
+#
+"""Array representation of a PDFA, for the linear-algebra computations."""
+
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import numpy as np
+
+from pdfa_learning.helpers.base import assert_
+from pdfa_learning.pdfa.base import PDFA
+from pdfa_learning.pdfa.helpers import FINAL_SYMBOL
+
+UNDEFINED_STATE = -2
+MAX_DENSE_SIZE = 1000
+TOLERANCE = 1e-12
+
+
+def solve(
+    successors: np.ndarray,
+    weights: np.ndarray,
+    constants: np.ndarray,
+    transpose: bool = False,
+) -> np.ndarray:
+    """
+    Solve a linear system on the transitions of an automaton.
+
+    The system is x = constants + W x, where W[p, successors[p, c]] is the sum
+    of the weights[p, c]; or, if 'transpose' is True, x = constants + W^T x.
+    Small systems are solved directly; large ones by fixed-point iteration,
+    which converges since the weights are substochastic and every state reaches
+    the end of the words.
+
+    :param successors: the successors of the states, UNDEFINED_STATE if none.
+    :param weights: the weights of the transitions.
+    :param constants: the constant terms.
+    :param transpose: whether to solve the transposed system.
+    :return: the solution.
+    """
+    size = successors.shape[0]
+    defined = successors != UNDEFINED_STATE
+    rows = np.nonzero(defined)[0]
+    columns = successors[defined]
+    if size <= MAX_DENSE_SIZE:
+        matrix = np.zeros((size, size))
+        np.add.at(matrix, (rows, columns), weights[defined])
+        matrix = matrix.T if transpose else matrix
+        return np.linalg.solve(np.eye(size) - matrix, constants)
+
+    solution = constants.copy()
+    while True:
+        if transpose:
+            values = solution[rows] * weights[defined]
+            next_solution = constants + np.bincount(columns, values, minlength=size)
+        else:
+            values = weights[defined] * solution[columns]
+            next_solution = constants + np.bincount(rows, values, minlength=size)
+        change = np.max(np.abs(next_solution - solution))
+        solution = next_solution
+        if change <= TOLERANCE * max(np.max(np.abs(solution)), 1.0):
+            return solution
+
+
+@dataclass(frozen=True, eq=False)
+class CompiledPDFA:
+    """
+    Transition tables of a PDFA.
+
+    Both tables have one row per state and one column per character,
+    plus a last column for the final symbol:
+    - 'next_states[q, c]' is the successor of 'q' by 'c' (the final state
+      for the final symbol), or UNDEFINED_STATE if the transition is not defined;
+    - 'probabilities[q, c]' is the probability of the transition, 0 if undefined.
+
+    The statistics of the traces are computed in closed form, and cached.
+    """
+
+    next_states: np.ndarray
+    probabilities: np.ndarray
+    _cache: Dict[Any, Any] = field(default_factory=dict, init=False, repr=False)
+
+    def _cached(self, key: Any, compute: Callable[[], Any]) -> Any:
+        """Get a cached value, computing it if missing."""
+        if key not in self._cache:
+            self._cache[key] = compute()
+        return self._cache[key]
+
+    @property
+    def nb_states(self) -> int:
+        """Get the number of states."""
+        return self.next_states.shape[0]
+
+    @property
+    def alphabet_size(self) -> int:
+        """Get the alphabet size."""
+        return self.next_states.shape[1] - 1
+
+    @property
+    def stop_probabilities(self) -> np.ndarray:
+        """Get the probabilities of the final symbol, for every state."""
+        return self.probabilities[:, -1]
+
+    @property
+    def expected_visits(self) -> np.ndarray:
+        """Get the expected number of visits of every state, in a trace."""
+
+        def compute() -> np.ndarray:
+            initial = np.zeros(self.nb_states)
+            initial[0] = 1.0
+            return solve(
+                self.next_states[:, :-1],
+                self.probabilities[:, :-1],
+                initial,
+                transpose=True,
+            )
+
+        return self._cached("expected_visits", compute)
+
+    @property
+    def symbol_frequencies(self) -> np.ndarray:
+        """
+        Get the expected number of occurrences of every character, in a trace.
+
+        The last entry is the one of the final symbol, which occurs once.
+        """
+        return self._cached(
+            "symbol_frequencies", lambda: self.expected_visits @ self.probabilities
+        )
+
+    @property
+    def expected_length(self) -> float:
+        """Get the expected number of characters of a trace, final symbol excluded."""
+        return self._cached(
+            "expected_length", lambda: float(np.sum(self.symbol_frequencies[:-1]))
+        )
+
+    @property
+    def best_completion_probabilities(self) -> np.ndarray:
+        """
+        Get the probability of the most probable completion from every state.
+
+        That is, the maximum probability of the suffixes that, read from a state,
+        reach the final state. The most probable completions are simple paths,
+        so the fixed-point iteration ends after at most nb_states steps.
+        """
+
+        def compute() -> np.ndarray:
+            next_states = self.next_states[:, :-1]
+            defined = next_states != UNDEFINED_STATE
+            probabilities = np.where(defined, self.probabilities[:, :-1], 0.0)
+            next_states = np.where(defined, next_states, 0)
+            result = self.stop_probabilities.copy()
+            while True:
+                best_next = np.max(probabilities * result[next_states], axis=1)
+                next_result = np.maximum(self.stop_probabilities, best_next)
+                if np.array_equal(next_result, result):
+                    return result
+                result = next_result
+
+        return self._cached("best_completion_probabilities", compute)
+
+    def length_distribution(self, max_length: int) -> np.ndarray:
+        """
+        Get the distribution of the length of the traces, final symbol excluded.
+
+        :param max_length: the maximum length.
+        :return: the probabilities of the lengths from 0 to 'max_length'.
+        """
+        assert_(max_length >= 0, "Maximum length must be non-negative.")
+
+        def compute() -> np.ndarray:
+            next_states = self.next_states[:, :-1]
+            defined = next_states != UNDEFINED_STATE
+            rows = np.nonzero(defined)[0]
+            result = np.zeros(max_length + 1)
+            distribution: np.ndarray = np.zeros(self.nb_states)
+            distribution[0] = 1.0
+            for length in range(max_length + 1):
+                result[length] = distribution @ self.stop_probabilities
+                values = distribution[rows] * self.probabilities[:, :-1][defined]
+                distribution = np.bincount(
+                    next_states[defined], values, minlength=self.nb_states
+                )
+            return result
+
+        return self._cached(("length_distribution", max_length), compute)
+
+
+def compile_pdfa(pdfa: PDFA, alphabet_size: Optional[int] = None) -> CompiledPDFA:
+    """
+    Compute the transition tables of a PDFA.
+
+    :param pdfa: the PDFA.
+    :param alphabet_size: the alphabet size of the tables, if larger than the one of the PDFA
+      (e.g. to compare PDFAs over different alphabets).
+    :return: the compiled PDFA.
+    """
+    alphabet_size = pdfa.alphabet_size if alphabet_size is None else alphabet_size
+    assert_(
+        alphabet_size >= pdfa.alphabet_size,
+        f"Alphabet size {alphabet_size} is smaller than {pdfa.alphabet_size}.",
+    )
+    next_states = np.full(
+        (pdfa.nb_states, alphabet_size + 1), UNDEFINED_STATE, dtype=np.int64
+    )
+    probabilities = np.zeros((pdfa.nb_states, alphabet_size + 1))
+    for state, out_transitions in pdfa.transition_dict.items():
+        for character, (next_state, probability) in out_transitions.items():
+            column = alphabet_size if character == FINAL_SYMBOL else character
+            next_states[state, column] = next_state
+            probabilities[state, column] = probability
+    return CompiledPDFA(next_states, probabilities)
+
+
+def compile_pair(first: PDFA, second: PDFA) -> Tuple[CompiledPDFA, CompiledPDFA]:
+    """
+    Compile two PDFAs over the same alphabet, the larger of the two.
+
+    :param first: the first PDFA.
+    :param second: the second PDFA.
+    :return: the compiled PDFAs.
+    """
+    if first.alphabet_size == second.alphabet_size:
+        return first.compiled, second.compiled
+    alphabet_size = max(first.alphabet_size, second.alphabet_size)
+    return compile_pdfa(first, alphabet_size), compile_pdfa(second, alphabet_size)
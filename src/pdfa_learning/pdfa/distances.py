@@ -0,0 +1,235 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020 Marco Favorito
+#
+# ------------------------------
+#
+# This file is part of pdfa-learning.
+#
+# pdfa-learning is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pdfa-learning is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with pdfa-learning.  If not, see <https://www.gnu.org/licenses/>.
+#
+"""
+Exact distances between PDFAs, without sampling.
+
+The sums over all the words of a function of the probabilities of the two
+PDFAs are computed on the product automaton: a pair of states is reachable if
+the two PDFAs read the same prefix with positive probability, and the sums
+are the solutions of linear systems over the reachable pairs (see 'compiled.solve'). Hence, the cost is
+polynomial in the number of pairs (at most the product of the numbers of states)
+and in the alphabet size.
+"""
+
+import heapq
+from math import exp, inf, sqrt
+from typing import List, Tuple
+
+import numpy as np
+
+from pdfa_learning.pdfa.base import PDFA
+from pdfa_learning.pdfa.compiled import (
+    UNDEFINED_STATE,
+    CompiledPDFA,
+    compile_pair,
+    solve,
+)
+
+
+def _product(
+    first: CompiledPDFA, second: CompiledPDFA
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Compute the product automaton.
+
+    :param first: the first compiled PDFA.
+    :param second: the second compiled PDFA.
+    :return: the reachable pairs of states, with shape (nb_pairs, 2), the initial
+      pair first; and the successors of the pairs, with shape (nb_pairs, alphabet_size),
+      as indexes of pairs, or UNDEFINED_STATE if a PDFA cannot read the character.
+    """
+    alphabet_size = first.alphabet_size
+    nb_states = second.nb_states
+    next_states1 = first.next_states[:, :alphabet_size].astype(np.int64)
+    next_states2 = second.next_states[:, :alphabet_size].astype(np.int64)
+
+    def _next_codes(codes: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        states1, states2 = np.divmod(codes, nb_states)
+        both = (first.probabilities[states1, :alphabet_size] > 0) & (
+            second.probabilities[states2, :alphabet_size] > 0
+        )
+        next_codes = next_states1[states1] * nb_states + next_states2[states2]
+        return next_codes, both
+
+    code2index = {0: 0}
+    codes: List[int] = [0]
+    frontier = np.zeros(1, dtype=np.int64)
+    while frontier.size > 0:
+        next_codes, both = _next_codes(frontier)
+        new_codes = []
+        for code in np.unique(next_codes[both]).tolist():
+            if code not in code2index:
+                code2index[code] = len(codes)
+                codes.append(code)
+                new_codes.append(code)
+        frontier = np.array(new_codes, dtype=np.int64)
+
+    all_codes = np.array(codes, dtype=np.int64)
+    next_codes, both = _next_codes(all_codes)
+    order = np.argsort(all_codes)
+    successors = np.full(both.shape, UNDEFINED_STATE, dtype=np.int64)
+    successors[both] = order[np.searchsorted(all_codes[order], next_codes[both])]
+    pairs = np.stack(np.divmod(all_codes, nb_states), axis=1)
+    return pairs, successors
+
+
+def _product_sum(first: PDFA, second: PDFA, exponent: float) -> float:
+    """Compute the sum over all words of (first(w) * second(w)) ** exponent."""
+    compiled1, compiled2 = compile_pair(first, second)
+    pairs, successors = _product(compiled1, compiled2)
+    weights = (
+        compiled1.probabilities[pairs[:, 0]] * compiled2.probabilities[pairs[:, 1]]
+    ) ** exponent
+    return float(solve(successors, weights[:, :-1], weights[:, -1])[0])
+
+
+def inner_product(first: PDFA, second: PDFA) -> float:
+    """
+    Compute the inner product of the distributions of two PDFAs.
+
+    :param first: the first PDFA.
+    :param second: the second PDFA.
+    :return: the sum over all words w of first(w) * second(w).
+    """
+    return _product_sum(first, second, 1.0)
+
+
+def bhattacharyya_coefficient(first: PDFA, second: PDFA) -> float:
+    """
+    Compute the Bhattacharyya coefficient of the distributions of two PDFAs.
+
+    :param first: the first PDFA.
+    :param second: the second PDFA.
+    :return: the sum over all words w of sqrt(first(w) * second(w)).
+    """
+    return min(max(_product_sum(first, second, 0.5), 0.0), 1.0)
+
+
+def l2_distance(first: PDFA, second: PDFA) -> float:
+    """
+    Compute the L2 distance between the distributions of two PDFAs.
+
+    :param first: the first PDFA.
+    :param second: the second PDFA.
+    :return: the L2 distance.
+    """
+    squared = (
+        inner_product(first, first)
+        + inner_product(second, second)
+        - 2 * inner_product(first, second)
+    )
+    return sqrt(max(squared, 0.0))
+
+
+def kl_divergence(first: PDFA, second: PDFA) -> float:
+    """
+    Compute the Kullback-Leibler divergence KL(first || second).
+
+    :param first: the first PDFA.
+    :param second: the second PDFA.
+    :return: the divergence, in nats; infinite if the second PDFA gives
+      probability zero to a word of the first one.
+    """
+    compiled1, compiled2 = compile_pair(first, second)
+    pairs, successors = _product(compiled1, compiled2)
+    probabilities1 = compiled1.probabilities[pairs[:, 0]]
+    probabilities2 = compiled2.probabilities[pairs[:, 1]]
+    positive = probabilities1 > 0
+    if np.any(positive & (probabilities2 == 0)):
+        return inf
+    ratios = np.ones_like(probabilities1)
+    ratios[positive] = probabilities1[positive] / probabilities2[positive]
+    costs = np.sum(probabilities1 * np.log(ratios), axis=1)
+    return max(float(solve(successors, probabilities1[:, :-1], costs)[0]), 0.0)
+
+
+def _enumeration_bounds(
+    first: CompiledPDFA, second: CompiledPDFA, max_expansions: int
+) -> Tuple[float, float]:
+    """
+    Bound the total variation distance by enumerating the most probable prefixes.
+
+    The words of the enumerated prefixes contribute exactly; for the remaining
+    mass R1 and R2 of the two PDFAs, the contribution is between |R1 - R2| and R1 + R2.
+    """
+    probabilities1 = first.probabilities.tolist()
+    probabilities2 = second.probabilities.tolist()
+    next_states1 = first.next_states.tolist()
+    next_states2 = second.next_states.tolist()
+    alphabet_size = first.alphabet_size
+    absolute_difference = 0.0
+    remaining1 = remaining2 = 1.0
+    queue: List[Tuple[float, float, float, int, int]] = [(-2.0, 1.0, 1.0, 0, 0)]
+    expansions = 0
+    while len(queue) > 0 and expansions < max_expansions:
+        _, mass1, mass2, state1, state2 = heapq.heappop(queue)
+        expansions += 1
+        remaining1 -= mass1
+        remaining2 -= mass2
+        for character in range(alphabet_size + 1):
+            next_mass1 = mass1 * probabilities1[state1][character]
+            next_mass2 = mass2 * probabilities2[state2][character]
+            if character < alphabet_size and next_mass1 > 0 and next_mass2 > 0:
+                next_state1 = next_states1[state1][character]
+                next_state2 = next_states2[state2][character]
+                item = (-next_mass1 - next_mass2, next_mass1, next_mass2)
+                heapq.heappush(queue, item + (next_state1, next_state2))
+                remaining1 += next_mass1
+                remaining2 += next_mass2
+            else:
+                # either the word ends, or only one PDFA reads the prefix
+                absolute_difference += abs(next_mass1 - next_mass2)
+    remaining1, remaining2 = max(remaining1, 0.0), max(remaining2, 0.0)
+    lower = (absolute_difference + abs(remaining1 - remaining2)) / 2
+    upper = (absolute_difference + remaining1 + remaining2) / 2
+    return lower, upper
+
+
+def total_variation_bounds(
+    first: PDFA, second: PDFA, max_expansions: int = 10000
+) -> Tuple[float, float]:
+    """
+    Bound the total variation distance between the distributions of two PDFAs.
+
+    Computing it exactly is NP-hard, so we combine:
+    - the bounds from the Bhattacharyya coefficient BC: 1 - BC <= TV <= sqrt(1 - BC^2);
+    - the lower bound from the L2 distance: L2 / 2 <= TV;
+    - Pinsker's and Bretagnolle-Huber's upper bounds from the KL divergences;
+    - the enumeration of the most probable prefixes, up to 'max_expansions' of them:
+      the bounds are exact if all the prefixes with positive probability are enumerated.
+
+    :param first: the first PDFA.
+    :param second: the second PDFA.
+    :param max_expansions: the maximum number of prefixes to enumerate.
+    :return: the lower and the upper bound of the total variation distance.
+    """
+    coefficient = bhattacharyya_coefficient(first, second)
+    lower = max(1 - coefficient, l2_distance(first, second) / 2)
+    upper = min(1.0, sqrt(1 - coefficient ** 2))
+    for divergence in (kl_divergence(first, second), kl_divergence(second, first)):
+        if divergence < inf:
+            upper = min(upper, sqrt(divergence / 2), sqrt(1 - exp(-divergence)))
+    if max_expansions > 0:
+        compiled1, compiled2 = compile_pair(first, second)
+        lower2, upper2 = _enumeration_bounds(compiled1, compiled2, max_expansions)
+        lower, upper = max(lower, lower2), min(upper, upper2)
+    return lower, max(lower, upper)
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020 Marco Favorito
+#
+# ------------------------------
+#
+# This file is part of pdfa-learning.
+#
+# pdfa-learning is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pdfa-learning is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with pdfa-learning.  If not, see <https://www.gnu.org/licenses/>.
+#
+"""Minimization and equivalence of PDFAs."""
+
+from collections import deque
+from typing import Deque, Dict, List, Tuple
+
+import numpy as np
+
+from pdfa_learning.helpers.base import assert_
+from pdfa_learning.pdfa.base import PDFA
+from pdfa_learning.pdfa.compiled import CompiledPDFA, compile_pair
+from pdfa_learning.pdfa.helpers import FINAL_STATE, FINAL_SYMBOL
+from pdfa_learning.types import State, TransitionFunctionDict
+
+
+def _reachable_states(compiled: CompiledPDFA) -> List[State]:
+    """Get the states reachable with positive probability, in breadth-first order."""
+    next_states = compiled.next_states[:, :-1].tolist()
+    positive = (compiled.probabilities[:, :-1] > 0).tolist()
+    result = [0]
+    visited = {0}
+    queue: Deque[State] = deque(result)
+    while len(queue) > 0:
+        state = queue.popleft()
+        for character, next_state in enumerate(next_states[state]):
+            if positive[state][character] and next_state not in visited:
+                visited.add(next_state)
+                result.append(next_state)
+                queue.append(next_state)
+    return result
+
+
+def _cluster(
+    compiled: CompiledPDFA, states: List[State], tolerance: float
+) -> Dict[State, int]:
+    """
+    Group the states by their next-symbol distributions.
+
+    A state joins the first group whose first state has a distribution
+    that differs by at most 'tolerance' (in L-infty norm), and that reads
+    the same characters with positive probability.
+
+    :param compiled: the compiled PDFA.
+    :param states: the states to group.
+    :param tolerance: the tolerance on the probabilities.
+    :return: the group of every state, numbered in order of first occurrence.
+    """
+    probabilities = compiled.probabilities.tolist()
+    result: Dict[State, int] = {}
+    nb_groups = 0
+    key2groups: Dict[Tuple, List[Tuple[State, int]]] = {}
+    for state in states:
+        row = probabilities[state]
+        key = tuple(row) if tolerance == 0.0 else tuple(p > 0 for p in row)
+        groups = key2groups.setdefault(key, [])
+        for representative, group in groups:
+            representative_row = probabilities[representative]
+            if all(abs(p - q) <= tolerance for p, q in zip(row, representative_row)):
+                result[state] = group
+                break
+        else:
+            result[state] = nb_groups
+            groups.append((state, nb_groups))
+            nb_groups += 1
+    return result
+
+
+def _refine(
+    compiled: CompiledPDFA, states: List[State], tolerance: float
+) -> Dict[State, int]:
+    """
+    Compute the partition of the states into blocks of equivalent states.
+
+    The states are first grouped by their next-symbol distributions;
+    then, at every step, two states stay in the same block if they were
+    in the same block and they go to the same blocks with the same characters.
+    The partition is stable when no block is split.
+
+    :param compiled: the compiled PDFA.
+    :param states: the states to partition, the initial state first.
+    :param tolerance: the tolerance on the probabilities.
+    :return: the block of every state, numbered in order of first occurrence.
+    """
+    next_states = compiled.next_states[:, :-1].tolist()
+    positive = (compiled.probabilities[:, :-1] > 0).tolist()
+    blocks = _cluster(compiled, states, tolerance)
+    nb_blocks = len(set(blocks.values()))
+    while True:
+        key2block: Dict[Tuple, int] = {}
+        new_blocks: Dict[State, int] = {}
+        for state in states:
+            successor_blocks = tuple(
+                blocks[next_state] if is_positive else -1
+                for next_state, is_positive in zip(next_states[state], positive[state])
+            )
+            key = (blocks[state], successor_blocks)
+            new_blocks[state] = key2block.setdefault(key, len(key2block))
+        blocks = new_blocks
+        if len(key2block) == nb_blocks:
+            return blocks
+        nb_blocks = len(key2block)
+
+
+def minimize(pdfa: PDFA, tolerance: float = 0.0) -> PDFA:
+    """
+    Minimize a PDFA.
+
+    The states that are not reachable with positive probability are removed
+    (e.g. a ground node reached only by transitions with probability zero),
+    and the states with the same future distribution, up to the tolerance,
+    are merged. The next-symbol distribution of a merged state is the average of the
+    ones of its states, weighted by their expected number of visits.
+
+    :param pdfa: the PDFA.
+    :param tolerance: the maximum difference between the probabilities
+      of the same transition from two merged states.
+    :return: the minimized PDFA.
+    """
+    assert_(tolerance >= 0, "Tolerance must be non-negative.")
+    compiled = pdfa.compiled
+    states = _reachable_states(compiled)
+    blocks = _refine(compiled, states, tolerance)
+    nb_blocks = len(set(blocks.values()))
+    # the average is computed as the differences from the first state of the block,
+    # so that the probabilities of identical states are preserved exactly
+    representatives: Dict[int, State] = {}
+    for state, block in blocks.items():
+        representatives.setdefault(block, state)
+    weights = compiled.expected_visits
+    block_differences = np.zeros((nb_blocks, compiled.alphabet_size + 1))
+    block_weights = np.zeros(nb_blocks)
+    for state, block in blocks.items():
+        difference = (
+            compiled.probabilities[state]
+            - compiled.probabilities[representatives[block]]
+        )
+        block_differences[block] += weights[state] * difference
+        block_weights[block] += weights[state]
+    block_probabilities = (
+        compiled.probabilities[[representatives[block] for block in range(nb_blocks)]]
+        + block_differences / block_weights[:, None]
+    )
+
+    transition_dict: TransitionFunctionDict = {}
+    for block, state in representatives.items():
+        out_transitions = transition_dict.setdefault(block, {})
+        for character, probability in enumerate(block_probabilities[block].tolist()):
+            if probability == 0.0:
+                continue
+            if character == compiled.alphabet_size:
+                out_transitions[FINAL_SYMBOL] = (FINAL_STATE, probability)
+            else:
+                next_state = int(compiled.next_states[state, character])
+                out_transitions[character] = (blocks[next_state], probability)
+    return PDFA(nb_blocks, pdfa.alphabet_size, transition_dict)
+
+
+def are_equivalent(first: PDFA, second: PDFA, tolerance: float = 0.0) -> bool:
+    """
+    Check whether two PDFAs define the same distribution.
+
+    The pairs of states reached by the same prefixes are visited as in
+    the algorithm of Hopcroft and Karp: the states of a pair are merged
+    with union-find, so every state is paired at most once with a new class.
+    The PDFAs are equivalent if the next-symbol distributions of the states
+    of every pair differ by at most the tolerance (in L-infty norm).
+
+    :param first: the first PDFA.
+    :param second: the second PDFA.
+    :param tolerance: the tolerance on the probabilities.
+    :return: True if the PDFAs are equivalent, False otherwise.
+    """
+    assert_(tolerance >= 0, "Tolerance must be non-negative.")
+    compiled1, compiled2 = compile_pair(first, second)
+    offset = compiled1.nb_states
+    parents = list(range(offset + compiled2.nb_states))
+
+    def find(node: int) -> int:
+        while parents[node] != node:
+            parents[node] = parents[parents[node]]
+            node = parents[node]
+        return node
+
+    alphabet_size = compiled1.alphabet_size
+    parents[offset] = 0
+    stack = [(0, 0)]
+    while len(stack) > 0:
+        state1, state2 = stack.pop()
+        probabilities1 = compiled1.probabilities[state1]
+        probabilities2 = compiled2.probabilities[state2]
+        if np.max(np.abs(probabilities1 - probabilities2)) > tolerance:
+            return False
+        both = (probabilities1[:alphabet_size] > 0) & (
+            probabilities2[:alphabet_size] > 0
+        )
+        for character in np.nonzero(both)[0]:
+            next_state1 = int(compiled1.next_states[state1, character])
+            next_state2 = int(compiled2.next_states[state2, character])
+            root1, root2 = find(next_state1), find(offset + next_state2)
+            if root1 != root2:
+                parents[root2] = root1
+                stack.append((next_state1, next_state2))
+    return True
@@ -0,0 +1,211 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020 Marco Favorito
+#
+# ------------------------------
+#
+# This file is part of pdfa-learning.
+#
+# pdfa-learning is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pdfa-learning is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with pdfa-learning.  If not, see <https://www.gnu.org/licenses/>.
+#
+"""Generate random PDFAs."""
+
+import random
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from pdfa_learning.helpers.base import assert_
+from pdfa_learning.pdfa.base import PDFA
+from pdfa_learning.pdfa.helpers import FINAL_STATE, FINAL_SYMBOL
+from pdfa_learning.types import Character, State, TransitionFunctionDict
+
+MAX_TRIES = 100
+
+
+def make_random_pdfa(
+    nb_states: int,
+    alphabet_size: int,
+    expected_length: float = 10.0,
+    out_degree_weights: Optional[Sequence[float]] = None,
+    distinguishability: float = 0.0,
+    seed: Optional[int] = None,
+) -> PDFA:
+    """
+    Generate a random PDFA.
+
+    Every state is reachable from the initial state: the states are first
+    connected by a random tree rooted in the initial state, and then the
+    other transitions go to random states. Every state ends the trace with
+    the same probability, so that the expected number of characters before
+    the final symbol is 'expected_length', and every state reaches the final state.
+
+    If 'distinguishability' is positive, the next-symbol distributions
+    of any two states differ by at least that much on some character:
+    hence, it is a lower bound of the prefix L-infty distance between states.
+
+    :param nb_states: the number of states.
+    :param alphabet_size: the alphabet size.
+    :param expected_length: the expected number of characters of a trace.
+    :param out_degree_weights: the weights of the number of outgoing
+      transitions (final transition excluded), from 1 to 'alphabet_size'.
+      If None, the out-degrees are uniformly distributed.
+    :param distinguishability: the minimum distance between the
+      next-symbol distributions of two states.
+    :param seed: the seed of the random generator.
+    :return: the PDFA.
+    """
+    assert_(nb_states > 0, "Number of states must be greater than zero.")
+    assert_(alphabet_size > 0, "Alphabet size must be greater than zero.")
+    assert_(expected_length > 0, "Expected length must be greater than zero.")
+    assert_(
+        out_degree_weights is None or len(out_degree_weights) == alphabet_size,
+        "There must be one weight for each out-degree from 1 to the alphabet size.",
+    )
+    assert_(0.0 <= distinguishability < 1.0, "Distinguishability must be in [0, 1).")
+    rng = random.Random(seed)
+    stop_probability = 1.0 / (expected_length + 1.0)
+
+    degrees = range(1, alphabet_size + 1)
+    out_degrees = rng.choices(degrees, weights=out_degree_weights, k=nb_states)
+    children = _make_tree(rng, out_degrees)
+    distributions = _NextSymbolDistributions(
+        distinguishability, nb_states, alphabet_size
+    )
+    transitions: TransitionFunctionDict = {}
+    for state in range(nb_states):
+        for nb_tries in range(MAX_TRIES):
+            # if the distribution is too close to another one, try other out-degrees
+            out_degree = (
+                out_degrees[state]
+                if nb_tries == 0
+                else max(
+                    len(children[state]),
+                    rng.choices(degrees, weights=out_degree_weights)[0],
+                )
+            )
+            out_transitions = _make_out_transitions(
+                rng,
+                children[state],
+                out_degree,
+                nb_states,
+                alphabet_size,
+                1.0 - stop_probability,
+            )
+            vector = [
+                out_transitions.get(character, (FINAL_STATE, 0.0))[1]
+                for character in range(alphabet_size)
+            ]
+            if distributions.add(vector):
+                break
+        else:
+            assert_(
+                False,
+                f"Cannot find {nb_states} states whose distributions are "
+                f"{distinguishability}-distinguishable; decrease the distinguishability.",
+            )
+        out_transitions[FINAL_SYMBOL] = (FINAL_STATE, stop_probability)
+        transitions[state] = out_transitions
+    return PDFA(nb_states, alphabet_size, transitions)
+
+
+def _make_tree(rng: random.Random, out_degrees: List[int]) -> List[List[State]]:
+    """
+    Connect the states with a random tree rooted in the initial state.
+
+    Every state has at most as many children as its out-degree.
+    Since every out-degree is at least one, there is always a state
+    that can be the parent of the next one.
+
+    :param rng: the random generator.
+    :param out_degrees: the number of outgoing transitions of each state.
+    :return: the children of each state.
+    """
+    nb_states = len(out_degrees)
+    children: List[List[State]] = [[] for _ in range(nb_states)]
+    # the states that can have other children
+    free_states: List[State] = [0]
+    for state in range(1, nb_states):
+        index = rng.randrange(len(free_states))
+        parent = free_states[index]
+        children[parent].append(state)
+        if len(children[parent]) == out_degrees[parent]:
+            free_states[index] = free_states[-1]
+            free_states.pop()
+        free_states.append(state)
+    return children
+
+
+def _make_out_transitions(
+    rng: random.Random,
+    children: List[State],
+    out_degree: int,
+    nb_states: int,
+    alphabet_size: int,
+    total_probability: float,
+) -> Dict[Character, Tuple[State, float]]:
+    """
+    Make the outgoing transitions of a state.
+
+    :param rng: the random generator.
+    :param children: the children of the state in the tree.
+    :param out_degree: the number of outgoing transitions.
+    :param nb_states: the number of states.
+    :param alphabet_size: the alphabet size.
+    :param total_probability: the sum of the probabilities of the transitions.
+    :return: the transitions, from characters to next states and probabilities.
+    """
+    targets = children + [
+        rng.randrange(nb_states) for _ in range(out_degree - len(children))
+    ]
+    rng.shuffle(targets)
+    characters = rng.sample(range(alphabet_size), out_degree)
+    weights = [rng.expovariate(1.0) for _ in characters]
+    total_weight = sum(weights)
+    return {
+        character: (target, total_probability * weight / total_weight)
+        for character, target, weight in zip(characters, targets, weights)
+    }
+
+
+class _NextSymbolDistributions:
+    """A set of next-symbol distributions, at a minimum L-infty distance from each other."""
+
+    def __init__(self, distance: float, max_size: int, alphabet_size: int):
+        """
+        Initialize the set.
+
+        :param distance: the minimum distance.
+        :param max_size: the maximum number of distributions.
+        :param alphabet_size: the alphabet size.
+        """
+        self._distance = distance
+        self._vectors = np.zeros((max_size, alphabet_size))
+        self._size = 0
+
+    def add(self, vector: Sequence[float]) -> bool:
+        """
+        Add a distribution, if it is far enough from all the others.
+
+        :param vector: the probability of each character.
+        :return: True if the distribution has been added, False otherwise.
+        """
+        if self._distance <= 0.0:
+            return True
+        distances = np.abs(self._vectors[: self._size] - vector).max(axis=1)
+        if self._size > 0 and distances.min() < self._distance:
+            return False
+        self._vectors[self._size] = vector
+        self._size += 1
+        return True
@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020 Marco Favorito
+#
+# ------------------------------
+#
+# This file is part of pdfa-learning.
+#
+# pdfa-learning is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pdfa-learning is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with pdfa-learning.  If not, see <https://www.gnu.org/licenses/>.
+#
+"""Vectorized scoring of many concurrent event streams."""
+
+from dataclasses import dataclass
+from typing import Iterator, Optional
+
+import numpy as np
+
+from pdfa_learning.helpers.base import assert_
+from pdfa_learning.helpers.profiling import hot_path
+from pdfa_learning.pdfa.base import PDFA
+from pdfa_learning.pdfa.compiled import UNDEFINED_STATE
+from pdfa_learning.pdfa.helpers import FINAL_SYMBOL
+
+
+@dataclass(frozen=True, eq=False)
+class ScoredEvents:
+    """
+    The scores of a batch of events.
+
+    surprisals: the surprisal of every event, i.e. minus the natural logarithm
+      of its probability; infinite if the event falls off the automaton.
+    fell_off: whether the event has probability zero, or its stream already fell off.
+    next_distributions: the next-symbol distribution of the stream after every event,
+      one column per character plus a last one for the final symbol;
+      all zeros if the stream fell off; None if not requested.
+    """
+
+    surprisals: np.ndarray
+    fell_off: np.ndarray
+    next_distributions: Optional[np.ndarray]
+
+
+class StreamScorer:
+    """
+    Score many concurrent event streams with a PDFA.
+
+    Every stream has a cursor, i.e. its current state, and its running
+    log-likelihood, stored in arrays indexed by stream identifier.
+    A stream is a sequence of traces: after the final symbol, the cursor
+    goes back to the initial state. A stream that reads an event with
+    probability zero falls off the automaton, and stays off until reset.
+
+    The transition tables have an additional dead state, for the streams
+    that fell off, so that a batch of events is advanced with a few gathers,
+    in constant time per event.
+    """
+
+    def __init__(self, pdfa: PDFA, nb_streams: int):
+        """
+        Initialize the scorer.
+
+        :param pdfa: the PDFA.
+        :param nb_streams: the number of streams, identified by 0, ..., nb_streams - 1.
+        """
+        assert_(nb_streams > 0, "Number of streams must be greater than zero.")
+        compiled = pdfa.compiled
+        self._alphabet_size = compiled.alphabet_size
+        self._initial_state = pdfa.initial_state
+        self._dead_state = compiled.nb_states
+
+        self._probabilities = np.vstack(
+            [compiled.probabilities, np.zeros(self._alphabet_size + 1)]
+        )
+        with np.errstate(divide="ignore"):
+            self._surprisals = -np.log(self._probabilities)
+        next_states = np.vstack(
+            [compiled.next_states, np.full(self._alphabet_size + 1, UNDEFINED_STATE)]
+        )
+        next_states[:, -1] = self._initial_state
+        next_states[self._probabilities == 0.0] = self._dead_state
+        self._next_states = next_states.astype(np.int32)
+
+        self._states = np.full(nb_streams, self._initial_state, dtype=np.int32)
+        self._log_likelihoods = np.zeros(nb_streams)
+
+    @property
+    def nb_streams(self) -> int:
+        """Get the number of streams."""
+        return len(self._states)
+
+    @property
+    def states(self) -> np.ndarray:
+        """Get the current states of the streams, UNDEFINED_STATE for those that fell off."""
+        return np.where(self._states == self._dead_state, UNDEFINED_STATE, self._states)
+
+    @property
+    def log_likelihoods(self) -> np.ndarray:
+        """Get the running log-likelihoods of the streams."""
+        return self._log_likelihoods.copy()
+
+    def reset(self, stream_ids: Optional[np.ndarray] = None) -> None:
+        """
+        Move the streams to the initial state, and reset their log-likelihoods.
+
+        :param stream_ids: the streams to reset; all of them if None.
+        """
+        indexes = slice(None) if stream_ids is None else np.asarray(stream_ids)
+        self._states[indexes] = self._initial_state
+        self._log_likelihoods[indexes] = 0.0
+
+    @hot_path
+    def advance(
+        self,
+        stream_ids: np.ndarray,
+        symbols: np.ndarray,
+        with_distributions: bool = True,
+    ) -> ScoredEvents:
+        """
+        Advance the streams with a batch of events.
+
+        The events of the same stream are applied in order of appearance.
+
+        :param stream_ids: the stream of every event.
+        :param symbols: the symbol of every event (FINAL_SYMBOL ends a trace).
+        :param with_distributions: whether to return the next-symbol distributions,
+          which take (alphabet_size + 1) floats per event.
+        :return: the scores of the events.
+        """
+        stream_ids = np.asarray(stream_ids, dtype=np.int64)
+        symbols = np.asarray(symbols, dtype=np.int64)
+        assert_(
+            stream_ids.shape == symbols.shape and stream_ids.ndim == 1,
+            "Stream identifiers and symbols must be one-dimensional, of the same size.",
+        )
+        assert_(
+            bool(np.all((0 <= stream_ids) & (stream_ids < self.nb_streams))),
+            "Provided stream identifier is not in the set of streams.",
+        )
+        assert_(
+            bool(np.all((FINAL_SYMBOL <= symbols) & (symbols < self._alphabet_size))),
+            "Provided character is not in the alphabet.",
+        )
+        columns = np.where(symbols == FINAL_SYMBOL, self._alphabet_size, symbols)
+        surprisals = np.empty(len(symbols))
+        next_states = np.empty(len(symbols), dtype=np.int32)
+        for events in _rounds(stream_ids):
+            ids = stream_ids[events]
+            states = self._states[ids]
+            surprisals[events] = self._surprisals[states, columns[events]]
+            next_states[events] = self._next_states[states, columns[events]]
+            self._states[ids] = next_states[events]
+            self._log_likelihoods[ids] -= surprisals[events]
+        return ScoredEvents(
+            surprisals=surprisals,
+            fell_off=next_states == self._dead_state,
+            next_distributions=(
+                self._probabilities[next_states] if with_distributions else None
+            ),
+        )
+
+
+def _rounds(stream_ids: np.ndarray) -> Iterator[np.ndarray]:
+    """
+    Split a batch of events in rounds, where each stream has at most one event.
+
+    The k-th round has the k-th event of every stream, so that the rounds
+    can be applied in order, each with vectorized operations.
+
+    :param stream_ids: the stream of every event.
+    :return: the indexes of the events of every round.
+    """
+    nb_events = len(stream_ids)
+    order = np.argsort(stream_ids, kind="stable")
+    sorted_ids = stream_ids[order]
+    is_first = np.ones(nb_events, dtype=bool)
+    is_first[1:] = sorted_ids[1:] != sorted_ids[:-1]
+    first_positions = np.maximum.accumulate(np.where(is_first, np.arange(nb_events), 0))
+    ranks = np.empty(nb_events, dtype=np.int64)
+    ranks[order] = np.arange(nb_events) - first_positions
+    if nb_events == 0 or ranks.max() == 0:
+        yield np.arange(nb_events)
+        return
+    by_rank = np.argsort(ranks, kind="stable")
+    boundaries = np.cumsum(np.bincount(ranks))
+    yield from np.split(by_rank, boundaries[:-1])
@@ -0,0 +1,119 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020 Marco Favorito
+#
+# ------------------------------
+#
+# This file is part of pdfa-learning.
+#
+# pdfa-learning is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pdfa-learning is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with pdfa-learning.  If not, see <https://www.gnu.org/licenses/>.
+#
+"""Search of the most probable words of a PDFA."""
+
+import heapq
+import itertools
+from typing import TYPE_CHECKING, Any, List, Optional, Tuple
+
+from pdfa_learning.helpers.base import assert_
+from pdfa_learning.pdfa.helpers import FINAL_STATE, FINAL_SYMBOL
+from pdfa_learning.types import Character, Word
+
+if TYPE_CHECKING:
+    from pdfa_learning.pdfa.base import PDFA
+
+# a prefix is a linked list of characters, from the last one
+_Prefix = Optional[Tuple[Character, Any]]
+# the priority, a tie-breaker, the probability, the state, the prefix and its length
+_Item = Tuple[float, int, float, int, _Prefix, int]
+
+
+def _to_word(prefix: _Prefix) -> Word:
+    """Transform a prefix into a word."""
+    word = []
+    while prefix is not None:
+        character, prefix = prefix
+        word.append(character)
+    return word[::-1]
+
+
+def most_probable_strings(
+    pdfa: "PDFA", k: int, max_length: int
+) -> List[Tuple[Word, float]]:
+    """
+    Find the most probable words of a PDFA, with an A* search.
+
+    The prefixes are expanded best-first, by their probability times the
+    probability of the most probable completion from their state: since the
+    latter is an upper bound of the probability of any completion, the words
+    are found in decreasing order of probability.
+
+    :param pdfa: the PDFA.
+    :param k: the number of words.
+    :param max_length: the maximum number of characters of a word, final symbol excluded.
+    :return: at most k words, with the final symbol, and their probabilities,
+      in decreasing order of probability.
+    """
+    assert_(k >= 0, "The number of words must be non-negative.")
+    assert_(max_length >= 0, "Maximum length must be non-negative.")
+    compiled = pdfa.compiled
+    alphabet_size = compiled.alphabet_size
+    probabilities = compiled.probabilities.tolist()
+    bounds = compiled.best_completion_probabilities.tolist()
+    next_states = compiled.next_states.tolist()
+
+    counter = itertools.count()
+    prefix: _Prefix = None
+    initial_state = pdfa.initial_state
+    queue: List[_Item] = [
+        (-bounds[initial_state], next(counter), 1.0, initial_state, prefix, 0)
+    ]
+    result: List[Tuple[Word, float]] = []
+    while len(queue) > 0 and len(result) < k:
+        _, _, probability, state, prefix, length = heapq.heappop(queue)
+        if state == FINAL_STATE:
+            result.append((_to_word(prefix), probability))
+            continue
+        state_probabilities = probabilities[state]
+        stop_probability = probability * state_probabilities[-1]
+        if stop_probability > 0.0:
+            heapq.heappush(
+                queue,
+                (
+                    -stop_probability,
+                    next(counter),
+                    stop_probability,
+                    FINAL_STATE,
+                    (FINAL_SYMBOL, prefix),
+                    length,
+                ),
+            )
+        if length == max_length:
+            continue
+        for character in range(alphabet_size):
+            next_probability = probability * state_probabilities[character]
+            if next_probability == 0.0:
+                continue
+            next_state = next_states[state][character]
+            heapq.heappush(
+                queue,
+                (
+                    -next_probability * bounds[next_state],
+                    next(counter),
+                    next_probability,
+                    next_state,
+                    (character, prefix),
+                    length + 1,
+                ),
+            )
+    return result
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020 Marco Favorito
+#
+# ------------------------------
+#
+# This file is part of pdfa-learning.
+#
+# pdfa-learning is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pdfa-learning is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with pdfa-learning.  If not, see <https://www.gnu.org/licenses/>.
+#
+"""
+Serialization of PDFAs.
+
+The binary format is made of a header, followed by the transition tables
+of the compiled PDFA (see 'CompiledPDFA'):
+- the header has the magic string 'PDFA', the version of the format,
+  the number of states, the alphabet size, and the CRC-32 checksum of the tables;
+- the probabilities, as little-endian 64-bit floats;
+- the next states, as little-endian 32-bit integers.
+
+The tables can be memory-mapped. The PDFA is not validated again,
+since it was valid when saved: a file whose checksum does not match is rejected.
+The JSON format lists the transitions, for interoperability.
+"""
+
+import struct
+import zlib
+from pathlib import Path
+from typing import Any, Dict, Union
+
+import numpy as np
+
+from pdfa_learning.pdfa.base import PDFA
+from pdfa_learning.pdfa.compiled import UNDEFINED_STATE, CompiledPDFA
+from pdfa_learning.pdfa.helpers import FINAL_SYMBOL
+from pdfa_learning.types import TransitionFunctionDict
+
+MAGIC = b"PDFA"
+VERSION = 1
+HEADER = struct.Struct("<4sHxxQQI4x")
+PROBABILITY_DTYPE = np.dtype("<f8")
+STATE_DTYPE = np.dtype("<i4")
+
+
+def _checksum(nb_states: int, alphabet_size: int, *tables: np.ndarray) -> int:
+    """Compute the checksum of the sizes and of the tables."""
+    checksum = zlib.crc32(struct.pack("<QQ", nb_states, alphabet_size))
+    for table in tables:
+        checksum = zlib.crc32(np.ascontiguousarray(table).data, checksum)
+    return checksum
+
+
+def _to_transition_dict(
+    next_states: np.ndarray, probabilities: np.ndarray
+) -> TransitionFunctionDict:
+    """Get the transition dictionary from the transition tables."""
+    nb_states, nb_columns = probabilities.shape
+    states, columns = np.nonzero(next_states != UNDEFINED_STATE)
+    characters = np.where(columns == nb_columns - 1, FINAL_SYMBOL, columns).tolist()
+    values = list(
+        zip(
+            next_states[states, columns].tolist(),
+            probabilities[states, columns].tolist(),
+        )
+    )
+    # the transitions are sorted by state: get the range of every state
+    bounds = np.searchsorted(states, np.arange(nb_states + 1)).tolist()
+    return {
+        state: dict(zip(characters[start:end], values[start:end]))
+        for state, start, end in zip(range(nb_states), bounds, bounds[1:])
+        if start < end
+    }
+
+
+def save(pdfa: PDFA, path: Union[str, Path]) -> None:
+    """
+    Save a PDFA in the binary format.
+
+    :param pdfa: the PDFA.
+    :param path: the path of the file.
+    """
+    compiled = pdfa.compiled
+    probabilities = compiled.probabilities.astype(PROBABILITY_DTYPE)
+    next_states = compiled.next_states.astype(STATE_DTYPE)
+    checksum = _checksum(pdfa.nb_states, pdfa.alphabet_size, probabilities, next_states)
+    with Path(path).open("wb") as f:
+        f.write(
+            HEADER.pack(MAGIC, VERSION, pdfa.nb_states, pdfa.alphabet_size, checksum)
+        )
+        f.write(probabilities.tobytes())
+        f.write(next_states.tobytes())
+
+
+def load(path: Union[str, Path], mmap: bool = False) -> PDFA:
+    """
+    Load a PDFA saved in the binary format.
+
+    :param path: the path of the file.
+    :param mmap: whether to memory-map the transition tables, instead of reading them.
+      The compiled PDFA (see 'PDFA.compiled') uses the mapped tables, but the
+      transition dictionary of the PDFA is still built from them, so the memory
+      used is proportional to the number of transitions either way.
+    :return: the PDFA.
+    :raises ValueError: if the file is not a valid PDFA file, e.g. if its checksum
+      does not match.
+    """
+    path = Path(path)
+    with path.open("rb") as f:
+        header = f.read(HEADER.size)
+    if len(header) < HEADER.size or header[: len(MAGIC)] != MAGIC:
+        raise ValueError(f"File {path} is not a PDFA file.")
+    _, version, nb_states, alphabet_size, checksum = HEADER.unpack(header)
+    if version != VERSION:
+        raise ValueError(f"Version {version} of the PDFA format is not supported.")
+    shape = (nb_states, alphabet_size + 1)
+    size = nb_states * (alphabet_size + 1)
+    expected_file_size = (
+        HEADER.size + size * PROBABILITY_DTYPE.itemsize + size * STATE_DTYPE.itemsize
+    )
+    if path.stat().st_size != expected_file_size:
+        raise ValueError(f"File {path} is truncated or corrupted.")
+
+    offset = HEADER.size + size * PROBABILITY_DTYPE.itemsize
+    probabilities: np.ndarray
+    next_states: np.ndarray
+    if mmap:
+        probabilities = np.memmap(
+            path, PROBABILITY_DTYPE, mode="r", offset=HEADER.size, shape=shape
+        )
+        next_states = np.memmap(path, STATE_DTYPE, mode="r", offset=offset, shape=shape)
+    else:
+        content = path.read_bytes()
+        probabilities = np.frombuffer(
+            content, PROBABILITY_DTYPE, count=size, offset=HEADER.size
+        ).reshape(shape)
+        next_states = np.frombuffer(
+            content, STATE_DTYPE, count=size, offset=offset
+        ).reshape(shape)
+
+    if _checksum(nb_states, alphabet_size, probabilities, next_states) != checksum:
+        raise ValueError(f"The checksum of file {path} does not match.")
+    pdfa = PDFA(
+        nb_states,
+        alphabet_size,
+        _to_transition_dict(next_states, probabilities),
+        validate=False,
+    )
+    # the tables are already available: set the cache of 'PDFA.compiled'
+    object.__setattr__(pdfa, "_compiled", CompiledPDFA(next_states, probabilities))
+    return pdfa
+
+
+def to_json(pdfa: PDFA) -> Dict[str, Any]:
+    """
+    Get the PDFA as a JSON-serializable dictionary.
+
+    The transitions are lists [state, character, next state, probability],
+    where the final symbol and the final state are -1.
+
+    :param pdfa: the PDFA.
+    :return: the dictionary.
+    """
+    transitions = sorted(
+        [start, character, end, probability]
+        for start, character, probability, end in pdfa.transitions
+    )
+    return {
+        "format": "pdfa",
+        "version": VERSION,
+        "nb_states": pdfa.nb_states,
+        "alphabet_size": pdfa.alphabet_size,
+        "transitions": transitions,
+    }
+
+
+def from_json(content: Dict[str, Any]) -> PDFA:
+    """
+    Get a PDFA from its JSON representation (see 'to_json').
+
+    :param content: the dictionary.
+    :return: the PDFA.
+    """
+    if content.get("format") != "pdfa":
+        raise ValueError("The content is not a PDFA.")
+    if content.get("version") != VERSION:
+        raise ValueError(
+            f"Version {content.get('version')} of the PDFA format is not supported."
+        )
+    transition_dict: TransitionFunctionDict = {}
+    for start, character, end, probability in content["transitions"]:
+        transition_dict.setdefault(start, {})[character] = (end, probability)
+    return PDFA(content["nb_states"], content["alphabet_size"], transition_dict)
@@ -0,0 +1,130 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020 Marco Favorito
+#
+# ------------------------------
+#
+# This file is part of pdfa-learning.
+#
+# pdfa-learning is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pdfa-learning is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with pdfa-learning.  If not, see <https://www.gnu.org/licenses/>.
+#
+"""Tests for the adaptive learning."""
+import numpy as np
+import pytest
+
+from pdfa_learning.learn_pdfa.adaptive import _get_structure, learn_pdfa_adaptive
+from pdfa_learning.learn_pdfa.base import Algorithm
+from pdfa_learning.learn_pdfa.utils.generator import SimpleGenerator
+from pdfa_learning.pdfa import PDFA
+from pdfa_learning.pdfa.base import FINAL_STATE, FINAL_SYMBOL
+from tests.pdfas import make_pdfa_two_state
+
+
+def test_adaptive_balle():
+    """Test that the adaptive learning stops early, with the right structure."""
+    expected = make_pdfa_two_state()
+    result = learn_pdfa_adaptive(
+        Algorithm.BALLE,
+        sample_generator=SimpleGenerator(expected),
+        alphabet_size=2,
+        epsilon=0.05,
+    )
+    assert result.converged
+    assert result.max_interval_width <= 0.05
+    assert result.nb_samples < 10 ** 5
+    assert _get_structure(result.pdfa) == _get_structure(expected)
+
+
+def test_adaptive_budget():
+    """Test that the adaptive learning does not draw more than the budget."""
+    result = learn_pdfa_adaptive(
+        Algorithm.BALLE,
+        initial_size=100,
+        max_samples=300,
+        sample_generator=SimpleGenerator(make_pdfa_two_state()),
+        alphabet_size=2,
+        epsilon=0.001,
+    )
+    assert not result.converged
+    assert result.nb_samples == 300
+    assert result.nb_rounds == 3
+
+
+def test_adaptive_wrong_parameters():
+    """Test that wrong parameters fail at the first round, instead of growing the sample."""
+    generator = SimpleGenerator(make_pdfa_two_state())
+    with pytest.raises(AssertionError, match="Delta must be"):
+        learn_pdfa_adaptive(
+            Algorithm.BALLE, sample_generator=generator, alphabet_size=2, delta=2.0
+        )
+
+
+def test_adaptive_palmer():
+    """Test the adaptive learning with Palmer's algorithm."""
+    expected = make_pdfa_two_state()
+    result = learn_pdfa_adaptive(
+        Algorithm.PALMER,
+        sample_generator=SimpleGenerator(expected),
+        alphabet_size=2,
+        n=5,
+        mu=0.1,
+        epsilon=0.05,
+        m0_max_debug=1000,
+    )
+    assert result.converged
+    assert _get_structure(result.pdfa) == _get_structure(expected)
+
+
+def test_structure_does_not_depend_on_state_names():
+    """Test that the structure is the same after renaming the states."""
+    automaton = make_pdfa_two_state()
+    renamed = PDFA(
+        3,
+        2,
+        {
+            0: {0: (2, 0.4), 1: (1, 0.6)},
+            2: {0: (1, 0.3), 1: (2, 0.7)},
+            1: {FINAL_SYMBOL: (FINAL_STATE, 1.0)},
+        },
+    )
+    assert _get_structure(automaton) == _get_structure(renamed)
+
+
+def test_adaptive_palmer_chunks_are_not_repeated():
+    """Test that each chunk of the estimation phase gets new traces."""
+    np.random.seed(0)
+    generator = SimpleGenerator(make_pdfa_two_state())
+    requests = []
+    sample = generator.sample
+
+    def spy(n=1):
+        traces = sample(n=n)
+        requests.append(traces)
+        return traces
+
+    generator.sample = spy
+    result = learn_pdfa_adaptive(
+        Algorithm.PALMER,
+        initial_size=4000,
+        max_samples=4000,
+        sample_generator=generator,
+        alphabet_size=2,
+        n=5,
+        mu=0.1,
+        epsilon=0.05,
+        m0_max_debug=200,
+        chunk_size=100,
+    )
+    assert result.nb_samples == 4000
+    assert sum(map(len, requests)) == 4000
@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020 Marco Favorito
+#
+# ------------------------------
+#
+# This file is part of pdfa-learning.
+#
+# pdfa-learning is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pdfa-learning is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with pdfa-learning.  If not, see <https://www.gnu.org/licenses/>.
+#
+"""Tests for the benchmark runner."""
+from benchmarks.core import Benchmark, compare, run_benchmark, to_json
+from benchmarks.workloads import get_benchmarks
+
+
+def test_run_benchmark():
+    """Test the result of a benchmark, and the comparison with a baseline."""
+    calls = []
+
+    def run(data):
+        calls.append(sum(data))
+        return len(data)
+
+    benchmark = Benchmark(
+        "sum", dict(n=1000), lambda: list(range(1000)), run, lambda data: data.clear()
+    )
+    result = run_benchmark(benchmark, repeats=3, warmup=2)
+    # warmup, measured runs, and the run that measures the memory
+    assert len(calls) == 6
+    assert result.id == "sum[n=1000]"
+    assert result.items == 1000
+    assert result.latency["min"] <= result.latency["p50"] <= result.latency["max"]
+    assert result.throughput > 0
+
+    baseline = {r["id"]: r for r in to_json([result])["results"]}
+    assert compare([result], baseline) == []
+    baseline[result.id]["latency"]["p50"] = result.latency["p50"] / 2
+    [regression] = compare([result], baseline, tolerance=0.5)
+    assert regression.metric == "latency.p50"
+    assert regression.ratio == 2.0
+
+
+def test_workloads():
+    """Test that the workloads are well defined."""
+    benchmarks = get_benchmarks("small")
+    assert len({b.id for b in benchmarks}) == len(benchmarks)
+    benchmark = next(b for b in benchmarks if b.name == "multiset.update")
+    assert run_benchmark(benchmark, repeats=1).items == benchmark.params["nb_samples"]
@@ -0,0 +1,81 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020 Marco Favorito
+#
+# ------------------------------
+#
+# This file is part of pdfa-learning.
+#
+# pdfa-learning is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pdfa-learning is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with pdfa-learning.  If not, see <https://www.gnu.org/licenses/>.
+#
+"""Tests for the compiled PDFA and the statistics of its traces."""
+import numpy as np
+import pytest
+
+from pdfa_learning.pdfa import compiled
+from pdfa_learning.pdfa.compiled import UNDEFINED_STATE, compile_pdfa
+from pdfa_learning.pdfa.helpers import FINAL_STATE
+from pdfa_learning.pdfa.random_pdfa import make_random_pdfa
+from tests.pdfas import make_pdfa_one_state, make_reber_grammar
+
+
+def test_compile_pdfa():
+    """Test the transition tables."""
+    automaton = make_pdfa_one_state(0.3)
+    actual = compile_pdfa(automaton, alphabet_size=3)
+    assert actual.nb_states == 2
+    assert actual.alphabet_size == 3
+    assert actual.next_states.tolist() == [
+        [0, 1, UNDEFINED_STATE, UNDEFINED_STATE],
+        [UNDEFINED_STATE, UNDEFINED_STATE, UNDEFINED_STATE, FINAL_STATE],
+    ]
+    assert actual.probabilities.tolist() == [[0.3, 0.7, 0.0, 0.0], [0.0, 0.0, 0.0, 1.0]]
+    assert automaton.compiled is automaton.compiled
+
+
+def test_statistics():
+    """Test the statistics of the traces of a PDFA with geometric length."""
+    p = 0.3
+    automaton = make_pdfa_one_state(p)
+    actual = automaton.compiled
+    # the length of the traces is 1 + a geometric number of zeros
+    assert actual.expected_length == pytest.approx(1 + p / (1 - p))
+    assert actual.expected_visits == pytest.approx([1 / (1 - p), 1.0])
+    assert actual.symbol_frequencies == pytest.approx([p / (1 - p), 1.0, 1.0])
+    expected = [0.0] + [p ** (length - 1) * (1 - p) for length in range(1, 6)]
+    assert actual.length_distribution(5) == pytest.approx(expected)
+    assert actual.best_completion_probabilities == pytest.approx([1 - p, 1.0])
+
+
+def test_statistics_against_samples():
+    """Test the statistics against the sample statistics."""
+    automaton = make_reber_grammar()
+    np.random.seed(42)
+    traces = [automaton.sample()[:-1] for _ in range(10000)]
+    lengths = np.array(list(map(len, traces)))
+    actual = automaton.compiled
+    assert actual.expected_length == pytest.approx(lengths.mean(), rel=0.05)
+    counts = np.bincount(np.concatenate(traces), minlength=6) / len(traces)
+    assert actual.symbol_frequencies[:-1] == pytest.approx(counts, rel=0.05)
+    distribution = np.bincount(lengths, minlength=11)[:11] / len(traces)
+    assert actual.length_distribution(10) == pytest.approx(distribution, abs=0.02)
+
+
+def test_iterative_statistics(monkeypatch):
+    """Test that the statistics of large PDFAs are computed iteratively."""
+    expected = make_random_pdfa(20, 3, expected_length=5.0, seed=1).compiled
+    monkeypatch.setattr(compiled, "MAX_DENSE_SIZE", 0)
+    actual = make_random_pdfa(20, 3, expected_length=5.0, seed=1).compiled
+    assert actual.expected_length == pytest.approx(5.0)
+    assert actual.expected_visits == pytest.approx(expected.expected_visits)
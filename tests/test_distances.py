@@ -0,0 +1,129 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020 Marco Favorito
+#
+# ------------------------------
+#
+# This file is part of pdfa-learning.
+#
+# pdfa-learning is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pdfa-learning is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with pdfa-learning.  If not, see <https://www.gnu.org/licenses/>.
+#
+"""Tests for the exact distances between PDFAs."""
+import itertools
+from math import inf, log
+
+import pytest
+
+from pdfa_learning.pdfa import PDFA, compiled
+from pdfa_learning.pdfa.distances import (
+    inner_product,
+    kl_divergence,
+    l2_distance,
+    total_variation_bounds,
+)
+from pdfa_learning.pdfa.helpers import FINAL_STATE, FINAL_SYMBOL
+from pdfa_learning.pdfa.random_pdfa import make_random_pdfa
+from tests.pdfas import (
+    make_pdfa_one_state,
+    make_pdfa_sequence_three_states,
+    make_pdfa_two_state,
+)
+
+MAX_LENGTH = 9
+
+
+def _words(alphabet_size: int, max_length: int = MAX_LENGTH):
+    """Enumerate all the words up to a given length."""
+    for length in range(max_length + 1):
+        for word in itertools.product(range(alphabet_size), repeat=length):
+            yield list(word) + [FINAL_SYMBOL]
+
+
+def _make_finite_pdfa(p: float) -> PDFA:
+    """Make a PDFA that generates only the words 'a', 'ab' and 'b'."""
+    return PDFA(
+        3,
+        2,
+        {
+            0: {0: (1, p), 1: (2, 1 - p)},
+            1: {1: (2, 0.5), FINAL_SYMBOL: (FINAL_STATE, 0.5)},
+            2: {FINAL_SYMBOL: (FINAL_STATE, 1.0)},
+        },
+    )
+
+
+FIRST = make_pdfa_sequence_three_states(0.1, 0.05, 0.05, 0.8)
+SECOND = make_pdfa_sequence_three_states(0.05, 0.1, 0.05, 0.8)
+
+
+def test_inner_product():
+    """Test the inner product against the sum over the words."""
+    expected = sum(
+        FIRST.get_probability(w) * SECOND.get_probability(w) for w in _words(3)
+    )
+    assert inner_product(FIRST, SECOND) == pytest.approx(expected)
+
+
+def test_l2_distance():
+    """Test the L2 distance."""
+    expected = sum(
+        (FIRST.get_probability(w) - SECOND.get_probability(w)) ** 2 for w in _words(3)
+    )
+    assert l2_distance(FIRST, SECOND) == pytest.approx(expected**0.5)
+    assert l2_distance(SECOND, FIRST) == pytest.approx(l2_distance(FIRST, SECOND))
+    assert l2_distance(FIRST, FIRST) == pytest.approx(0.0, abs=1e-7)
+
+
+def test_kl_divergence():
+    """Test the KL divergence."""
+    expected = sum(
+        FIRST.get_probability(w)
+        * log(FIRST.get_probability(w) / SECOND.get_probability(w))
+        for w in _words(3)
+        if FIRST.get_probability(w) > 0
+    )
+    assert kl_divergence(FIRST, SECOND) == pytest.approx(expected, rel=1e-4)
+    assert kl_divergence(FIRST, FIRST) == pytest.approx(0.0)
+    # the second PDFA cannot generate 'aab'
+    assert kl_divergence(make_pdfa_one_state(), make_pdfa_two_state()) == inf
+
+
+def test_total_variation_bounds():
+    """Test that the bounds contain the total variation distance."""
+    expected = (
+        sum(
+            abs(FIRST.get_probability(w) - SECOND.get_probability(w)) for w in _words(3)
+        )
+        / 2
+    )
+    for max_expansions in [0, 10, 1000]:
+        lower, upper = total_variation_bounds(FIRST, SECOND, max_expansions)
+        assert lower - 1e-6 <= expected <= upper + 1e-6
+
+    # the support is finite, so the enumeration is exhaustive
+    lower, upper = total_variation_bounds(
+        _make_finite_pdfa(0.3), _make_finite_pdfa(0.6)
+    )
+    assert lower == pytest.approx(0.3)
+    assert upper == pytest.approx(0.3)
+
+
+def test_iterative_solution(monkeypatch):
+    """Test that the iterative solution of large systems agrees with the direct one."""
+    first = make_random_pdfa(10, 3, seed=1)
+    second = make_random_pdfa(10, 3, seed=2)
+    expected = (l2_distance(first, second), kl_divergence(first, second))
+    monkeypatch.setattr(compiled, "MAX_DENSE_SIZE", 0)
+    actual = (l2_distance(first, second), kl_divergence(first, second))
+    assert actual == pytest.approx(expected)
@@ -0,0 +1,77 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020 Marco Favorito
+#
+# ------------------------------
+#
+# This file is part of pdfa-learning.
+#
+# pdfa-learning is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pdfa-learning is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with pdfa-learning.  If not, see <https://www.gnu.org/licenses/>.
+#
+"""Tests for the lazy imports and the deferred log payloads."""
+import logging
+import subprocess  # nosec
+import sys
+
+from pdfa_learning.helpers.base import LazyFormat
+from pdfa_learning.learn_pdfa import logger
+
+
+def test_import_is_lazy():
+    """Test that importing the package does not load the heavy dependencies."""
+    code = (
+        "import sys\n"
+        "import pdfa_learning.learn_pdfa.base\n"
+        "from pdfa_learning.pdfa import PDFA\n"
+        "heavy = ['numpy', 'graphviz', 'pdfa_learning.learn_pdfa.balle.core',\n"
+        "         'pdfa_learning.learn_pdfa.palmer.core']\n"
+        "print(','.join(m for m in heavy if m in sys.modules))\n"
+    )
+    result = subprocess.run(  # nosec
+        [sys.executable, "-c", code], capture_output=True, check=True, text=True
+    )
+    assert result.stdout.strip() == ""
+
+
+def test_import_does_not_configure_logging():
+    """Test that importing the package does not configure the root logger."""
+    code = (
+        "import logging\n"
+        "import pdfa_learning.learn_pdfa\n"
+        "print(len(logging.getLogger().handlers))\n"
+    )
+    result = subprocess.run(  # nosec
+        [sys.executable, "-c", code], capture_output=True, check=True, text=True
+    )
+    assert result.stdout.strip() == "0"
+
+
+def test_lazy_format():
+    """Test that the payload is computed only if the record is emitted."""
+    calls = []
+
+    def payload():
+        calls.append(None)
+        return "payload"
+
+    level = logger.level
+    try:
+        logger.setLevel(logging.WARNING)
+        logger.info("Payload: %s", LazyFormat(payload))
+        assert calls == []
+        logger.warning("Payload: %s", LazyFormat(payload))
+        assert len(calls) > 0
+    finally:
+        logger.setLevel(level)
+    assert str(LazyFormat(max, 1, 2)) == "2"
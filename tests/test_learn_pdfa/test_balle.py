@@ -20,7 +20,13 @@
 # along with pdfa-learning.  If not, see <https://www.gnu.org/licenses/>.
 #
 """Main test module."""
+import numpy as np
+import pytest
 
+from pdfa_learning.learn_pdfa.balle.core import CandidateNodesCalculator, Learner
+from pdfa_learning.learn_pdfa.balle.params import BalleParams
+from pdfa_learning.learn_pdfa.utils.generator import SimpleGenerator
+from pdfa_learning.learn_pdfa.utils.metrics import MetricsRecorder
 from pdfa_learning.pdfa import PDFA
 from tests.pdfas import (
     make_pdfa_one_state,
@@ -28,7 +34,7 @@ from tests.pdfas import (
     make_pdfa_two_state,
     make_reber_grammar,
 )
-from tests.test_learn_pdfa.base import BaseTestLearnPDFA
+from tests.test_learn_pdfa.base import BALLE_CONFIG, BaseTestLearnPDFA
 
 
 class TestOneState(BaseTestLearnPDFA):
@@ -53,6 +59,12 @@ class TestTwoState(BaseTestLearnPDFA):
         return make_pdfa_two_state()
 
 
+class TestTwoStateInftyNorm(TestTwoState):
+    """Test PDFA learning of two state PDFA, using the L-infty distance."""
+
+    OVERWRITE_CONFIG = dict(with_infty_norm=True)
+
+
 class TestSequenceThreeStates(BaseTestLearnPDFA):
     """Test PDFA learning of two state PDFA."""
 
@@ -75,3 +87,108 @@ class TestReber(BaseTestLearnPDFA):
     def _make_automaton(cls) -> PDFA:
         """Make automaton."""
         return make_reber_grammar()
+
+
+class TestIncrementalTwoState(BaseTestLearnPDFA):
+    """Test incremental PDFA learning of two state PDFA."""
+
+    ALPHABET_LEN = 2
+    NB_SAMPLES = 20000
+    NB_BATCHES = 4
+
+    @classmethod
+    def _make_automaton(cls) -> PDFA:
+        """Make automaton."""
+        return make_pdfa_two_state()
+
+    @classmethod
+    def setup_class(cls):
+        """Set up the test."""
+        cls.expected = cls._make_automaton()
+        samples = SimpleGenerator(cls.expected).sample(n=cls.NB_SAMPLES)
+        batch_size = cls.NB_SAMPLES // cls.NB_BATCHES
+        batches = [
+            samples[i : i + batch_size] for i in range(0, cls.NB_SAMPLES, batch_size)
+        ]
+        learner = Learner(
+            BalleParams(
+                dataset=batches[0],
+                alphabet_size=cls.expected.alphabet_size,
+                delta=BALLE_CONFIG["delta"],
+                n=BALLE_CONFIG["n"],
+            )
+        )
+        cls.actual = learner.learn()
+        for batch in batches[1:]:
+            cls.actual = learner.update(batch)
+
+
+@pytest.mark.parametrize(
+    "make_first,make_second,nb_first,relearnt",
+    [
+        (make_pdfa_two_state, make_pdfa_two_state, 5000, False),
+        (make_reber_grammar, make_reber_grammar, 1000, False),
+        # the first sample cannot tell the states apart, the second one can
+        (make_pdfa_one_state, make_pdfa_two_state, 1000, True),
+    ],
+)
+def test_update_is_like_learning_from_scratch(
+    make_first, make_second, nb_first, relearnt
+):
+    """Test that an update gives the same PDFA as learning on the whole sample."""
+    np.random.seed(0)
+    first = [tuple(t) for t in SimpleGenerator(make_first()).sample(n=nb_first)]
+    second = [tuple(t) for t in SimpleGenerator(make_second()).sample(n=20000)]
+    kwargs = dict(alphabet_size=make_second().alphabet_size, n=10)
+    recorder = MetricsRecorder()
+    learner = Learner(BalleParams(dataset=first, callbacks=[recorder], **kwargs))
+    learner.learn()
+    actual = learner.update(second)
+    expected = Learner(BalleParams(dataset=first + second, **kwargs)).learn()
+    assert actual.transition_dict == expected.transition_dict
+    assert any(metrics.relearnt for metrics in recorder.metrics) == relearnt
+
+
+def test_update_visits_pending_candidates(monkeypatch):
+    """Test that an update processes the candidate nodes left by the last learning."""
+    np.random.seed(0)
+    sample = [tuple(t) for t in SimpleGenerator(make_pdfa_two_state()).sample(n=5000)]
+    kwargs = dict(dataset=sample, alphabet_size=2, n=10)
+    init = CandidateNodesCalculator.__init__
+
+    def init_with_one_iteration(self, *args):
+        init(self, *args)
+        self.iteration_upper_bound = 1
+
+    learner = Learner(BalleParams(**kwargs))
+    with monkeypatch.context() as m:
+        m.setattr(CandidateNodesCalculator, "__init__", init_with_one_iteration)
+        learner.learn()
+    actual = learner.update([])
+    expected = Learner(BalleParams(**kwargs)).learn()
+    assert actual.transition_dict == expected.transition_dict
+
+
+def test_update_before_learn_fails():
+    """Test that the update of a learner that has not learnt yet fails."""
+    learner = Learner(BalleParams(dataset=[(0, -1)]))
+    with pytest.raises(ValueError, match="The learner must learn a PDFA"):
+        learner.update([(0, -1)])
+
+
+def test_expected_trace_length():
+    """Test that the smoothing uses the given expected trace length."""
+    dataset = [(0, 1, -1)] * 50 + [(1, -1)] * 50
+    params = BalleParams(
+        dataset=dataset,
+        alphabet_size=2,
+        n=3,
+        with_smoothing=True,
+        expected_trace_length=2.0,
+    )
+    actual = Learner(params).learn()
+    _, stop_probability = actual.transition_dict[0][-1]
+    assert stop_probability == pytest.approx(params.get_gamma_min(2.0))
+
+    with pytest.raises(AssertionError, match="Expected trace length"):
+        BalleParams(dataset=dataset, expected_trace_length=0.0)
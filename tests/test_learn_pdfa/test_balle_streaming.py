@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020 Marco Favorito
+#
+# ------------------------------
+#
+# This file is part of pdfa-learning.
+#
+# pdfa-learning is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pdfa-learning is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with pdfa-learning.  If not, see <https://www.gnu.org/licenses/>.
+#
+"""Main test module for the streaming variant of Balle's algorithm."""
+import pytest
+
+from pdfa_learning.learn_pdfa.balle.params import StreamingBalleParams
+from pdfa_learning.learn_pdfa.balle.streaming import StreamingLearner
+from pdfa_learning.learn_pdfa.base import Algorithm, learn_pdfa
+from pdfa_learning.learn_pdfa.utils.generator import SimpleGenerator
+from pdfa_learning.pdfa import PDFA
+from tests.pdfas import make_pdfa_sequence_three_states, make_pdfa_two_state
+from tests.test_learn_pdfa.base import BALLE_CONFIG, BaseTestLearnPDFA
+
+BALLE_STREAMING_CONFIG = dict(BALLE_CONFIG, algorithm=Algorithm.BALLE_STREAMING)
+
+
+class TestStreamingTwoState(BaseTestLearnPDFA):
+    """Test streaming PDFA learning of two state PDFA."""
+
+    ALPHABET_LEN = 2
+    CONFIG = BALLE_STREAMING_CONFIG
+    OVERWRITE_CONFIG = dict(nb_samples=100000)
+
+    @classmethod
+    def _make_automaton(cls) -> PDFA:
+        """Make automaton."""
+        return make_pdfa_two_state()
+
+
+class TestStreamingSequenceThreeStates(BaseTestLearnPDFA):
+    """Test streaming PDFA learning of three state PDFA."""
+
+    ALPHABET_LEN = 3
+    CONFIG = BALLE_STREAMING_CONFIG
+    # states differ only on long prefixes, hence mu must be small
+    OVERWRITE_CONFIG = dict(nb_samples=200000, mu=0.02)
+
+    @classmethod
+    def _make_automaton(cls) -> PDFA:
+        """Make automaton."""
+        return make_pdfa_sequence_three_states(0.4, 0.3, 0.2, 0.1)
+
+
+def test_streaming_from_iterator():
+    """Test that the dataset can be a one-shot iterator of traces."""
+    expected = make_pdfa_two_state()
+    traces = iter(SimpleGenerator(expected).sample(n=20000))
+    params = StreamingBalleParams(
+        dataset=traces, alphabet_size=expected.alphabet_size, batch_size=500
+    )
+    learner = StreamingLearner(params)
+    actual = learner.learn()
+    assert len(actual.states) == len(expected.states)
+    assert all(sketch.size <= 20000 for sketch in learner.vertex2sketch.values())
+
+
+def test_streaming_single_batch_is_like_balle():
+    """Test that the vertices added after the last batch are learnt as in Balle's algorithm."""
+    expected = make_pdfa_two_state()
+    traces = SimpleGenerator(expected).sample(n=5000)
+    kwargs = dict(dataset=traces, alphabet_size=expected.alphabet_size)
+    batch = learn_pdfa(Algorithm.BALLE, **kwargs)
+    learner = StreamingLearner(StreamingBalleParams(batch_size=5000, **kwargs))
+    actual = learner.learn()
+    assert all(visits.size > 0 for visits in learner.vertex2visits.values())
+    assert actual.transition_dict.keys() == batch.transition_dict.keys()
+    for state, out_transitions in batch.transition_dict.items():
+        actual_transitions = actual.transition_dict[state]
+        assert actual_transitions.keys() == out_transitions.keys()
+        for character, (next_state, probability) in out_transitions.items():
+            assert actual_transitions[character][0] == next_state
+            assert actual_transitions[character][1] == pytest.approx(
+                probability, abs=0.05
+            )
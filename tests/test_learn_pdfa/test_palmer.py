@@ -20,8 +20,28 @@
 # along with pdfa-learning.  If not, see <https://www.gnu.org/licenses/>.
 #
 """Tests for Palmer & Goldberg PDFA learning algorithm."""
+from collections import Counter
+from typing import Dict, Optional
+
+import numpy as np
+from hypothesis import given, strategies
+
 from pdfa_learning.learn_pdfa.base import Algorithm
+from pdfa_learning.learn_pdfa.palmer.candidates import CandidateNodes
+from pdfa_learning.learn_pdfa.palmer.learn_probabilities import (
+    _count_observations,
+    _make_transition_table,
+)
+from pdfa_learning.learn_pdfa.palmer.parallel import ShardedCandidateNodes
+from pdfa_learning.learn_pdfa.palmer.similarity import VertexIndex, _top_traces
+from pdfa_learning.learn_pdfa.utils.base import l_infty_norm
+from pdfa_learning.learn_pdfa.utils.multiset.tree import (
+    PrefixTreeMultiset,
+    ReadOnlyPrefixTreeMultiset,
+)
+from pdfa_learning.learn_pdfa.utils.packed import PackedSample
 from pdfa_learning.pdfa import PDFA
+from pdfa_learning.pdfa.base import FINAL_STATE, FINAL_SYMBOL
 from tests.pdfas import make_pdfa_one_state, make_pdfa_two_state
 from tests.test_learn_pdfa.base import PALMER_CONFIG, BaseTestLearnPDFA
 
@@ -50,3 +70,211 @@ class TestTwoState(BaseTestLearnPDFA):
     def _make_automaton(cls) -> PDFA:
         """Make automaton."""
         return make_pdfa_two_state()
+
+
+class TestTwoStateMultiprocess(BaseTestLearnPDFA):
+    """Test PDFA learning of two state PDFA, with candidate nodes on shards."""
+
+    ALGORITHM = Algorithm.PALMER
+    CONFIG = PALMER_CONFIG
+    OVERWRITE_CONFIG = dict(nb_processes=2)
+    ALPHABET_LEN = 2
+
+    @classmethod
+    def _make_automaton(cls) -> PDFA:
+        """Make automaton."""
+        return make_pdfa_two_state()
+
+
+@given(
+    words=strategies.lists(
+        strategies.lists(strategies.integers(min_value=0, max_value=1), max_size=6)
+    ),
+    defined=strategies.lists(strategies.booleans(), min_size=4, max_size=4),
+)
+def test_compute_candidate_nodes(words, defined):
+    """Test that the tree walk finds the same suffixes as replaying every prefix."""
+    words = [tuple(word) + (FINAL_SYMBOL,) for word in words]
+    # a graph with two vertices, where some transitions are undefined
+    transitions = {
+        state: {
+            character: (state + character) % 2
+            for character in range(2)
+            if defined[state * 2 + character]
+        }
+        for state in range(2)
+    }
+    expected: Counter = Counter()
+    for word in words:
+        for i in range(len(word)):
+            state: Optional[int] = 0
+            for character in word[:i]:
+                state = transitions[state].get(character) if state is not None else None
+            if state is not None and word[i] not in transitions[state]:
+                if word[i] != FINAL_SYMBOL:
+                    expected[(state, word[i], word[i + 1 :])] += 1
+
+    multiset = PrefixTreeMultiset()
+    for word in words:
+        multiset.add(word)
+    root = next(iter(multiset.nodes))
+    candidate_nodes = CandidateNodes(root, transitions)
+    actual: Counter = Counter()
+    for (state, character), nodes in candidate_nodes.transition2nodes.items():
+        assert candidate_nodes.get_size((state, character)) == sum(
+            node.children_counts for node in nodes
+        )
+        # the traces of the tree nodes start with the character read
+        for trace, count in ReadOnlyPrefixTreeMultiset(nodes).items():
+            assert trace[0] == character
+            actual[(state, character, trace[1:])] += count
+    assert actual == expected
+
+
+@given(
+    words=strategies.lists(
+        strategies.lists(strategies.integers(min_value=0, max_value=2), max_size=8)
+    ),
+    new_transitions=strategies.lists(
+        strategies.tuples(
+            strategies.integers(min_value=0, max_value=2),
+            strategies.integers(min_value=0, max_value=2),
+            strategies.integers(min_value=0, max_value=2),
+        ),
+        max_size=9,
+    ),
+)
+def test_candidate_nodes_incremental(words, new_transitions):
+    """Test that adding transitions one at a time gives the same candidate nodes."""
+    multiset = PrefixTreeMultiset()
+    for word in words:
+        multiset.add(tuple(word) + (FINAL_SYMBOL,))
+    root = next(iter(multiset.nodes))
+    transitions: Dict[int, Dict[int, int]] = {}
+    candidate_nodes = CandidateNodes(root, transitions)
+    for start, character, end in new_transitions:
+        if character in transitions.get(start, {}):
+            continue
+        candidate_nodes.add_transition(start, character, end)
+        expected = CandidateNodes(root, transitions)
+        assert candidate_nodes.transition2nodes == expected.transition2nodes
+        assert all(
+            candidate_nodes.get_size(t) == expected.get_size(t)
+            for t in expected.transition2nodes
+        )
+
+
+@given(
+    words=strategies.lists(
+        strategies.lists(strategies.integers(min_value=0, max_value=1), max_size=6)
+    ),
+    defined=strategies.lists(strategies.booleans(), min_size=4, max_size=4),
+)
+def test_count_observations(words, defined):
+    """Test the vectorized counts of the characters read from each state."""
+    words = [tuple(word) + (FINAL_SYMBOL,) for word in words]
+    transitions = {
+        state: {
+            character: (state + character) % 2
+            for character in range(2)
+            if defined[state * 2 + character]
+        }
+        for state in range(2)
+    }
+    for state in range(2):
+        transitions[state][FINAL_SYMBOL] = FINAL_STATE
+    expected: Counter = Counter()
+    for word in words:
+        state = 0
+        for character in word:
+            expected[(state, character)] += 1
+            if character not in transitions[state]:
+                break
+            state = transitions[state][character]
+
+    counts = np.zeros(2 * 3, dtype=np.int64)
+    table = _make_transition_table(transitions, 2, 2)
+    _count_observations(PackedSample.from_words(words), table, counts)
+    actual = Counter(
+        {
+            (index // 3, FINAL_SYMBOL if index % 3 == 2 else index % 3): int(count)
+            for index, count in enumerate(counts)
+            if count > 0
+        }
+    )
+    assert actual == expected
+
+
+def test_sharded_candidate_nodes():
+    """Test that the candidate nodes on shards are the same as on the whole sample."""
+    words = [(0, 1, 0), (0, 0), (1,), (1, 1, 0, 1), (0, 1), (), (1, 0)] * 3
+    words = [word + (FINAL_SYMBOL,) for word in words]
+    multiset = PrefixTreeMultiset()
+    for word in words:
+        multiset.add(word)
+    expected = CandidateNodes(next(iter(multiset.nodes)), {})
+    sharded_transitions: Dict[int, Dict[int, int]] = {}
+    actual = ShardedCandidateNodes(words, sharded_transitions, nb_processes=3)
+    try:
+        for start, character, end in [(0, 0, 1), (1, 1, 0), (0, 1, 2), (1, 0, 1)]:
+            for transition in expected.transition2nodes:
+                assert actual.get_size(transition) == expected.get_size(transition)
+                actual_multiset = actual.get_multiset(transition)
+                assert actual_multiset.size == expected.get_size(transition)
+                assert dict(actual_multiset.items()) == dict(
+                    ReadOnlyPrefixTreeMultiset(
+                        {
+                            child
+                            for node in expected.transition2nodes[transition]
+                            for child in node.next_nodes()
+                        }
+                    ).items()
+                )
+            expected.add_transition(start, character, end)
+            actual.add_transition(start, character, end)
+        assert sharded_transitions == {0: {0: 1, 1: 2}, 1: {0: 1, 1: 0}}
+        # the prefixes shared by traces in different shards are visited more times
+        assert actual.nb_visited_nodes >= expected.nb_visited_nodes
+    finally:
+        actual.close()
+
+
+@given(
+    words1=strategies.lists(
+        strategies.lists(strategies.integers(min_value=0, max_value=1), max_size=4),
+        min_size=1,
+    ),
+    words2=strategies.lists(
+        strategies.lists(strategies.integers(min_value=0, max_value=1), max_size=4),
+        min_size=1,
+    ),
+    signature_size=strategies.integers(min_value=0, max_value=4),
+)
+def test_vertex_index(words1, words2, signature_size):
+    """Test that the vertex signatures give lower bounds of the L-infty distance."""
+    multiset1, tree = PrefixTreeMultiset(), PrefixTreeMultiset()
+    for word in words1:
+        multiset1.add(tuple(word))
+        tree.add((1,) + tuple(word))
+    for word in words2:
+        tree.add((0,) + tuple(word))
+    # like the multisets of the candidate nodes, a view on a subtree
+    multiset2 = ReadOnlyPrefixTreeMultiset({next(iter(tree.nodes)).get_child(0)})
+    counts = Counter(map(tuple, words2))
+    top_traces = _top_traces(multiset2.nodes, signature_size)
+    assert len(top_traces) == min(signature_size, len(counts))
+    assert all(counts[trace] == count for trace, count in top_traces)
+    assert [count for _, count in top_traces] == sorted(
+        counts.values(), reverse=True
+    )[:signature_size]
+
+    index = VertexIndex(signature_size)
+    index.add(0, multiset2)
+    distance = l_infty_norm(multiset1, multiset2)
+    candidates = index.get_candidates(multiset1, 0.1)
+    if len(candidates) == 0:
+        assert distance > 0.1
+    else:
+        [(vertex, lower_bound)] = candidates
+        assert vertex == 0
+        assert lower_bound <= distance + 1e-9
@@ -0,0 +1,125 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020 Marco Favorito
+#
+# ------------------------------
+#
+# This file is part of pdfa-learning.
+#
+# pdfa-learning is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pdfa-learning is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with pdfa-learning.  If not, see <https://www.gnu.org/licenses/>.
+#
+"""Tests for the metrics of the learning algorithms."""
+import io
+import json
+from pathlib import Path
+
+from pdfa_learning.learn_pdfa.balle.core import Learner
+from pdfa_learning.learn_pdfa.balle.params import BalleParams
+from pdfa_learning.learn_pdfa.base import Algorithm, learn_pdfa
+from pdfa_learning.learn_pdfa.utils.generator import SimpleGenerator
+from pdfa_learning.learn_pdfa.utils.metrics import (
+    IterationMetrics,
+    JsonLinesWriter,
+    MetricsRecorder,
+)
+from tests.conftest import tempdir
+from tests.pdfas import make_pdfa_two_state
+
+
+def _check_metrics(metrics: IterationMetrics, algorithm: str, iteration: int):
+    """Check the consistency of the metrics of an iteration."""
+    assert metrics.algorithm == algorithm
+    assert metrics.iteration == iteration
+    assert metrics.nodes_visited >= 0
+    assert metrics.nb_vertices >= 1
+    assert 0 <= metrics.nb_pruned <= metrics.nb_vertices
+    assert len(metrics.candidate_sizes) > 0
+    assert metrics.total_time >= 0.0
+    assert json.loads(metrics.to_json())["total_time"] == metrics.total_time
+
+
+def test_balle_metrics():
+    """Test the metrics of the Balle algorithm."""
+    automaton = make_pdfa_two_state()
+    recorder = MetricsRecorder()
+    stream = io.StringIO()
+    learn_pdfa(
+        algorithm=Algorithm.BALLE,
+        dataset=SimpleGenerator(automaton).sample(n=1000),
+        alphabet_size=automaton.alphabet_size,
+        callbacks=[recorder, JsonLinesWriter(stream)],
+    )
+
+    assert len(recorder.metrics) > 0
+    for index, metrics in enumerate(recorder.metrics):
+        _check_metrics(metrics, "balle", index)
+        assert metrics.nodes_visited > 0
+    assert recorder.metrics[0].nb_tests == 1
+    assert stream.getvalue() == recorder.to_json_lines()
+
+
+def test_balle_update_metrics():
+    """Test that the tests done again by an update are recorded in a new iteration."""
+    automaton = make_pdfa_two_state()
+    generator = SimpleGenerator(automaton)
+    recorder = MetricsRecorder()
+    learner = Learner(
+        BalleParams(
+            dataset=generator.sample(n=5000),
+            alphabet_size=automaton.alphabet_size,
+            callbacks=[recorder],
+        )
+    )
+    learnt = learner.learn()
+    learn_metrics = [metrics.to_dict() for metrics in recorder.metrics]
+    learner.update(generator.sample(n=5000))
+
+    # the metrics of the previous iterations are left untouched
+    assert [m.to_dict() for m in recorder.metrics[: len(learn_metrics)]] == (
+        learn_metrics
+    )
+    update_metrics = recorder.metrics[len(learn_metrics) :]
+    assert len(update_metrics) > 0
+    assert update_metrics[0].iteration == learn_metrics[-1]["iteration"] + 1
+    # at least, every vertex is tested again against the initial one
+    assert update_metrics[0].nb_tests >= learnt.nb_states - 1
+
+
+def test_palmer_metrics():
+    """Test the metrics of the Palmer algorithm."""
+    automaton = make_pdfa_two_state()
+    recorder = MetricsRecorder()
+    learn_pdfa(
+        algorithm=Algorithm.PALMER,
+        sample_generator=SimpleGenerator(automaton),
+        alphabet_size=automaton.alphabet_size,
+        n1_max_debug=1000,
+        n2_max_debug=1000,
+        m0_max_debug=100,
+        callbacks=[recorder],
+    )
+
+    assert len(recorder.metrics) > 0
+    for index, metrics in enumerate(recorder.metrics):
+        _check_metrics(metrics, "palmer", index)
+    # candidates are updated incrementally: only the first iteration walks the tree
+    assert recorder.metrics[0].nodes_visited > 0
+
+    with tempdir() as tmp:
+        output = Path(tmp, "metrics.jsonl")
+        recorder.dump(output)
+        lines = output.read_text().splitlines()
+    assert [json.loads(line)["iteration"] for line in lines] == list(
+        range(len(recorder.metrics))
+    )
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020 Marco Favorito
+#
+# ------------------------------
+#
+# This file is part of pdfa-learning.
+#
+# pdfa-learning is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pdfa-learning is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with pdfa-learning.  If not, see <https://www.gnu.org/licenses/>.
+#
+"""Tests for the minimization and the equivalence of PDFAs."""
+import pytest
+
+from pdfa_learning.pdfa import PDFA
+from pdfa_learning.pdfa.distances import l2_distance
+from pdfa_learning.pdfa.helpers import FINAL_STATE, FINAL_SYMBOL
+from pdfa_learning.pdfa.minimize import are_equivalent, minimize
+from tests.pdfas import make_pdfa_two_state, make_reber_grammar
+
+
+def _make_redundant_two_state(p1: float = 0.4, p2: float = 0.7, p3: float = 0.7):
+    """Make the two-state PDFA, with the states 1 and 2 duplicated (as 3 and 4)."""
+    return PDFA(
+        5,
+        2,
+        {
+            0: {0: (1, p1), 1: (2, 1 - p1)},
+            1: {0: (2, 1 - p2), 1: (3, p2)},
+            2: {FINAL_SYMBOL: (FINAL_STATE, 1.0)},
+            3: {0: (4, 1 - p3), 1: (1, p3)},
+            4: {FINAL_SYMBOL: (FINAL_STATE, 1.0)},
+        },
+    )
+
+
+def test_minimize_merges_equivalent_states():
+    """Test that the minimization merges the equivalent states."""
+    automaton = _make_redundant_two_state()
+    actual = minimize(automaton)
+    assert actual == make_pdfa_two_state()
+    assert are_equivalent(automaton, actual)
+    assert l2_distance(automaton, actual) == pytest.approx(0.0, abs=1e-7)
+
+
+def test_minimize_removes_unreachable_states():
+    """Test that the minimization removes the states reached with probability zero."""
+    automaton = PDFA(
+        3,
+        2,
+        {
+            0: {0: (1, 1.0), 1: (2, 0.0)},
+            1: {FINAL_SYMBOL: (FINAL_STATE, 1.0)},
+            2: {0: (2, 0.25), 1: (2, 0.25), FINAL_SYMBOL: (FINAL_STATE, 0.5)},
+        },
+    )
+    actual = minimize(automaton)
+    assert actual.nb_states == 2
+    assert actual.transition_dict == {
+        0: {0: (1, 1.0)},
+        1: {FINAL_SYMBOL: (FINAL_STATE, 1.0)},
+    }
+
+
+def test_minimize_with_tolerance():
+    """Test that the minimization merges states with close distributions."""
+    automaton = _make_redundant_two_state(p3=0.7005)
+    assert minimize(automaton).nb_states == 5 - 1
+    actual = minimize(automaton, tolerance=0.001)
+    assert actual.nb_states == 3
+    assert are_equivalent(automaton, actual, tolerance=0.001)
+    assert not are_equivalent(automaton, actual)
+
+
+def test_minimize_minimal():
+    """Test that the minimization of a minimal PDFA is the PDFA itself."""
+    automaton = make_reber_grammar()
+    assert minimize(automaton) == automaton
+
+
+def test_are_equivalent():
+    """Test the equivalence check."""
+    assert are_equivalent(make_pdfa_two_state(), make_pdfa_two_state())
+    assert not are_equivalent(make_pdfa_two_state(), make_pdfa_two_state(p2=0.6))
+    assert not are_equivalent(make_pdfa_two_state(), make_reber_grammar())
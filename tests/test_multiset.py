@@ -20,13 +20,18 @@
 # along with pdfa-learning.  If not, see <https://www.gnu.org/licenses/>.
 #
 """Tests for the prefix-tree based multiset implementation."""
+from collections import Counter
+
 import pytest
 from hypothesis import given, settings, strategies
 
+from pdfa_learning.learn_pdfa.utils.base import l_infty_norm, prefix_distance_infty_norm
 from pdfa_learning.learn_pdfa.utils.multiset.naive import NaiveMultiset
 from pdfa_learning.learn_pdfa.utils.multiset.tree import (
     PrefixTreeMultiset,
     ReadOnlyPrefixTreeMultiset,
+    infty_norm,
+    prefix_infty_norm,
 )
 
 
@@ -46,6 +51,7 @@ def test_multiset(multiset_class):
     assert set(multiset.items()) == {((0,), 1)}
     assert multiset.get_probability((0,)) == 1.0
     assert multiset.get_prefix_probability((0,)) == 1.0
+    assert multiset.get_counts((1, 0)) == 0
 
     multiset.add((0, 1))
     assert multiset.size == 2
@@ -152,3 +158,122 @@ def test_naive_multiset_and_prefix_based_multiset_equivalent(samples):
             == multiset_1.get_prefix_probability(s)
             == multiset_3.get_prefix_probability(s)
         )
+
+
+@given(
+    samples=strategies.lists(
+        strategies.lists(
+            strategies.integers(min_value=0, max_value=4), min_size=0, max_size=20
+        ),
+        min_size=1,
+        max_size=100,
+    )
+)
+def test_successor_counts(samples):
+    """Test that successor counts are consistent with prefix probabilities."""
+    multiset = PrefixTreeMultiset()
+    multiset.update([tuple(s) for s in samples])
+    read_only_multiset = ReadOnlyPrefixTreeMultiset(multiset._node.next_nodes())
+
+    for m in [multiset, read_only_multiset]:
+        successor_counts = m.get_successor_counts()
+        for character in range(5):
+            expected = m.get_prefix_probability((character,)) * m.size
+            actual = successor_counts.get(character, 0)
+            assert expected == pytest.approx(actual)
+
+
+def _brute_force_distances(samples1, samples2):
+    """Compute L-infty and prefix L-infty distances by enumeration."""
+    counts1, counts2 = Counter(samples1), Counter(samples2)
+    prefix_counts1 = Counter(s[:i] for s in samples1 for i in range(len(s) + 1))
+    prefix_counts2 = Counter(s[:i] for s in samples2 for i in range(len(s) + 1))
+    card1, card2 = len(samples1), len(samples2)
+    distance = max(
+        abs(counts1[s] / card1 - counts2[s] / card2)
+        for s in set(counts1).union(counts2)
+    )
+    prefix_distance = max(
+        abs(prefix_counts1[s] / card1 - prefix_counts2[s] / card2)
+        for s in set(prefix_counts1).union(prefix_counts2)
+    )
+    return distance, prefix_distance
+
+
+_traces = strategies.lists(
+    strategies.lists(
+        strategies.integers(min_value=0, max_value=2), min_size=0, max_size=6
+    ).map(tuple),
+    min_size=1,
+    max_size=50,
+)
+
+
+@given(samples1=_traces, samples2=_traces, threshold=strategies.floats(0.0, 1.0))
+def test_tree_distances(samples1, samples2, threshold):
+    """Test tree-based distances against their definition."""
+    multiset1, multiset2 = PrefixTreeMultiset(), PrefixTreeMultiset()
+    multiset1.update(samples1)
+    multiset2.update(samples2)
+    expected_distance, expected_prefix_distance = _brute_force_distances(
+        samples1, samples2
+    )
+
+    assert infty_norm(multiset1, multiset2) == pytest.approx(expected_distance)
+    assert prefix_infty_norm(multiset1, multiset2) == pytest.approx(
+        expected_prefix_distance
+    )
+    assert multiset1.nb_prefixes == sum(len(s) + 1 for s in samples1)
+
+    # early exit: the result is above the threshold iff the distance is.
+    distance = infty_norm(multiset1, multiset2, threshold=threshold)
+    assert (distance > threshold) == (expected_distance > threshold)
+    prefix_distance = prefix_infty_norm(multiset1, multiset2, threshold=threshold)
+    assert (prefix_distance > threshold) == (expected_prefix_distance > threshold)
+
+
+def test_tree_distances_read_only_multisets():
+    """Test tree-based distances on multisets made of several nodes."""
+    multiset = PrefixTreeMultiset()
+    multiset.update([(0, 1), (0, 1), (0, 2), (1, 1), (1, 2), (1, 2)])
+    root = multiset._node
+    zero = ReadOnlyPrefixTreeMultiset({root.get_child(0)})
+    one = ReadOnlyPrefixTreeMultiset({root.get_child(1)})
+    both = ReadOnlyPrefixTreeMultiset({root.get_child(0), root.get_child(1)})
+
+    assert infty_norm(zero, one) == pytest.approx(1 / 3)
+    assert prefix_infty_norm(zero, one) == pytest.approx(1 / 3)
+    assert infty_norm(zero, both) == pytest.approx(1 / 6)
+    assert both.nb_prefixes == 12
+
+
+@pytest.mark.parametrize("multiset_class", [Counter, NaiveMultiset, PrefixTreeMultiset])
+@given(samples1=_traces, samples2=_traces, threshold=strategies.floats(0.0, 1.0))
+def test_l_infty_norm(multiset_class, samples1, samples2, threshold):
+    """Test the L-infty distance, for every kind of multiset, against its definition."""
+    multiset1, multiset2 = multiset_class(), multiset_class()
+    multiset1.update(samples1)
+    multiset2.update(samples2)
+    expected_distance, _ = _brute_force_distances(samples1, samples2)
+
+    assert l_infty_norm(multiset1, multiset2) == pytest.approx(expected_distance)
+    assert l_infty_norm(multiset1, Counter(samples2)) == pytest.approx(
+        expected_distance
+    )
+    distance = l_infty_norm(multiset1, multiset2, threshold=threshold)
+    assert (distance > threshold) == (expected_distance > threshold)
+
+
+@pytest.mark.parametrize("multiset_class", [Counter, NaiveMultiset, PrefixTreeMultiset])
+@given(samples1=_traces, samples2=_traces, threshold=strategies.floats(0.0, 1.0))
+def test_prefix_distance_infty_norm(multiset_class, samples1, samples2, threshold):
+    """Test the prefix L-infty distance, for every kind of multiset."""
+    multiset1, multiset2 = multiset_class(), multiset_class()
+    multiset1.update(samples1)
+    multiset2.update(samples2)
+    _, expected_distance = _brute_force_distances(samples1, samples2)
+
+    distance = prefix_distance_infty_norm(multiset1, multiset2)
+    assert distance == pytest.approx(expected_distance)
+    distance = prefix_distance_infty_norm(multiset1, multiset2, threshold=threshold)
+    assert (distance > threshold) == (expected_distance > threshold)
@@ -0,0 +1,40 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020 Marco Favorito
+#
+# ------------------------------
+#
+# This file is part of pdfa-learning.
+#
+# pdfa-learning is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pdfa-learning is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with pdfa-learning.  If not, see <https://www.gnu.org/licenses/>.
+#
+"""Tests for the packed storage of samples."""
+from hypothesis import given, strategies
+
+from pdfa_learning.learn_pdfa.utils.packed import PackedSample
+
+
+@given(
+    words=strategies.lists(
+        strategies.lists(strategies.integers(min_value=-1, max_value=3), max_size=5)
+    )
+)
+def test_packed_sample(words):
+    """Test that a packed sample gives back the traces and their suffixes."""
+    words = [tuple(word) for word in words]
+    sample = PackedSample.from_words(words)
+    assert len(sample) == len(words)
+    assert list(sample) == words
+    assert (sample.ends - sample.starts).tolist() == list(map(len, words))
+    assert sample.symbols.tolist() == [symbol for word in words for symbol in word]
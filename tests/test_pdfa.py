@@ -20,6 +20,7 @@
 # along with pdfa-learning.  If not, see <https://www.gnu.org/licenses/>.
 #
 """Main test module."""
+import itertools
 from pathlib import Path
 
 import numpy as np
@@ -30,6 +31,7 @@ from pdfa_learning.pdfa.base import FINAL_STATE
 from pdfa_learning.pdfa.helpers import FINAL_SYMBOL
 from pdfa_learning.pdfa.render import to_graphviz
 from tests.conftest import tempdir
+from tests.pdfas import make_reber_grammar
 
 
 def test_pdfa_example():
@@ -179,6 +181,16 @@ class TestMethods:
         assert self.automaton.get_probability([0, 1, 0, -1]) == 0.0
         assert self.automaton.get_probability([0, 0, 0, -1]) == 0.0
 
+    def test_most_probable_strings(self):
+        """Test the most probable strings."""
+        assert self.automaton.most_probable_strings(3, 10) == [
+            ([1, -1], 0.5),
+            ([0, 1, -1], 0.25),
+            ([0, 0, 1, -1], 0.125),
+        ]
+        assert self.automaton.most_probable_strings(10, 1) == [([1, -1], 0.5)]
+        assert self.automaton.most_probable_strings(0, 10) == []
+
     def test_sample(self):
         """Test the sample method."""
         nb_samples = 5000
@@ -187,3 +199,21 @@ class TestMethods:
         expected_average_length = 2 + 1
         actual_average_length = np.mean([len(w) for w in samples])
         assert np.isclose(expected_average_length, actual_average_length, rtol=0.05)
+
+
+def test_most_probable_strings_against_enumeration():
+    """Test the most probable strings against the enumeration of the words."""
+    automaton = make_reber_grammar()
+    max_length = 8
+    words = [
+        list(word) + [FINAL_SYMBOL]
+        for length in range(max_length + 1)
+        for word in itertools.product(range(automaton.alphabet_size), repeat=length)
+    ]
+    probabilities = sorted(map(automaton.get_probability, words), reverse=True)
+    actual = automaton.most_probable_strings(20, max_length)
+    assert [probability for _, probability in actual] == pytest.approx(
+        probabilities[:20]
+    )
+    for word, probability in actual:
+        assert automaton.get_probability(word) == probability
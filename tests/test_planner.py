@@ -0,0 +1,124 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020 Marco Favorito
+#
+# ------------------------------
+#
+# This file is part of pdfa-learning.
+#
+# pdfa-learning is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pdfa-learning is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with pdfa-learning.  If not, see <https://www.gnu.org/licenses/>.
+#
+"""Tests for the learning planner."""
+import json
+
+from pdfa_learning.learn_pdfa.balle.core import _compute_threshold
+from pdfa_learning.learn_pdfa.balle.params import BalleParams
+from pdfa_learning.learn_pdfa.base import Algorithm
+from pdfa_learning.learn_pdfa.palmer.learn_probabilities import _sample_size
+from pdfa_learning.learn_pdfa.palmer.learn_subgraph import _compute_m0, _compute_N
+from pdfa_learning.learn_pdfa.palmer.params import PalmerParams
+from pdfa_learning.learn_pdfa.planner import plan_learning
+from pdfa_learning.learn_pdfa.utils.generator import SimpleGenerator
+from tests.pdfas import make_pdfa_two_state
+
+
+def test_plan_balle():
+    """Test the plan of Balle's algorithm."""
+    generator = SimpleGenerator(make_pdfa_two_state())
+    plan = plan_learning(
+        Algorithm.BALLE,
+        calibration_size=200,
+        sample_generator=generator,
+        nb_samples=10000,
+        alphabet_size=2,
+        n=5,
+    )
+    assert plan.sample_sizes == dict(nb_samples=10000)
+    assert plan.max_iterations == 5 * 2 + 1
+    assert 0 < plan.expected_tree_size <= 10000 * 1000
+    assert plan.estimated_time > 0.0
+    assert plan.estimated_memory > 0.0
+    assert plan.is_feasible()
+    assert not plan.is_feasible(max_time=0.0)
+    assert json.loads(plan.to_json())["algorithm"] == "balle"
+
+
+def test_plan_balle_required_sample_sizes():
+    """Test the theoretical sample sizes of Balle's algorithm."""
+    generator = SimpleGenerator(make_pdfa_two_state())
+    kwargs = dict(sample_generator=generator, alphabet_size=2, n=5, nb_samples=100)
+    plan = plan_learning(Algorithm.BALLE, calibration_size=100, **kwargs)
+    required = plan.required_sample_sizes
+    assert plan.sample_sizes == dict(nb_samples=100)
+    # the threshold of the distinctness test is below epsilon / 2 with m0 traces
+    s = required["m0"] * (plan.calibration.average_trace_length + 1)
+    delta_0 = BalleParams(**kwargs).delta_0
+    assert _compute_threshold(required["m0"], required["m0"], s, s, delta_0) <= 0.05
+    assert required["nb_samples"] > required["m0"] * 5 * 3 / 0.1
+
+    smaller_epsilon = plan_learning(
+        Algorithm.BALLE, calibration_size=100, epsilon=0.05, **kwargs
+    )
+    assert smaller_epsilon.required_sample_sizes["m0"] > required["m0"]
+    assert smaller_epsilon.required_sample_sizes["nb_samples"] > required["nb_samples"]
+
+
+def test_plan_balle_from_dataset():
+    """Test the plan of Balle's algorithm, from a dataset."""
+    dataset = SimpleGenerator(make_pdfa_two_state()).sample(n=500)
+    plan = plan_learning(Algorithm.BALLE, dataset=dataset, alphabet_size=2)
+    assert plan.sample_sizes == dict(nb_samples=500)
+    assert plan.calibration.nb_traces == 500
+
+
+def test_plan_palmer():
+    """Test that the plan of Palmer's algorithm reports the theoretical sizes."""
+    generator = SimpleGenerator(make_pdfa_two_state())
+    kwargs = dict(sample_generator=generator, alphabet_size=2, n1_max_debug=1000)
+    plan = plan_learning(Algorithm.PALMER, calibration_size=100, **kwargs)
+    params = PalmerParams(**kwargs)
+    assert plan.required_sample_sizes["m0"] == _compute_m0(params)
+    assert plan.required_sample_sizes["n2"] == _sample_size(params)
+    assert plan.sample_sizes["n1"] == 1000
+    assert plan.sample_sizes["n2"] == _sample_size(params)
+    # the theoretical sample size for the probabilities is astronomical
+    assert not plan.is_feasible(max_time=24 * 3600)
+
+
+def test_plan_palmer_many_states():
+    """Test that the plan of Palmer's algorithm can report huge sample sizes."""
+    generator = SimpleGenerator(make_pdfa_two_state())
+    kwargs = dict(sample_generator=generator, alphabet_size=2, n=600, n1_max_debug=1000)
+    plan = plan_learning(Algorithm.PALMER, calibration_size=100, **kwargs)
+    params = PalmerParams(**kwargs)
+    assert plan.required_sample_sizes["n1"] == _compute_N(params, _compute_m0(params))
+    assert plan.required_sample_sizes["n1"] > 10**10
+    assert not plan.is_feasible(max_time=24 * 3600)
+
+
+def test_tree_size_estimate():
+    """Test that the estimated tree size never exceeds the number of symbols."""
+    generator = SimpleGenerator(make_pdfa_two_state())
+    plan = plan_learning(
+        Algorithm.BALLE_STREAMING,
+        calibration_size=100,
+        sample_generator=generator,
+        alphabet_size=2,
+    )
+    calibration = plan.calibration
+    assert calibration.estimate_tree_size(100) == calibration.tree_sizes[-1]
+    nb_traces = 10 ** 6
+    max_nodes = nb_traces * (calibration.average_trace_length + 1) + 1
+    assert calibration.estimate_tree_size(nb_traces) <= max_nodes
+    assert plan.expected_tree_size == 0
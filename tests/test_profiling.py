@@ -0,0 +1,150 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020 Marco Favorito
+#
+# ------------------------------
+#
+# This file is part of pdfa-learning.
+#
+# pdfa-learning is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pdfa-learning is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with pdfa-learning.  If not, see <https://www.gnu.org/licenses/>.
+#
+"""Tests for the profiling of the hot paths."""
+import json
+import os
+import pstats
+import subprocess  # nosec
+import sys
+from pathlib import Path
+
+import numpy as np
+
+import pdfa_learning.learn_pdfa.balle.core as balle_core
+from pdfa_learning.helpers import profiling
+from pdfa_learning.learn_pdfa.base import Algorithm, learn_pdfa
+from pdfa_learning.learn_pdfa.utils.generator import SimpleGenerator
+from pdfa_learning.learn_pdfa.utils.metrics import MetricsRecorder
+from pdfa_learning.learn_pdfa.utils.multiset.tree import (
+    Node,
+    PrefixTreeMultiset,
+    infty_norm,
+)
+from tests.conftest import tempdir
+from tests.pdfas import make_pdfa_two_state
+
+ORIGINAL_ADD = Node.add
+ORIGINAL_INFTY_NORM = infty_norm
+
+
+def _workload():
+    """Sample traces, build their prefix tree, and compute a distance."""
+    np.random.seed(0)
+    automaton = make_pdfa_two_state()
+    multiset = PrefixTreeMultiset()
+    multiset.update([tuple(automaton.sample()) for _ in range(100)])
+    balle_core.infty_norm(multiset, multiset)
+    return multiset
+
+
+def test_profile():
+    """Test the timers of the hot paths, and that they are removed afterwards."""
+    assert not profiling.is_enabled()
+    with profiling.profile() as profiler:
+        assert Node.add is not ORIGINAL_ADD
+        assert balle_core.infty_norm is not ORIGINAL_INFTY_NORM
+        multiset = _workload()
+        profiling.increment("my_counter", 2)
+    assert Node.add is ORIGINAL_ADD
+    assert balle_core.infty_norm is ORIGINAL_INFTY_NORM
+    # not recorded, since profiling is disabled
+    _workload()
+    profiling.increment("my_counter")
+
+    rows = {row["name"]: row for row in profiler.get_report()}
+    assert rows["Node.add"]["calls"] == 100
+    assert rows["PDFA.sample"]["calls"] == 100
+    assert rows["infty_norm"]["calls"] == 1
+    for row in rows.values():
+        assert 0.0 <= row["self_time"] <= row["total_time"] + 1e-9
+    assert profiler.counters["my_counter"] == 2
+    assert profiler.counters["pdfa.sampled_traces"] == 100
+    # all the nodes but the root are added by the update
+    root = next(iter(multiset.nodes))
+    assert profiler.counters["prefix_tree.nodes"] == root._tree_metadata.size - 1
+    assert "Node.add" in profiler.format_report()
+
+
+def test_learner_counters():
+    """Test that the learners add their counts to the counters of the profiler."""
+    np.random.seed(0)
+    with profiling.profile() as profiler:
+        learn_pdfa(
+            Algorithm.BALLE,
+            sample_generator=SimpleGenerator(make_pdfa_two_state()),
+            alphabet_size=2,
+            nb_samples=1000,
+        )
+    recorder = MetricsRecorder()
+    np.random.seed(0)
+    learn_pdfa(
+        Algorithm.BALLE,
+        sample_generator=SimpleGenerator(make_pdfa_two_state()),
+        alphabet_size=2,
+        nb_samples=1000,
+        callbacks=[recorder],
+    )
+    assert profiler.counters["pdfa.sampled_traces"] == 1000
+    assert profiler.counters["prefix_tree.nodes"] > 0
+    assert profiler.counters["balle.tests"] == sum(
+        metrics.nb_tests for metrics in recorder.metrics
+    )
+    assert profiler.counters["balle.candidates"] == sum(
+        len(metrics.candidate_sizes) for metrics in recorder.metrics
+    )
+    assert profiler.counters["balle.tests"] > 0
+
+
+def test_dump():
+    """Test the formats of the profile."""
+    with profiling.profile() as profiler:
+        _workload()
+    with tempdir() as directory:
+        speedscope_path = Path(directory, "profile.speedscope.json")
+        profiler.dump(speedscope_path)
+        speedscope = json.loads(speedscope_path.read_text())
+        [profile] = speedscope["profiles"]
+        frames = [frame["name"] for frame in speedscope["shared"]["frames"]]
+        assert len(profile["samples"]) == len(profile["weights"])
+        assert {frames[sample[-1]] for sample in profile["samples"]} >= {
+            "Node.add",
+            "PDFA.sample",
+        }
+
+        pstats_path = Path(directory, "profile.prof")
+        profiler.dump(pstats_path)
+        stats = pstats.Stats(str(pstats_path))
+        assert stats.total_calls == sum(row["calls"] for row in profiler.get_report())
+
+        report_path = Path(directory, "profile.txt")
+        profiler.dump(report_path)
+        assert report_path.read_text() == profiler.format_report() + "\n"
+
+
+def test_profile_from_environment():
+    """Test that the environment variable enables profiling, and dumps the profile."""
+    with tempdir() as directory:
+        path = Path(directory, "profile.txt")
+        env = dict(os.environ, **{profiling.PROFILE_ENV_VARIABLE: str(path)})
+        code = "from tests.test_profiling import _workload; _workload()"
+        subprocess.run([sys.executable, "-c", code], env=env, check=True)  # nosec
+        assert "Node.add" in path.read_text()
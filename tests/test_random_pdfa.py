@@ -0,0 +1,89 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020 Marco Favorito
+#
+# ------------------------------
+#
+# This file is part of pdfa-learning.
+#
+# pdfa-learning is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pdfa-learning is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with pdfa-learning.  If not, see <https://www.gnu.org/licenses/>.
+#
+"""Tests for the generation of random PDFAs."""
+import itertools
+
+import numpy as np
+import pytest
+
+from pdfa_learning.pdfa.base import FINAL_SYMBOL
+from pdfa_learning.pdfa.random_pdfa import make_random_pdfa
+
+
+@pytest.mark.parametrize(
+    ["nb_states", "alphabet_size", "distinguishability"],
+    [(1, 1, 0.0), (10, 1, 0.0), (50, 2, 0.0), (50, 4, 0.1), (200, 5, 0.05)],
+)
+def test_make_random_pdfa(nb_states, alphabet_size, distinguishability):
+    """Test that the random PDFAs are valid, connected and distinguishable."""
+    automaton = make_random_pdfa(
+        nb_states,
+        alphabet_size,
+        expected_length=5.0,
+        distinguishability=distinguishability,
+        seed=42,
+    )
+    assert automaton.nb_states == nb_states
+    assert automaton.alphabet_size == alphabet_size
+
+    reachable = {0}
+    stack = [0]
+    while len(stack) > 0:
+        for next_state in automaton.get_successors(stack.pop()):
+            if next_state not in reachable and next_state != automaton.final_state:
+                reachable.add(next_state)
+                stack.append(next_state)
+    assert reachable == set(range(nb_states))
+
+    def distribution(state):
+        return [
+            automaton.transition_dict[state].get(c, (None, 0.0))[1]
+            for c in range(alphabet_size)
+        ]
+
+    for state1, state2 in itertools.combinations(range(nb_states), 2):
+        distance = np.abs(np.subtract(distribution(state1), distribution(state2)))
+        assert distance.max() >= distinguishability
+
+
+def test_make_random_pdfa_parameters():
+    """Test the seed, the out-degrees and the expected length."""
+    automaton = make_random_pdfa(30, 4, seed=0)
+    assert automaton.transition_dict == make_random_pdfa(30, 4, seed=0).transition_dict
+    assert automaton.transition_dict != make_random_pdfa(30, 4, seed=1).transition_dict
+
+    automaton = make_random_pdfa(
+        30, 3, expected_length=4.0, out_degree_weights=[0, 1, 0], seed=0
+    )
+    for out_transitions in automaton.transition_dict.values():
+        assert len(out_transitions) == 2 + 1
+        assert out_transitions[FINAL_SYMBOL][1] == pytest.approx(1 / 5)
+
+    np.random.seed(0)
+    lengths = [len(automaton.sample()) - 1 for _ in range(5000)]
+    assert np.mean(lengths) == pytest.approx(4.0, rel=0.1)
+
+
+def test_make_random_pdfa_not_distinguishable():
+    """Test that too many distinguishable states cannot be generated."""
+    with pytest.raises(AssertionError, match="decrease the distinguishability"):
+        make_random_pdfa(10, 1, distinguishability=0.1, seed=0)
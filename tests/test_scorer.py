@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020 Marco Favorito
+#
+# ------------------------------
+#
+# This file is part of pdfa-learning.
+#
+# pdfa-learning is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pdfa-learning is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with pdfa-learning.  If not, see <https://www.gnu.org/licenses/>.
+#
+"""Tests for the scoring of concurrent event streams."""
+from math import inf, log
+
+import numpy as np
+import pytest
+
+from pdfa_learning.pdfa.compiled import UNDEFINED_STATE
+from pdfa_learning.pdfa.helpers import FINAL_SYMBOL
+from pdfa_learning.pdfa.scorer import StreamScorer
+from tests.pdfas import make_pdfa_two_state, make_reber_grammar
+
+
+def test_log_likelihoods():
+    """Test that interleaved streams are scored as the whole words."""
+    automaton = make_reber_grammar()
+    np.random.seed(42)
+    words = [automaton.sample() for _ in range(50)]
+    # interleave the events of the words at random, keeping their order
+    events = [stream_id for stream_id, word in enumerate(words) for _ in word]
+    np.random.shuffle(events)
+    positions = [0] * len(words)
+    symbols = []
+    for stream_id in events:
+        symbols.append(words[stream_id][positions[stream_id]])
+        positions[stream_id] += 1
+
+    scorer = StreamScorer(automaton, len(words))
+    for start in range(0, len(events), 64):
+        batch = slice(start, start + 64)
+        scores = scorer.advance(events[batch], symbols[batch])
+        assert not scores.fell_off.any()
+    expected = [log(automaton.get_probability(word)) for word in words]
+    assert scorer.log_likelihoods == pytest.approx(expected)
+    # the streams are back in the initial state, ready for the next trace
+    assert scorer.states.tolist() == [0] * len(words)
+
+
+def test_scores():
+    """Test the surprisals, the next-symbol distributions and the fall-off flags."""
+    automaton = make_pdfa_two_state(0.4, 0.7)
+    scorer = StreamScorer(automaton, 3)
+    scores = scorer.advance([0, 1, 0, 2], [0, 1, 1, FINAL_SYMBOL])
+    assert scores.surprisals == pytest.approx([-log(0.4), -log(0.6), -log(0.7), inf])
+    assert scores.fell_off.tolist() == [False, False, False, True]
+    expected = [[0.3, 0.7, 0.0], [0.0, 0.0, 1.0], [0.3, 0.7, 0.0], [0.0, 0.0, 0.0]]
+    assert scores.next_distributions == pytest.approx(np.array(expected))
+    assert scorer.states.tolist() == [1, 2, UNDEFINED_STATE]
+
+    # a stream that fell off stays off, until reset
+    scores = scorer.advance([2], [0], with_distributions=False)
+    assert scores.fell_off.tolist() == [True]
+    assert scores.next_distributions is None
+    assert scorer.log_likelihoods[2] == -inf
+    scorer.reset([2])
+    assert scorer.states.tolist() == [1, 2, 0]
+    assert scorer.log_likelihoods[2] == 0.0
+
+
+def test_wrong_inputs():
+    """Test the validation of the events."""
+    scorer = StreamScorer(make_pdfa_two_state(), 2)
+    with pytest.raises(AssertionError, match="not in the set of streams"):
+        scorer.advance([2], [0])
+    with pytest.raises(AssertionError, match="not in the alphabet"):
+        scorer.advance([0], [2])
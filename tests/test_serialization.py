@@ -0,0 +1,110 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020 Marco Favorito
+#
+# ------------------------------
+#
+# This file is part of pdfa-learning.
+#
+# pdfa-learning is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pdfa-learning is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with pdfa-learning.  If not, see <https://www.gnu.org/licenses/>.
+#
+"""Tests for the serialization of PDFAs."""
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+import pdfa_learning.pdfa.base as pdfa_base
+from pdfa_learning.pdfa import PDFA
+from pdfa_learning.pdfa.helpers import FINAL_STATE, FINAL_SYMBOL
+from pdfa_learning.pdfa.random_pdfa import make_random_pdfa
+from pdfa_learning.pdfa.serialization import HEADER, from_json, load, save, to_json
+from tests.conftest import tempdir
+from tests.pdfas import make_reber_grammar
+
+
+def _make_pdfa_with_zero_transitions() -> PDFA:
+    """Make a PDFA with transitions of probability zero, like a ground node."""
+    return PDFA(
+        3,
+        2,
+        {
+            0: {0: (1, 1.0), 1: (2, 0.0), FINAL_SYMBOL: (FINAL_STATE, 0.0)},
+            1: {FINAL_SYMBOL: (FINAL_STATE, 1.0)},
+            2: {0: (2, 0.5), FINAL_SYMBOL: (FINAL_STATE, 0.5)},
+        },
+    )
+
+
+@pytest.mark.parametrize("mmap", [False, True])
+@pytest.mark.parametrize(
+    "automaton",
+    [make_reber_grammar(), _make_pdfa_with_zero_transitions(), make_random_pdfa(50, 4)],
+)
+def test_save_and_load(automaton: PDFA, mmap: bool):
+    """Test that a loaded PDFA is equal to the saved one."""
+    with tempdir() as directory:
+        path = Path(directory, "automaton.pdfa")
+        save(automaton, path)
+        actual = load(path, mmap=mmap)
+        assert actual == automaton
+        assert isinstance(actual.compiled.probabilities, np.memmap) == mmap
+        assert actual.compiled.expected_length == pytest.approx(
+            automaton.compiled.expected_length
+        )
+
+
+def test_load_skips_validation(monkeypatch):
+    """Test that the PDFA is not validated, and that a wrong checksum is rejected."""
+    automaton = make_reber_grammar()
+
+    def fail(*_args):
+        raise AssertionError("validated")
+
+    with tempdir() as directory:
+        path = Path(directory, "automaton.pdfa")
+        save(automaton, path)
+        monkeypatch.setattr(pdfa_base, "_check_ergodicity", fail)
+        assert load(path) == automaton
+
+        # change the probability of the transition from 0 with 'B'
+        content = bytearray(path.read_bytes())
+        content[HEADER.size : HEADER.size + 8] = np.float64(0.5).tobytes()
+        path.write_bytes(bytes(content))
+        with pytest.raises(ValueError, match="checksum .* does not match"):
+            load(path)
+
+
+def test_load_wrong_file():
+    """Test that loading a file in another format fails."""
+    with tempdir() as directory:
+        path = Path(directory, "automaton.pdfa")
+        path.write_bytes(b"not a PDFA")
+        with pytest.raises(ValueError, match="is not a PDFA file"):
+            load(path)
+        save(make_reber_grammar(), path)
+        path.write_bytes(path.read_bytes()[:-1])
+        with pytest.raises(ValueError, match="truncated or corrupted"):
+            load(path)
+
+
+def test_json():
+    """Test the JSON representation."""
+    automaton = _make_pdfa_with_zero_transitions()
+    content = to_json(automaton)
+    assert content["transitions"][:2] == [[0, -1, -1, 0.0], [0, 0, 1, 1.0]]
+    assert from_json(json.loads(json.dumps(content))) == automaton
+    with pytest.raises(ValueError, match="not supported"):
+        from_json({**content, "version": 42})
@@ -0,0 +1,63 @@
+# -*- coding: utf-8 -*-
+#
+# Copyright 2020 Marco Favorito
+#
+# ------------------------------
+#
+# This file is part of pdfa-learning.
+#
+# pdfa-learning is free software: you can redistribute it and/or modify
+# it under the terms of the GNU Lesser General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# pdfa-learning is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU Lesser General Public License for more details.
+#
+# You should have received a copy of the GNU Lesser General Public License
+# along with pdfa-learning.  If not, see <https://www.gnu.org/licenses/>.
+#
+"""Test the sketches module."""
+from collections import Counter
+
+from hypothesis import given, strategies
+
+from pdfa_learning.learn_pdfa.utils.sketch import CountMinSketch, SpaceSaving
+
+items_strategy = strategies.lists(strategies.integers(min_value=0, max_value=30))
+
+
+@given(items=items_strategy, capacity=strategies.integers(min_value=1, max_value=10))
+def test_space_saving(items, capacity):
+    """Test the Space-Saving guarantees: no underestimation, heavy items monitored."""
+    sketch = SpaceSaving(capacity)
+    for item in items:
+        sketch.add(item)
+    counter = Counter(items)
+    assert len(sketch) <= capacity
+    assert sketch.total == len(items)
+    for item, count in counter.items():
+        assert sketch.get(item) >= count
+        if count > len(items) / capacity:
+            assert item in sketch
+
+
+@given(items=items_strategy, width=strategies.integers(min_value=1, max_value=16))
+def test_count_min(items, width):
+    """Test that the Count-Min sketch never underestimates."""
+    sketch = CountMinSketch(width, depth=3)
+    for item in items:
+        sketch.add(item)
+    counter = Counter(items)
+    for item, count in counter.items():
+        assert count <= sketch.estimate(item) <= len(items)
+
+
+def test_count_min_exact_when_wide():
+    """Test that the Count-Min sketch is exact when there are few items."""
+    sketch = CountMinSketch(width=4096, depth=4)
+    for item in range(10):
+        sketch.add(item, times=item)
+    assert [sketch.estimate(item) for item in range(10)] == list(range(10))